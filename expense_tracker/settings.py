@@ -27,6 +27,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack
+    'tracker.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,7 +42,9 @@ ROOT_URLCONF = 'expense_tracker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing (tracker.middleware.PerformanceMiddleware)
+        'BACKEND': 'tracker.performance.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -57,11 +61,102 @@ TEMPLATES = [
 WSGI_APPLICATION = 'expense_tracker.wsgi.application'
 
 # Database
+# Connections are kept open for CONN_MAX_AGE seconds and tuned with the PRAGMAs
+# in tracker.db (WAL, synchronous=NORMAL, busy timeout, cache and mmap sizes).
+# IMMEDIATE transactions take the write lock up front instead of failing with
+# "database is locked" when a read transaction later tries to write.
+SQLITE_DATABASE = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.sqlite3',
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 5,
+    },
+}
+
 DATABASES = {
+    'default': SQLITE_DATABASE,
+    # Same file through separate query_only connections, used by read-only views
+    'readonly': {
+        **SQLITE_DATABASE,
+        # BEGIN IMMEDIATE asks for the write lock, which query_only refuses
+        'OPTIONS': {**SQLITE_DATABASE['OPTIONS'], 'transaction_mode': 'DEFERRED'},
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['tracker.db.ReadOnlyViewRouter']
+
+# Alias read by views marked read_only_view; None sends everything to default
+TRACKER_READ_ALIAS = 'readonly'
+
+# Per-project overrides of tracker.db.DEFAULT_SQLITE_PRAGMAS, e.g. {'mmap_size': 0}
+TRACKER_SQLITE_PRAGMAS = {}
+
+# Threads (each with its own connection) async views run their queries on
+TRACKER_LOAD_WORKERS = 8
+
+# In-process threads running queued gamification jobs (tracker.tasks); with 0,
+# jobs wait for process_gamification_jobs or the profile's next page load
+TRACKER_TASK_WORKERS = 1
+
+# Group commit of expense inserts through one writer thread (tracker.writer)
+TRACKER_WRITER_ENABLED = True
+TRACKER_WRITER_BATCH_SIZE = 64  # Most rows per transaction
+TRACKER_WRITER_MAX_WAIT_MS = 0  # How long a lone row waits for others to share its commit
+
+# Cache
+# Swap the backend (e.g. django.core.cache.backends.redis.RedisCache) to share
+# cached pages across processes; MAX_ENTRIES/CULL_FREQUENCY control eviction.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # Version stamps (tracker.caching.bump_version). Unlike cached pages they
+    # must be shared by every process that writes, web and task workers and
+    # management commands alike, so this cannot be a per-process LocMemCache.
+    # A file cache shares them between the processes of one host; use the
+    # Redis cache across hosts.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'versions',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,  # One per user and profile; an evicted stamp only costs a cache miss
+        },
+    },
+}
+
+# Cache alias and timeout (seconds) for per-profile page data
+TRACKER_CACHE_ALIAS = 'default'
+TRACKER_CACHE_TIMEOUT = 300
+# Cache alias for the version stamps; must be shared across processes (see CACHES)
+TRACKER_VERSION_CACHE_ALIAS = 'versions'
+# Seconds a process trusts its catalogue snapshot (tracker.catalog) before reloading it anyway
+TRACKER_CATALOG_MAX_AGE = 300
+
+# Request instrumentation (tracker.middleware.PerformanceMiddleware)
+TRACKER_PERF_SLOW_QUERIES = 3  # Slowest queries reported per request
+TRACKER_PERF_WINDOW = 1000  # Recent requests kept per route for the histograms
+TRACKER_PERF_TRACE_ALLOCATIONS = False  # tracemalloc peak per request; slows every request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request
+        'tracker.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 # Password validation
@@ -80,6 +175,11 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Authentication
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'dashboard'
+LOGOUT_REDIRECT_URL = 'login'
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 
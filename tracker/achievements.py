@@ -0,0 +1,45 @@
+from .catalog import get_achievement_index
+from .models import UserAchievement
+
+
+def profile_stats(profile):
+    """Current value of every achievement condition, read from the profile's counters."""
+    return {
+        'expense_count': profile.expense_count,
+        'streak': profile.current_streak,
+        'challenges': profile.challenges_completed,
+    }
+
+
+def achievement_progress(stats, achievement):
+    """Progress towards an achievement as a percentage, from a profile_stats() snapshot."""
+    if achievement.condition_value <= 0:
+        return 100
+    current = stats.get(achievement.condition_type, 0)
+    return min(int((current / achievement.condition_value) * 100), 100)
+
+
+def check_achievements(profile):
+    """Check and award any newly earned achievements."""
+    reached = get_achievement_index().reached(profile_stats(profile))
+    if not reached:
+        return []
+
+    already_earned = set(
+        UserAchievement.objects.filter(
+            user_profile=profile,
+            achievement_id__in=[a.id for a in reached],
+        ).values_list('achievement_id', flat=True)
+    )
+    earned_achievements = [a for a in reached if a.id not in already_earned]
+    if not earned_achievements:
+        return []
+
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(user_profile=profile, achievement=a) for a in earned_achievements],
+        ignore_conflicts=True,
+    )
+    for achievement in earned_achievements:
+        profile.add_xp(achievement.xp_reward, source='achievement')
+
+    return earned_achievements
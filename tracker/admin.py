@@ -1,8 +1,16 @@
 from django.contrib import admin
 from .models import (
-    Expense, UserProfile, Achievement, UserAchievement,
-    Challenge, UserChallenge, LeaderboardEntry
+    Category, Expense, ExpenseRollup, UserProfile, Achievement, UserAchievement,
+    Challenge, UserChallenge, LeaderboardEntry, XPEvent, GamificationJob
 )
+from .tasks import retry_failed_jobs
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'listed')
+    list_filter = ('listed',)
+    search_fields = ('name',)
 
 
 @admin.register(Expense)
@@ -13,12 +21,32 @@ class ExpenseAdmin(admin.ModelAdmin):
     ordering = ('-date',)
 
 
+@admin.register(ExpenseRollup)
+class ExpenseRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'category', 'user', 'total_amount', 'expense_count')
+    list_filter = ('category',)
+    ordering = ('-date',)
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'level', 'xp', 'current_streak', 'streak_multiplier')
     list_filter = ('level', 'theme')
 
 
+@admin.register(XPEvent)
+class XPEventAdmin(admin.ModelAdmin):
+    list_display = ('user_profile', 'source', 'amount', 'multiplier', 'xp', 'created_at')
+    list_filter = ('source',)
+
+    # The ledger is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Achievement)
 class AchievementAdmin(admin.ModelAdmin):
     list_display = ('name', 'tier', 'xp_reward', 'condition_type', 'condition_value')
@@ -49,3 +77,15 @@ class LeaderboardEntryAdmin(admin.ModelAdmin):
     list_display = ('user_profile', 'period_type', 'rank', 'xp_earned')
     list_filter = ('period_type',)
     ordering = ('rank',)
+
+
+@admin.register(GamificationJob)
+class GamificationJobAdmin(admin.ModelAdmin):
+    list_display = ('user_profile', 'logged_on', 'expenses', 'status', 'attempts', 'run_after', 'last_error')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
+    actions = ['retry']
+
+    @admin.action(description="Retry selected failed jobs")
+    def retry(self, request, queryset):
+        self.message_user(request, f"Requeued {retry_failed_jobs(queryset)} jobs.")
@@ -0,0 +1,623 @@
+import asyncio
+import decimal
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the money benchmark skips its NumPy load case
+    np = None
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .achievements import check_achievements
+from .caching import get_cache
+from .challenges import update_challenge_progress
+from .db import DEFAULT_SQLITE_PRAGMAS, read_alias
+from .leaderboard import PERIOD_TYPES
+from .models import Expense, UserProfile
+from .money import PAISE_PER_RUPEE, from_paise
+from .urls import urlpatterns
+from .writer import get_writer, stop_writer
+
+
+BENCHMARK_ITERATIONS = 20
+REGRESSION_TOLERANCE = 0.25
+# Latency differences below this are noise, whatever the ratio
+NOISE_FLOOR_MS = 2.0
+
+
+class Case:
+    """One benchmarked operation: ``run(state)`` is timed, ``setup()`` (if any) is not."""
+
+    def __init__(self, name, run, setup=None, writes=False):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.writes = writes  # Rolled back after every iteration
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _request(client, method, url, data=None):
+    def run(state):
+        # A setup step can supply the payload, e.g. a fresh upload per iteration
+        response = getattr(client, method)(url, data if state is None else state)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+    return run
+
+
+def _import_upload():
+    today = timezone.localdate()
+    lines = ['date,description,amount,category'] + [
+        f"{today - timedelta(days=i % 30)},Benchmark row {i},{100 + i}.50,Food" for i in range(200)
+    ]
+    return {'file': SimpleUploadedFile('bench.csv', '\n'.join(lines).encode(), content_type='text/csv')}
+
+
+def route_cases(client):
+    """A case per route in tracker/urls.py, with variants for forms and query parameters."""
+    today = timezone.localdate()
+    variants = {
+        'add_expense': [
+            ('', 'get', None),
+            ('post', 'post', {'amount': '250', 'description': 'Benchmark', 'category': 'Food',
+                              'date': today.isoformat()}),
+        ],
+        'import_expenses': [('', 'get', None), ('post', 'post', _import_upload)],
+        'export_expenses': [('month', 'get', {'start': (today - timedelta(days=30)).isoformat()})],
+        'leaderboard': [(period, 'get', {'period': period}) for period in PERIOD_TYPES],
+    }
+
+    cases = []
+    for pattern in urlpatterns:
+        url = reverse(pattern.name)
+        for label, method, data in variants.get(pattern.name, [('', 'get', None)]):
+            name = f"{pattern.name}:{label}" if label else pattern.name
+            writes = method == 'post'
+            if callable(data):
+                cases.append(Case(name, _request(client, method, url), setup=data, writes=writes))
+            else:
+                cases.append(Case(name, _request(client, method, url, data), writes=writes))
+    return cases
+
+
+def function_cases(profile_id):
+    """The core gamification functions, each on a freshly loaded profile."""
+    def load():
+        return UserProfile.objects.get(pk=profile_id)
+
+    def add_xp(profile):
+        profile.add_xp(50, source='adjustment')
+        profile.commit_changes()
+
+    return [
+        Case('check_achievements', check_achievements, setup=load, writes=True),
+        Case('update_challenge_progress', update_challenge_progress, setup=load, writes=True),
+        Case('add_xp', add_xp, setup=load, writes=True),
+    ]
+
+
+@contextmanager
+def _capture_queries():
+    """Capture queries on the default connection and, when reads are routed, the read alias."""
+    aliases = dict.fromkeys(alias for alias in (DEFAULT_DB_ALIAS, read_alias()) if alias)
+    with ExitStack() as stack:
+        yield [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in aliases]
+
+
+def measure(case, iterations=BENCHMARK_ITERATIONS, warm=False):
+    """
+    Time a case; returns latency percentiles (ms) and the largest query count seen.
+
+    Cases that write run each iteration in a transaction that is rolled back,
+    so writes do not accumulate. The others run outside one, so read-only
+    views read from TRACKER_READ_ALIAS as they do when serving. Unless
+    ``warm``, every iteration starts from an empty cache.
+    """
+    timings, queries = [], 0
+    for _ in range(iterations):
+        if not warm:
+            get_cache().clear()
+        with transaction.atomic() if case.writes else nullcontext():
+            state = case.setup() if case.setup else None
+            with _capture_queries() as captured:
+                started = time.perf_counter()
+                case.run(state)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, sum(len(context) for context in captured))
+            if case.writes:
+                transaction.set_rollback(True)
+
+    timings.sort()
+    return {
+        'p50': round(percentile(timings, 50), 2),
+        'p95': round(percentile(timings, 95), 2),
+        'p99': round(percentile(timings, 99), 2),
+        'mean': round(sum(timings) / len(timings), 2),
+        'queries': queries,
+    }
+
+
+def benchmark_profile(username=None):
+    """The profile to benchmark as: the named user's, else the one with the most expenses."""
+    if username:
+        user = User.objects.get(username=username)
+    else:
+        profile = UserProfile.objects.exclude(user=None).order_by('-expense_count').first()
+        user = profile.user if profile else User.objects.get_or_create(username='benchmark')[0]
+    profile, _ = UserProfile.objects.get_or_create(
+        user=user, defaults={'unlocked_themes': ['dark'], 'unlocked_insights': []},
+    )
+    return profile
+
+
+def run_benchmarks(iterations=BENCHMARK_ITERATIONS, warm=False, only=None, username=None, progress=None):
+    """Measure every route and core function as one user; returns {case name: result}."""
+    # Created up front so the first timed request does not pay for it
+    profile = benchmark_profile(username)
+
+    client = Client()
+    client.force_login(profile.user)
+    # Commit the session's cached profile id, which rolled-back iterations would otherwise discard
+    client.get(reverse('dashboard'))
+    results = {}
+    for case in route_cases(client) + function_cases(profile.pk):
+        if only and not any(case.name.startswith(prefix) for prefix in only):
+            continue
+        results[case.name] = measure(case, iterations, warm)
+        if progress:
+            progress(case.name, results[case.name])
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Human-readable regressions: more queries than the baseline, or a slower p95 beyond tolerance."""
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            found.append(f"{name}: {result['queries']} queries (baseline {before['queries']})")
+        slower = result['p95'] - before['p95']
+        if slower > NOISE_FLOOR_MS and result['p95'] > before['p95'] * (1 + tolerance):
+            found.append(f"{name}: p95 {result['p95']}ms (baseline {before['p95']}ms)")
+    return found
+
+
+# Database configurations compared by run_db_workload: SQLite's own defaults
+# (rollback journal, full fsync, a connection per request, no read alias)
+# against the tuned layer in tracker.db and settings.DATABASES
+DB_PROFILES = {
+    'untuned': {
+        'pragmas': {
+            'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000,
+            'cache_size': -2000, 'mmap_size': 0, 'temp_store': 'DEFAULT',
+        },
+        'conn_max_age': 0,
+        'transaction_mode': None,
+        'read_alias': None,
+    },
+    'tuned': {
+        'pragmas': DEFAULT_SQLITE_PRAGMAS,
+        'conn_max_age': 600,
+        'transaction_mode': 'IMMEDIATE',
+        'read_alias': 'readonly',
+    },
+}
+WORKLOAD_READ_ROUTES = ('dashboard', 'predictions', 'achievements', 'leaderboard')
+WORKLOAD_WRITE_RATIO = 0.2
+
+
+@contextmanager
+def _database_copy():
+    """Path of a temporary copy of the default database, taken with SQLite's backup API."""
+    source = str(connections.settings[DEFAULT_DB_ALIAS]['NAME'])
+    workdir = tempfile.mkdtemp(prefix='tracker-workload-')
+    path = os.path.join(workdir, 'db.sqlite3')
+    try:
+        with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+        yield path
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextmanager
+def _quiet():
+    """Silence per-request log lines and error tracebacks, which would drown a report."""
+    loggers = [logging.getLogger(name) for name in ('tracker.performance', 'tracker.tasks', 'django.request')]
+    for logger in loggers:
+        logger.disabled = True
+    try:
+        yield
+    finally:
+        for logger in loggers:
+            logger.disabled = False
+
+
+@contextmanager
+def _database_profile(config, path):
+    """Point every alias at ``path`` with the given PRAGMAs, connection lifetime and read routing."""
+    connections.close_all()
+    saved = {alias: dict(connections.settings[alias]) for alias in connections.settings}
+    for alias, db in connections.settings.items():
+        db['NAME'] = path
+        db['CONN_MAX_AGE'] = config['conn_max_age']
+        if alias == DEFAULT_DB_ALIAS:
+            db['OPTIONS'] = {**db.get('OPTIONS', {}), 'transaction_mode': config['transaction_mode']}
+    # A cache of its own, so each run starts cold and writes invalidate it as in production
+    overrides = override_settings(
+        TRACKER_SQLITE_PRAGMAS=config['pragmas'],
+        TRACKER_READ_ALIAS=config['read_alias'],
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'tracker-workload-{id(config)}-{time.time_ns()}',
+        }},
+    )
+    try:
+        with overrides:
+            yield
+    finally:
+        connections.close_all()
+        for alias, db in saved.items():
+            connections.settings[alias].clear()
+            connections.settings[alias].update(db)
+
+
+def _workload_clients(count):
+    """Logged-in clients for the ``count`` users with the most expenses (reused round-robin)."""
+    profiles = list(UserProfile.objects.exclude(user=None).select_related('user').order_by('-expense_count')[:count])
+    if not profiles:
+        profiles = [benchmark_profile()]
+    clients = []
+    for i in range(count):
+        client = Client()
+        client.force_login(profiles[i % len(profiles)].user)
+        clients.append(client)
+    return clients
+
+
+def _workload_worker(client, deadline, write_ratio, seed, samples, failures):
+    rng = random.Random(seed)
+    today = timezone.localdate().isoformat()
+    read_urls = [reverse(name) for name in WORKLOAD_READ_ROUTES]
+    add_url = reverse('add_expense')
+    try:
+        while time.perf_counter() < deadline:
+            write = rng.random() < write_ratio
+            started = time.perf_counter()
+            try:
+                if write:
+                    response = client.post(add_url, {
+                        'amount': str(rng.randint(20, 2000)), 'description': 'Workload',
+                        'category': 'Food', 'date': today,
+                    })
+                else:
+                    response = client.get(rng.choice(read_urls))
+                ok = response.status_code < 400
+            except OperationalError as exc:
+                failures.append('locked' if 'locked' in str(exc) else 'error')
+                continue
+            finally:
+                # What the request handler does at the end of every request
+                close_old_connections()
+            if ok:
+                samples.append(('write' if write else 'read', (time.perf_counter() - started) * 1000))
+            else:
+                failures.append('error')
+    finally:
+        connections.close_all()
+
+
+def run_db_workload(profile, workers=8, duration=10.0, write_ratio=WORKLOAD_WRITE_RATIO, seed=0):
+    """
+    Run concurrent page reads and expense writes against a copy of the database.
+
+    The copy is taken with SQLite's backup API, so the real database is
+    never written. Returns throughput, latency percentiles (ms) and failure
+    counts for the named entry of DB_PROFILES.
+    """
+    config = DB_PROFILES[profile]
+    samples, failures = [], []
+    with _database_copy() as path, _quiet(), _database_profile(config, path):
+        clients = _workload_clients(workers)
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=_workload_worker, args=(
+                client, deadline, write_ratio, seed + i, samples, failures,
+            ))
+            for i, client in enumerate(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def latencies(kind=None):
+        return sorted(ms for sample_kind, ms in samples if kind in (None, sample_kind))
+
+    every, reads, writes = latencies(), latencies('read'), latencies('write')
+    return {
+        'requests_per_s': round(len(every) / duration, 1),
+        'reads': len(reads),
+        'writes': len(writes),
+        'p50': round(percentile(every, 50), 2),
+        'p95': round(percentile(every, 95), 2),
+        'read_p95': round(percentile(reads, 95), 2),
+        'write_p95': round(percentile(writes, 95), 2),
+        'locked': failures.count('locked'),
+        'errors': failures.count('error'),
+    }
+
+
+# (sync view, async twin) pairs compared by run_async_comparison
+ASYNC_VIEW_PAIRS = (('dashboard', 'dashboard_async'), ('predictions', 'predictions_async'))
+
+
+async def _apoll(client, url, deadline, warm, timings):
+    while time.perf_counter() < deadline:
+        if not warm:
+            await get_cache().aclear()
+        started = time.perf_counter()
+        # As ASGIHandler does, so each request's sync code gets its own thread
+        async with ThreadSensitiveContext():
+            response = await client.get(url)
+        if response.status_code >= 400:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        timings.append((time.perf_counter() - started) * 1000)
+
+
+async def _acompare(users, concurrency, duration, warm):
+    clients = []
+    for i in range(concurrency):
+        client = AsyncClient()
+        await client.aforce_login(users[i % len(users)])
+        # Cache each session's profile id before timing starts
+        await client.get(reverse('dashboard'))
+        clients.append(client)
+
+    results = {}
+    for pair in ASYNC_VIEW_PAIRS:
+        for name in pair:
+            url = reverse(name)
+            timings = []
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(_apoll(client, url, deadline, warm, timings) for client in clients))
+            timings.sort()
+            results[name] = {
+                'requests_per_s': round(len(timings) / duration, 1),
+                'p50': round(percentile(timings, 50), 2),
+                'p99': round(percentile(timings, 99), 2),
+            }
+    return results
+
+
+def run_async_comparison(concurrency=8, duration=5.0, warm=False):
+    """
+    Latency of the sync dashboard and predictions views against their async
+    twins, with ``concurrency`` clients polling each through the ASGI stack.
+
+    Unless ``warm``, the page cache is cleared before every request so each
+    one runs its queries. Returns {view name: throughput and percentiles}.
+    """
+    profiles = UserProfile.objects.exclude(user=None).select_related('user').order_by('-expense_count')
+    users = [profile.user for profile in profiles[:concurrency]] or [benchmark_profile().user]
+
+    with _quiet():
+        return asyncio.run(_acompare(users, concurrency, duration, warm))
+
+
+INSERT_CONCURRENCY = (1, 8, 64)
+
+
+def _insert_worker(client, deadline, latencies, failures):
+    url = reverse('add_expense')
+    data = {'amount': '125', 'description': 'Insert benchmark', 'category': 'Food',
+            'date': timezone.localdate().isoformat()}
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = client.post(url, data)
+            except OperationalError as exc:
+                failures.append('locked' if 'locked' in str(exc) else 'error')
+                continue
+            finally:
+                close_old_connections()
+            if response.status_code < 400:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                failures.append('error')
+    finally:
+        connections.close_all()
+
+
+def run_insert_benchmark(concurrency=INSERT_CONCURRENCY, duration=5.0, profile='tuned'):
+    """
+    Expenses stored per second through add_expense, each request inserting
+    directly and through the group-commit writer, at each client count.
+
+    Runs on a copy of the database with the named DB_PROFILES configuration.
+    The gamification workers are off, so only the insert path competes for
+    the database lock. Returns {(mode, clients): result}.
+    """
+    results = {}
+    with _database_copy() as path, _quiet(), _database_profile(DB_PROFILES[profile], path):
+        for mode in ('direct', 'writer'):
+            with override_settings(TRACKER_WRITER_ENABLED=mode == 'writer', TRACKER_TASK_WORKERS=0):
+                for count in concurrency:
+                    clients = _workload_clients(count)
+                    before = Expense.objects.count()
+                    writer = get_writer()
+                    commits_before = writer.commits
+                    latencies, failures = [], []
+                    deadline = time.perf_counter() + duration
+                    threads = [
+                        threading.Thread(target=_insert_worker, args=(client, deadline, latencies, failures))
+                        for client in clients
+                    ]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    latencies.sort()
+                    inserted = Expense.objects.count() - before
+                    commits = writer.commits - commits_before if mode == 'writer' else inserted
+                    results[mode, count] = {
+                        'inserts_per_s': round(inserted / duration, 1),
+                        'rows_per_commit': round(inserted / commits, 1) if commits else 0.0,
+                        'p50': round(percentile(latencies, 50), 2),
+                        'p99': round(percentile(latencies, 99), 2),
+                        'locked': failures.count('locked'),
+                        'errors': failures.count('error'),
+                    }
+            stop_writer()
+    return results
+
+
+MONEY_BENCHMARK_ROWS = 10_000_000
+MONEY_BENCHMARK_USERS = 10_000
+# Rows converted to a NumPy array in the load case; the decimal path is slow to convert
+MONEY_LOAD_ROWS = 1_000_000
+
+# The SQL Django emits for each column type: SQLite has no decimal type, so
+# DecimalField sums are cast back to NUMERIC from floating point
+_MONEY_LAYOUTS = {
+    'decimal': {'column': 'decimal', 'value': 'amount / 100.0', 'sum': 'CAST(SUM(amount) AS NUMERIC)'},
+    'paise': {'column': 'bigint', 'value': 'amount', 'sum': 'SUM(amount)'},
+}
+_MONEY_CASES = {
+    'total': "SELECT {sum} FROM expense",
+    'per_user': "SELECT user_id, {sum} FROM expense GROUP BY user_id",
+    'running_total': (
+        "SELECT MAX(running) FROM (SELECT SUM(amount) OVER "
+        "(PARTITION BY user_id ORDER BY date ROWS UNBOUNDED PRECEDING) AS running FROM expense)"
+    ),
+}
+
+
+def _money_database(path, layout, rows, users):
+    """A table of ``rows`` expenses whose amounts use the given layout; the same amounts for every layout."""
+    db = sqlite3.connect(path)
+    db.execute(
+        f"CREATE TABLE expense (id integer PRIMARY KEY, user_id integer NOT NULL, "
+        f"date date NOT NULL, amount {layout['column']} NOT NULL)"
+    )
+    db.execute(
+        f"""
+        INSERT INTO expense (user_id, date, amount)
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?),
+             generated(user_id, date, amount) AS (
+                 SELECT n % ?, date('2025-01-01', '+' || (n * 7 % 365) || ' days'),
+                        (n * 2654435761) % 500000 + 100
+                 FROM seq
+             )
+        SELECT user_id, date, {layout['value']} FROM generated
+        """,
+        (rows, users),
+    )
+    # Per-user date order, as the rollup index provides in the app
+    db.execute("CREATE INDEX expense_user_date ON expense (user_id, date, amount)")
+    db.commit()
+    db.execute("ANALYZE")
+    return db
+
+
+def _best_of(repeats, run):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1), result
+
+
+def run_money_benchmark(rows=MONEY_BENCHMARK_ROWS, users=MONEY_BENCHMARK_USERS, repeats=3, progress=None):
+    """
+    Aggregate speed over ``rows`` expenses with amounts stored as the old
+    DecimalField column and as MoneyField's integer paise.
+
+    Each layout gets its own temporary database holding identical amounts.
+    Returns {case: {layout: ms}} (best of ``repeats``), plus each database's
+    size in MB and how far the decimal total drifted from the exact one.
+    """
+    to_decimal = decimal.Context(prec=15).create_decimal_from_float
+    cents = decimal.Decimal('0.01')
+    loaders = {
+        # What DecimalField's SQLite converter does per value, then the float NumPy needs
+        'decimal': lambda values: np.array([float(to_decimal(value).quantize(cents)) for value in values]),
+        'paise': lambda values: np.fromiter(values, dtype=np.int64, count=len(values)) / PAISE_PER_RUPEE,
+    }
+
+    results = {case: {} for case in [*_MONEY_CASES, *(['numpy_load'] if np else [])]}
+    results['size_mb'] = {}
+    totals = {}
+    workdir = tempfile.mkdtemp(prefix='tracker-money-')
+    try:
+        for name, layout in _MONEY_LAYOUTS.items():
+            path = os.path.join(workdir, f'{name}.sqlite3')
+            if progress:
+                progress(f"Building {rows} {name} rows")
+            db = _money_database(path, layout, rows, users)
+            try:
+                for case, sql in _MONEY_CASES.items():
+                    sql = sql.format(sum=layout['sum'])
+                    results[case][name], result = _best_of(repeats, lambda: db.execute(sql).fetchall())
+                    if case == 'total':
+                        totals[name] = result[0][0]
+                if np is not None:
+                    def load():
+                        values = [value for value, in db.execute(
+                            "SELECT amount FROM expense WHERE id <= ?", (MONEY_LOAD_ROWS,))]
+                        return loaders[name](values)
+                    results['numpy_load'][name], _ = _best_of(repeats, load)
+            finally:
+                db.close()
+            results['size_mb'][name] = round(os.path.getsize(path) / 1e6, 1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    exact = from_paise(totals['paise'])
+    results['decimal_total_error'] = str(decimal.Decimal(str(totals['decimal'])) - exact)
+    return results
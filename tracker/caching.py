@@ -0,0 +1,167 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+CATALOG_SCOPE = 'catalog'
+
+
+def get_cache():
+    return caches[getattr(settings, 'TRACKER_CACHE_ALIAS', 'default')]
+
+
+def get_version_cache():
+    """
+    The cache holding the version stamps (TRACKER_VERSION_CACHE_ALIAS, default TRACKER_CACHE_ALIAS).
+
+    Every process that writes (web workers, task workers, management
+    commands) must see the same stamps, or its writes never invalidate the
+    pages the others have cached: it has to be a shared backend.
+    """
+    alias = getattr(settings, 'TRACKER_VERSION_CACHE_ALIAS', None)
+    return caches[alias] if alias else get_cache()
+
+
+def cache_timeout():
+    return getattr(settings, 'TRACKER_CACHE_TIMEOUT', 300)
+
+
+def _version_key(scope, ident=''):
+    return f"tracker:version:{scope}:{ident}"
+
+
+def _fresh_version():
+    # Time-based, so a version key that was evicted never restarts at an old value,
+    # and a version also says when its scope last changed
+    return time.time_ns()
+
+
+def bump_version(scope, ident=''):
+    """Invalidate everything cached under a scope once the current transaction commits."""
+    def bump():
+        get_version_cache().set(_version_key(scope, ident), _fresh_version(), None)
+    transaction.on_commit(bump)
+
+
+def bump_profile_version(profile_id):
+    bump_version('profile', profile_id)
+
+
+def bump_user_version(user_id):
+    bump_version('user', user_id if user_id is not None else 'anon')
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_SCOPE)
+
+
+def catalog_version():
+    """Current version of the achievement/challenge catalogue (a cache read, no query)."""
+    cache = get_version_cache()
+    key = _version_key(CATALOG_SCOPE)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def _data_versions(profile):
+    cache = get_version_cache()
+    keys = [
+        _version_key(CATALOG_SCOPE),
+        _version_key('user', profile.user_id if profile.user_id is not None else 'anon'),
+        _version_key('profile', profile.pk),
+    ]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _fresh_version(), None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def data_version(profile):
+    """
+    Combined version of everything a profile's pages are built from.
+
+    It changes whenever the profile's expenses, challenges, achievements or
+    XP are written, or the achievement/challenge catalogue is edited.
+    """
+    return '.'.join(map(str, _data_versions(profile)))
+
+
+def data_last_modified(profile):
+    """When anything behind data_version last changed (at the latest, when its version was first seen)."""
+    return datetime.fromtimestamp(max(_data_versions(profile)) / 1e9, tz=dt_timezone.utc)
+
+
+def _count(outcome):
+    cache = get_cache()
+    key = f"tracker:stats:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def _context_key(profile, name, vary_on):
+    return ':'.join(['tracker:ctx', name, str(profile.pk), data_version(profile), *map(str, vary_on)])
+
+
+def cached_context(profile, name, build, *vary_on):
+    """
+    Return ``build()`` from the cache, keyed by the profile's data version.
+
+    Entries never need explicit deletion: a write bumps the version and the
+    old entries age out through the backend's timeout and eviction policy.
+    """
+    cache = get_cache()
+    key = _context_key(profile, name, vary_on)
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    _count('misses')
+    value = build()
+    cache.set(key, value, cache_timeout())
+    return value
+
+
+async def acached_context(profile, name, build, *vary_on):
+    """cached_context for async views: ``build`` is awaited, and shares entries with the sync views."""
+    cache = get_cache()
+    key = await sync_to_async(_context_key)(profile, name, vary_on)
+    value = await cache.aget(key)
+    if value is not None:
+        await sync_to_async(_count)('hits')
+        return value
+
+    await sync_to_async(_count)('misses')
+    value = await build()
+    await cache.aset(key, value, cache_timeout())
+    return value
+
+
+def cache_stats():
+    """Hit and miss counters for cached contexts."""
+    counts = get_cache().get_many(['tracker:stats:hits', 'tracker:stats:misses'])
+    hits = counts.get('tracker:stats:hits', 0)
+    misses = counts.get('tracker:stats:misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    get_cache().delete_many(['tracker:stats:hits', 'tracker:stats:misses'])
@@ -0,0 +1,151 @@
+import threading
+import time
+from bisect import bisect_right
+from types import MappingProxyType
+
+from django.conf import settings
+
+from .caching import catalog_version
+from .models import Achievement, Category, Challenge
+
+
+class AchievementIndex:
+    """Achievement thresholds grouped by condition_type and sorted for bisect lookups."""
+
+    def __init__(self, achievements):
+        by_id = {}
+        grouped = {}
+        for achievement in achievements:
+            by_id[achievement.id] = achievement
+            grouped.setdefault(achievement.condition_type, []).append(achievement)
+        self.by_id = MappingProxyType(by_id)
+
+        thresholds = {}
+        ordered = {}
+        for condition_type, items in grouped.items():
+            items.sort(key=lambda a: a.condition_value)
+            thresholds[condition_type] = tuple(a.condition_value for a in items)
+            ordered[condition_type] = tuple(items)
+        self.thresholds = MappingProxyType(thresholds)
+        self.achievements = MappingProxyType(ordered)
+
+    def reached(self, stats):
+        """Every achievement whose threshold is met by the given stats."""
+        reached = []
+        for condition_type, value in stats.items():
+            thresholds = self.thresholds.get(condition_type)
+            if thresholds:
+                reached.extend(self.achievements[condition_type][:bisect_right(thresholds, value)])
+        return reached
+
+
+class Catalog:
+    """
+    Read-only snapshot of the achievement, challenge and category catalogues.
+
+    A snapshot is shared by every request and thread in the process and is
+    never mutated; an edit replaces it with a new one (see get_catalog).
+    """
+
+    def __init__(self, version, achievements, challenges, categories):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.achievements = AchievementIndex(achievements)
+        challenges = sorted(challenges, key=lambda c: c.pk)
+        self.challenges = MappingProxyType({challenge.pk: challenge for challenge in challenges})
+        active = {}
+        for challenge in challenges:
+            if challenge.is_active:
+                active.setdefault(challenge.challenge_type, []).append(challenge)
+        self._active = MappingProxyType({kind: tuple(items) for kind, items in active.items()})
+        categories = sorted(categories, key=lambda c: c.pk)
+        self.categories = MappingProxyType({category.pk: category for category in categories})
+        self.categories_by_name = MappingProxyType({category.name: category for category in categories})
+        self.listed_categories = tuple(category for category in categories if category.listed)
+
+    def active_challenges(self, challenge_type):
+        """Active challenges of a type, oldest first."""
+        return self._active.get(challenge_type, ())
+
+    def category_ids(self, names):
+        """Ids of the named categories, skipping names no expense has used."""
+        return tuple(sorted(
+            self.categories_by_name[name].pk for name in names if name in self.categories_by_name
+        ))
+
+
+# Seconds a snapshot is trusted without a stamp change; bounds how long an
+# edit whose stamp bump was lost (an evicted or unshared version cache, a
+# write that bypassed the signals) can go unseen
+CATALOG_MAX_AGE = 300
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _is_current(catalog, version):
+    max_age = getattr(settings, 'TRACKER_CATALOG_MAX_AGE', CATALOG_MAX_AGE)
+    return catalog is not None and catalog.version == version and time.monotonic() - catalog.loaded_at < max_age
+
+
+def get_catalog(refresh=False):
+    """
+    The current catalogue snapshot, reloaded when its version stamp moves or it gets old.
+
+    Admin saves and deletes bump the stamp (tracker.signals) in the shared
+    version cache (TRACKER_VERSION_CACHE_ALIAS), so every process sharing it
+    picks up an edit on its next lookup; until then a lookup costs one cache
+    read and no queries. Whatever the stamp says, a snapshot is reloaded
+    after TRACKER_CATALOG_MAX_AGE seconds. ``refresh`` forces a reload.
+    """
+    global _catalog
+    version = catalog_version()
+    catalog = _catalog
+    if not refresh and _is_current(catalog, version):
+        return catalog
+    with _catalog_lock:
+        if refresh or not _is_current(_catalog, version):
+            # Stamped with the version read before loading: an edit committed
+            # meanwhile moves the stamp again and forces another reload
+            _catalog = Catalog(
+                version, Achievement.objects.all(), Challenge.objects.all(), Category.objects.all(),
+            )
+        return _catalog
+
+
+def get_achievement_index():
+    return get_catalog().achievements
+
+
+def get_categories(ids=()):
+    """Categories by id; reloads the snapshot if any of ``ids`` was created after it was taken."""
+    catalog = get_catalog()
+    if any(category_id not in catalog.categories for category_id in ids):
+        # Committed by another thread or process moments ago; its stamp bump may still be on its way
+        catalog = get_catalog(refresh=True)
+    return catalog.categories
+
+
+def attach_categories(expenses):
+    """Fill in each row's category from the catalogue, so reading it costs no query; returns the rows."""
+    categories = get_categories({expense.category_id for expense in expenses})
+    for expense in expenses:
+        expense.category = categories[expense.category_id]
+    return expenses
+
+
+DEFAULT_CATEGORY = 'General'
+
+
+def existing_category(name):
+    """The catalogue's Category called ``name``, else the default one; for user input, so never creates one."""
+    category = get_catalog().categories_by_name.get(name)
+    return category if category is not None else get_category(DEFAULT_CATEGORY)
+
+
+def get_category(name):
+    """The Category called ``name``, created the first time an expense uses it."""
+    category = get_catalog().categories_by_name.get(name)
+    if category is None:
+        category, _ = Category.objects.get_or_create(name=name)
+    return category
@@ -0,0 +1,244 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_profile_version
+from .catalog import get_catalog
+from .models import ExpenseRollup, UserChallenge
+
+
+SAVINGS_BASELINE_DAYS = 28
+
+
+def start_of_day(day):
+    """Aware datetime of local midnight at the start of ``day``, for index-friendly range filters."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def challenge_period(user_challenge):
+    """First and last day of the day or week a challenge was started in."""
+    started = timezone.localdate(user_challenge.started_at)
+    if user_challenge.challenge.challenge_type == 'daily':
+        return started, started
+    week_start = started - timedelta(days=started.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+class _MetricQuery:
+    """Collects the conditional aggregates every challenge needs into one aggregate() call."""
+
+    def __init__(self):
+        self.aggregates = {}
+        self.aliases = {}
+        self.earliest = None
+
+    def _add(self, key, expression, start):
+        if key not in self.aliases:
+            alias = f"m{len(self.aliases)}"
+            self.aliases[key] = alias
+            self.aggregates[alias] = expression
+        self.earliest = start if self.earliest is None else min(self.earliest, start)
+        return key
+
+    def spend(self, start, end, category_ids=None):
+        window = Q(date__gte=start, date__lte=end)
+        if category_ids:
+            window &= Q(category_id__in=category_ids)
+        key = ('spend', start, end, tuple(category_ids or ()))
+        return self._add(key, Sum('total_amount', filter=window), start)
+
+    def entries(self, start, end):
+        window = Q(date__gte=start, date__lte=end)
+        return self._add(('entries', start, end), Sum('expense_count', filter=window), start)
+
+    def active_days(self, start, end):
+        window = Q(date__gte=start, date__lte=end)
+        return self._add(('days', start, end), Count('date', distinct=True, filter=window), start)
+
+    def run(self, rollups):
+        if not self.aggregates:
+            return {}
+        result = rollups.filter(date__gte=self.earliest).aggregate(**self.aggregates)
+        return {key: result[alias] or 0 for key, alias in self.aliases.items()}
+
+    def run_per_user(self, rollups):
+        """Like run, but grouped by user in the same single query: {user_id: {key: value}}."""
+        if not self.aggregates:
+            return {}
+        rows = rollups.filter(date__gte=self.earliest).values('user_id').annotate(**self.aggregates)
+        return {
+            row['user_id']: {key: row[alias] or 0 for key, alias in self.aliases.items()}
+            for row in rows
+        }
+
+
+def _plan(uc, metrics):
+    """Register the metrics a challenge needs; returns the keys to read them back."""
+    challenge = uc.challenge
+    start, end = challenge_period(uc)
+    category = challenge.category
+
+    if category == 'track':
+        if challenge.challenge_type == 'daily':
+            return {'value': metrics.entries(start, end)}
+        return {'value': metrics.active_days(start, end)}
+    if category == 'budget':
+        return {'value': metrics.spend(start, end)}
+    if category == 'no_spend':
+        excluded = challenge.excluded_categories
+        if not excluded:
+            return {'value': metrics.spend(start, end)}
+        category_ids = get_catalog().category_ids(excluded)
+        if not category_ids:
+            # No expense has ever used these categories, so nothing was spent in them
+            return {}
+        return {'value': metrics.spend(start, end, category_ids)}
+    if category == 'save':
+        # Savings are measured against average spending over the preceding weeks
+        baseline_start = start - timedelta(days=SAVINGS_BASELINE_DAYS)
+        return {
+            'value': metrics.spend(start, end),
+            'baseline': metrics.spend(baseline_start, start - timedelta(days=1)),
+        }
+    return {}
+
+
+def _percent(value, target):
+    if target <= 0:
+        return 100
+    return max(0, min(int(value * 100 / target), 100))
+
+
+def _evaluate(uc, values, today):
+    """New (progress, outcome) for a challenge; outcome is 'completed', 'failed' or None."""
+    challenge = uc.challenge
+    start, end = challenge_period(uc)
+    finished = end < today
+    target = challenge.target_value
+    value = values.get('value', 0)
+    elapsed = _percent(min((today - start).days + 1, (end - start).days + 1), (end - start).days + 1)
+
+    if challenge.category == 'track':
+        progress = _percent(value, target)
+        if value >= target:
+            return progress, 'completed'
+        return progress, 'failed' if finished else None
+
+    if challenge.category in ('budget', 'no_spend'):
+        # Over the limit (any excluded spend, for no_spend) fails immediately
+        if value > target:
+            return 0, 'failed'
+        return elapsed, 'completed' if finished else None
+
+    if challenge.category == 'save':
+        period_days = (end - start).days + 1
+        expected = float(values['baseline']) * period_days / SAVINGS_BASELINE_DAYS
+        saved = expected - float(value)
+        progress = _percent(saved, target)
+        if finished:
+            return progress, 'completed' if saved >= target else 'failed'
+        return progress, None
+
+    return uc.progress, None
+
+
+def complete_challenge(user_challenge, profile):
+    """Mark a challenge as completed and award XP (the caller saves both)."""
+    user_challenge.status = 'completed'
+    user_challenge.completed_at = timezone.now()
+
+    # Award XP with streak bonus if applicable
+    xp = user_challenge.challenge.xp_reward
+    if user_challenge.challenge.streak_bonus:
+        xp = int(xp * profile.streak_multiplier)
+
+    profile.add_xp(xp, source='challenge')
+    profile.challenges_completed += 1
+
+
+def _attach_challenges(user_challenges):
+    # Challenge definitions come from the in-process catalogue instead of a join
+    challenges = get_catalog().challenges
+    for uc in user_challenges:
+        if uc.challenge_id in challenges:
+            uc.challenge = challenges[uc.challenge_id]
+
+
+def _apply(uc, values, profile, today):
+    """Update a challenge (and, on completion, its profile) in memory; True if it changed."""
+    progress, outcome = _evaluate(uc, values, today)
+    if outcome == 'completed':
+        complete_challenge(uc, profile)
+        uc.progress = 100
+    elif outcome == 'failed':
+        uc.status = 'failed'
+        uc.progress = progress
+    elif progress == uc.progress:
+        return False
+    else:
+        uc.progress = progress
+    return True
+
+
+def settle_challenges(user_challenges, profiles, today):
+    """
+    Evaluate the challenges of many profiles at once; returns those that changed.
+
+    ``profiles`` maps profile id to UserProfile. The metrics of every
+    challenge come from one conditional-aggregation query grouped by user, and
+    completion XP is added to the profiles in memory: the caller writes the
+    challenges, profiles and their XP events in bulk.
+    """
+    _attach_challenges(user_challenges)
+    metrics = _MetricQuery()
+    plans = [(uc, _plan(uc, metrics)) for uc in user_challenges]
+    user_ids = {profile.user_id for profile in profiles.values()}
+    results = metrics.run_per_user(ExpenseRollup.objects.filter(user_id__in=user_ids))
+
+    changed = []
+    for uc, plan in plans:
+        profile = profiles[uc.user_profile_id]
+        user_results = results.get(profile.user_id, {})
+        values = {name: user_results.get(key, 0) for name, key in plan.items()}
+        if _apply(uc, values, profile, today):
+            changed.append(uc)
+    return changed
+
+
+def update_challenge_progress(profile, today=None, rollups=None):
+    """
+    Evaluate all of a profile's active challenges in a fixed number of queries.
+
+    Every metric the challenges need (day and week sums, excluded-category
+    spend, distinct days, savings baselines) is computed by one
+    conditional-aggregation query over the rollup table, and the changed rows
+    are written with one bulk_update. Challenges whose day or week is over are
+    settled as completed or failed. Completion XP is added to the profile in
+    memory, to be committed by the surrounding gamification step.
+    """
+    today = today or timezone.localdate()
+    if rollups is None:
+        rollups = ExpenseRollup.objects.for_user(profile.user_id)
+
+    active = list(UserChallenge.objects.filter(
+        user_profile=profile,
+        status='active'
+    ))
+    if not active:
+        return []
+    _attach_challenges(active)
+
+    metrics = _MetricQuery()
+    plans = [(uc, _plan(uc, metrics)) for uc in active]
+    results = metrics.run(rollups)
+
+    changed = [
+        uc for uc, plan in plans
+        if _apply(uc, {name: results[key] for name, key in plan.items()}, profile, today)
+    ]
+    if changed:
+        # bulk_update bypasses the save signals that would invalidate cached pages
+        UserChallenge.objects.bulk_update(changed, ['status', 'progress', 'completed_at'])
+        bump_profile_version(profile.pk)
+    return changed
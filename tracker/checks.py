@@ -0,0 +1,28 @@
+from django.core.checks import Tags, Warning, register
+
+from .caching import get_version_cache
+
+
+# Backends whose entries live in one process only
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_version_cache(app_configs, **kwargs):
+    """The version stamps must be shared, or writes from other processes never invalidate cached pages."""
+    cache = get_version_cache()
+    backend = f"{type(cache).__module__}.{type(cache).__name__}"
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The tracker's version stamps are kept in a per-process cache ({backend}).",
+        hint=(
+            "Writes from management commands, task workers and other web workers will not invalidate "
+            "this process's cached pages or stats ETags. Point TRACKER_VERSION_CACHE_ALIAS at a shared "
+            "cache (file-based or Redis)."
+        ),
+        id='tracker.W001',
+    )]
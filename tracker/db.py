@@ -0,0 +1,136 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Applied to every new SQLite connection; TRACKER_SQLITE_PRAGMAS in settings overrides them
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # Readers no longer block the writer (and vice versa)
+    'synchronous': 'NORMAL',  # Safe with WAL; fsync at checkpoints instead of every commit
+    'busy_timeout': 5000,  # ms to wait for the write lock before "database is locked"
+    'cache_size': -65536,  # Negative = KiB, i.e. 64 MiB of page cache per connection
+    'mmap_size': 268435456,  # Read through a 256 MiB memory map instead of read() calls
+    'temp_store': 'MEMORY',
+}
+
+_read_only = ContextVar('tracker_read_only', default=False)
+
+
+def sqlite_pragmas(alias):
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'TRACKER_SQLITE_PRAGMAS', {})}
+    if alias == read_alias():
+        # Belt and braces: the read alias refuses writes even if a query is misrouted
+        pragmas['query_only'] = 'ON'
+    return pragmas
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Tune each SQLite connection as it is opened."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas(connection.alias).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def read_alias():
+    """The alias read-only views read from, or None when routing is off or it isn't configured."""
+    alias = getattr(settings, 'TRACKER_READ_ALIAS', None)
+    return alias if alias in connections.settings else None
+
+
+def read_only_view(view):
+    """Run a view's reads on the read-only alias; writes still go to the default database."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            # Copied into the threads sync_to_async runs the queries in
+            token = _read_only.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+def run_loads(loads):
+    """Call each of ``{name: callable}`` in turn; returns ``{name: result}``."""
+    return {name: load() for name, load in loads.items()}
+
+
+# Threads (and so database connections) shared by every arun_loads call. A
+# fixed pool, rather than the event loop's default executor, keeps its
+# connections open across requests even when each request gets a fresh loop.
+_load_executor = None
+
+
+def load_executor():
+    global _load_executor
+    if _load_executor is None:
+        _load_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TRACKER_LOAD_WORKERS', 8), thread_name_prefix='tracker-load',
+        )
+    return _load_executor
+
+
+def _pooled(load):
+    def run():
+        # Worker threads outlive requests, so apply CONN_MAX_AGE and health
+        # checks here the way request_started does for request threads
+        close_old_connections()
+        # Counted in the request's Server-Timing (tracker.performance.record_query)
+        return load()
+    return run
+
+
+async def arun_loads(loads):
+    """
+    Run independent ``{name: callable}`` loads concurrently; returns ``{name: result}``.
+
+    Each load runs in a pool thread with its own database connection, so
+    the queries overlap instead of queueing on the request's connection.
+    Loads must not depend on each other or write.
+    """
+    results = await asyncio.gather(*(
+        sync_to_async(_pooled(load), thread_sensitive=False, executor=load_executor())()
+        for load in loads.values()
+    ))
+    return dict(zip(loads, results))
+
+
+class ReadOnlyViewRouter:
+    """Send reads made inside read_only_view views to the read alias."""
+
+    def db_for_read(self, model, **hints):
+        # Reads inside a write transaction must see its uncommitted rows
+        if _read_only.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,68 @@
+import csv
+import json
+
+from .catalog import get_catalog
+from .models import Expense
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ('id', 'date', 'category', 'description', 'amount')
+# The category name is joined in by primary key
+EXPORT_COLUMNS = ('id', 'date', 'category__name', 'description', 'amount')
+
+
+class _Echo:
+    """Pseudo-buffer whose write() hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(user, start=None, end=None, category=None):
+    """A user's expenses to export, oldest first, narrowed by optional date range and category."""
+    expenses = Expense.objects.for_user(user).order_by('date', 'id')
+    if start:
+        expenses = expenses.filter(date__gte=start)
+    if end:
+        expenses = expenses.filter(date__lte=end)
+    if category:
+        category = get_catalog().categories_by_name.get(category)
+        expenses = expenses.filter(category_id=category.pk) if category else expenses.none()
+    return expenses.values_list(*EXPORT_COLUMNS)
+
+
+def iter_csv(rows):
+    """Yield CSV lines, header first, one row at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    """Yield one JSON object per line."""
+    for expense_id, date, category, description, amount in rows:
+        yield json.dumps({
+            'id': expense_id,
+            'date': date.isoformat(),
+            'category': category,
+            'description': description,
+            'amount': str(amount),
+        }) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def export_lines(fmt, user, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Lines of the export in the given format.
+
+    Rows are pulled from a server-side cursor ``chunk_size`` at a time, so
+    memory stays flat however many rows are exported.
+    """
+    serializer = EXPORT_FORMATS[fmt][0]
+    return serializer(export_queryset(user, **filters).iterator(chunk_size=chunk_size))
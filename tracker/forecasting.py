@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - forecasting falls back to a plain average
+    np = None
+
+from .catalog import get_categories
+from .models import ExpenseRollup
+from .money import PAISE_PER_RUPEE, paise
+
+
+HISTORY_DAYS = 120
+SMOOTHING_ALPHA = 0.3
+TREND_WINDOW = 60
+
+
+def load_daily_series(today, rollups=None, history_days=HISTORY_DAYS):
+    """
+    Daily spend for the last ``history_days`` days, loaded in one query.
+
+    Returns (start date, daily totals, {category: daily totals}) as NumPy
+    arrays indexed by day offset from the start; None when there is no data.
+    """
+    if rollups is None:
+        rollups = ExpenseRollup.objects.all()
+
+    since = today - timedelta(days=history_days - 1)
+    rows = list(
+        rollups.filter(date__gte=since, date__lte=today)
+        .order_by().values_list('date', 'category_id', paise('total_amount'))
+    )
+    if not rows:
+        return None
+
+    start = min(row[0] for row in rows)
+    n_days = (today - start).days + 1
+    category_ids = sorted({row[1] for row in rows})
+    category_index = {category_id: i for i, category_id in enumerate(category_ids)}
+
+    offsets = np.array([(row[0] - start).days for row in rows], dtype=np.int64)
+    cat_ids = np.array([category_index[row[1]] for row in rows], dtype=np.int64)
+    # Loaded as integer paise, converted to rupees in one vectorised step
+    amounts = np.array([row[2] for row in rows], dtype=np.int64) / PAISE_PER_RUPEE
+
+    by_category = np.zeros((len(category_ids), n_days))
+    np.add.at(by_category, (cat_ids, offsets), amounts)
+    daily = by_category.sum(axis=0)
+    names = get_categories(category_ids)
+    return start, daily, {names[category_id].name: row for category_id, row in zip(category_ids, by_category)}
+
+
+def _weekday_factors(start, daily):
+    """Mean spend per weekday relative to the overall mean (1.0 = average day)."""
+    weekdays = (np.arange(len(daily)) + start.weekday()) % 7
+    counts = np.bincount(weekdays, minlength=7)
+    sums = np.bincount(weekdays, weights=daily, minlength=7)
+    means = np.divide(sums, counts, out=np.zeros(7), where=counts > 0)
+    overall = daily.mean()
+    if overall <= 0:
+        return np.ones(7)
+    factors = np.where(counts > 0, means / overall, 1.0)
+    return factors * (7 / factors.sum())
+
+
+def _smoothed_level(values, alpha=SMOOTHING_ALPHA):
+    """Simple exponential smoothing level, as one dot product with geometric weights."""
+    weights = alpha * (1 - alpha) ** np.arange(len(values))[::-1]
+    # The oldest observation carries the remaining weight as the initial level
+    weights[0] = (1 - alpha) ** (len(values) - 1)
+    return float(weights @ values)
+
+
+def _slopes(matrix):
+    """Least-squares slope (per day) of every row of a matrix, over its last TREND_WINDOW days."""
+    window = matrix[..., -TREND_WINDOW:]
+    t = np.arange(window.shape[-1], dtype=np.float64)
+    t -= t.mean()
+    denominator = (t ** 2).sum()
+    if denominator == 0:
+        return np.zeros(window.shape[:-1])
+    centered = window - window.mean(axis=-1, keepdims=True)
+    return centered @ t / denominator
+
+
+def fit_forecast(today, rollups=None):
+    """
+    Fit the spending model from the daily series.
+
+    The model combines an exponentially smoothed level on deseasonalized
+    spend, a linear trend, weekday seasonality and per-category trends.
+    Returns plain Python values so the result can be cached; None without data.
+    """
+    if np is None:
+        return _fit_average(today, rollups)
+
+    series = load_daily_series(today, rollups)
+    if series is None:
+        return None
+    start, daily, by_category = series
+
+    factors = _weekday_factors(start, daily)
+    weekdays = (np.arange(len(daily)) + start.weekday()) % 7
+    # Floor the divisor so weekdays that never see spending don't blow up
+    deseasonalized = daily / np.maximum(factors[weekdays], 0.2)
+
+    categories = list(by_category)
+    category_slopes = _slopes(np.array([by_category[name] for name in categories]))
+
+    return {
+        'level': _smoothed_level(deseasonalized),
+        'trend': float(_slopes(deseasonalized)),
+        'weekday_factors': [float(f) for f in factors],
+        'category_trends': {name: float(slope) for name, slope in zip(categories, category_slopes)},
+        'days_observed': len(daily),
+    }
+
+
+def _fit_average(today, rollups=None):
+    """Fallback without NumPy: a flat 30-day average and no seasonality."""
+    if rollups is None:
+        rollups = ExpenseRollup.objects.all()
+    since = today - timedelta(days=29)
+    rows = list(rollups.filter(date__gte=since, date__lte=today).values_list('date', 'total_amount'))
+    if not rows:
+        return None
+    days = (today - min(row[0] for row in rows)).days + 1
+    return {
+        'level': float(sum(row[1] for row in rows)) / days,
+        'trend': 0.0,
+        'weekday_factors': [1.0] * 7,
+        'category_trends': {},
+        'days_observed': days,
+    }
+
+
+def forecast_daily(model, today, horizon=30):
+    """Forecast spend for each of the next ``horizon`` days."""
+    if model is None:
+        return [0.0] * horizon
+
+    forecasts = []
+    for h in range(1, horizon + 1):
+        day = today + timedelta(days=h)
+        base = max(model['level'] + model['trend'] * h, 0.0)
+        forecasts.append(base * model['weekday_factors'][day.weekday()])
+    return forecasts
@@ -0,0 +1,61 @@
+import copy
+
+from django.db import transaction
+
+from .achievements import check_achievements
+from .caching import bump_profile_version
+from .challenges import update_challenge_progress
+
+
+EXPENSE_XP = 10  # Base XP per expense
+MAX_COMMIT_ATTEMPTS = 5
+
+
+class ProfileConflict(Exception):
+    """Raised when a profile keeps changing underneath a gamification update."""
+
+
+def _snapshot(profile):
+    return [copy.copy(getattr(profile, field)) for field in profile.GAMIFICATION_FIELDS]
+
+
+def run_gamification(profile, step):
+    """
+    Run ``step(profile)`` as one atomic unit and persist the profile with a single write.
+
+    The step only mutates the profile in memory. Its changes are written by a
+    version-guarded UPDATE; if another request got there first the transaction
+    is rolled back, the profile reloaded and the step replayed, so no XP is lost.
+    """
+    for _ in range(MAX_COMMIT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                before = _snapshot(profile)
+                result = step(profile)
+                # Read-only outcomes (nothing newly earned) need no write at all
+                if _snapshot(profile) != before:
+                    if not profile.commit_changes():
+                        raise ProfileConflict(profile.pk)
+                    bump_profile_version(profile.pk)
+            return result
+        except ProfileConflict:
+            profile.refresh_from_db()
+    raise ProfileConflict(profile.pk)
+
+
+def expenses_logged(count, day=None):
+    """Gamification step for ``count`` expenses logged on ``day``: streak, XP per expense, achievements and challenges."""
+    def step(profile):
+        profile.expense_count += count
+        profile.update_streak(today=day)
+        for _ in range(count):
+            profile.add_xp(EXPENSE_XP, source='expense')
+        new_achievements = check_achievements(profile)
+        update_challenge_progress(profile)
+        return new_achievements
+    return step
+
+
+def expense_logged(profile):
+    """Gamification step for one new expense: streak, XP, achievements and challenges."""
+    return expenses_logged(1)(profile)
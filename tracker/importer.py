@@ -0,0 +1,287 @@
+import csv
+import hashlib
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .achievements import check_achievements
+from .caching import bump_user_version
+from .catalog import get_category
+from .challenges import update_challenge_progress
+from .gamification import run_gamification
+from .models import Expense, ExpenseRollup
+from .rollups import apply_expense_delta
+
+
+IMPORT_BATCH_SIZE = 1000
+JSON_READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 20
+# The largest amount a single expense has ever been allowed to hold
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class ImportStats:
+    """Counters and timing for one import run."""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return int(self.rows_read / self.elapsed) if self.elapsed else 0
+
+    def add_error(self, row_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Row {row_number}: {message}")
+
+    def summary(self):
+        return (
+            f"{self.rows_read} rows read, {self.inserted} imported, "
+            f"{self.duplicates} duplicates skipped, {self.invalid} invalid "
+            f"in {self.elapsed:.1f}s ({self.rows_per_second} rows/s)"
+        )
+
+
+def iter_csv_rows(stream):
+    """Yield dict rows from a CSV text stream with a header line."""
+    for row in csv.DictReader(stream):
+        yield {(key or '').strip().lower(): value for key, value in row.items()}
+
+
+def iter_json_rows(stream):
+    """
+    Yield objects from a JSON array or JSON Lines text stream.
+
+    Objects are decoded one at a time from a fixed-size read buffer, so the
+    whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = stream.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        if isinstance(obj, dict):
+            obj = {str(key).strip().lower(): value for key, value in obj.items()}
+        yield obj
+
+
+def parse_row(row):
+    """Validate one raw row and return the cleaned fields, or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("expected an object with amount, description, category and date")
+    try:
+        amount = Decimal(str(row.get('amount', '')).strip())
+    except InvalidOperation:
+        raise ValueError("amount is not a number")
+    if not amount.is_finite():
+        raise ValueError("amount is not a number")
+    if amount < 0 or amount.as_tuple().exponent < -2:
+        raise ValueError("amount must be positive with at most two decimals")
+    if amount > MAX_AMOUNT:
+        raise ValueError(f"amount is larger than {MAX_AMOUNT}")
+
+    description = str(row.get('description') or '').strip()
+    if not description or len(description) > 255:
+        raise ValueError("description must be 1-255 characters")
+
+    category = str(row.get('category') or 'General').strip() or 'General'
+    if len(category) > 50:
+        raise ValueError("category is longer than 50 characters")
+
+    try:
+        date = Expense._meta.get_field('date').to_python(str(row.get('date') or '').strip())
+    except ValidationError:
+        raise ValueError("date must be YYYY-MM-DD")
+    if date is None:
+        raise ValueError("date is missing")
+
+    return {
+        'amount': amount,
+        'description': description,
+        'category': category,
+        'date': date,
+        'reference': str(row.get('reference') or row.get('id') or '').strip(),
+    }
+
+
+def row_identity(fields):
+    """What a row is, independent of where it sits in the file: its reference, else its contents."""
+    if fields['reference']:
+        return f"ref|{fields['reference']}"
+    return f"row|{fields['date']}|{fields['amount']}|{fields['category']}|{fields['description']}"
+
+
+def import_key(user, fields, occurrence=0):
+    """
+    Stable identity of an imported row.
+
+    Uses the export's own reference when it has one; otherwise the row's
+    contents plus how many identical rows came before it in the file (two
+    identical coffees on one day are two expenses). The position in the file
+    plays no part, so a re-downloaded statement with rows added at the top
+    matches the rows already imported.
+    """
+    identity = row_identity(fields)
+    if not fields['reference']:
+        identity = f"{identity}|{occurrence}"
+    user_id = user.pk if user else ''
+    return hashlib.sha256(f"{user_id}|{identity}".encode()).hexdigest()
+
+
+def _insert_batch(batch, stats):
+    """Insert the rows of a batch that are not already stored, and fold them into the rollup."""
+    # A key repeated within the batch is stored once, like a key already in the database
+    unique = {}
+    for expense in batch:
+        unique.setdefault(expense.import_key, expense)
+    with transaction.atomic():
+        # Checked inside the write transaction, so every row in ``new`` is really inserted
+        existing = set(Expense.objects.filter(import_key__in=list(unique)).values_list('import_key', flat=True))
+        new = [expense for key, expense in unique.items() if key not in existing]
+        stats.duplicates += len(batch) - len(new)
+        if not new:
+            return
+        Expense.objects.bulk_create(new)
+
+        # bulk_create skips the rollup signals, so apply the batch's deltas directly
+        deltas = {}
+        for expense in new:
+            key = (expense.user_id, expense.date, expense.category_id)
+            amount, count = deltas.get(key, (0, 0))
+            deltas[key] = (amount + expense.amount, count + 1)
+        for (user_id, date, category_id), (amount, count) in deltas.items():
+            apply_expense_delta(user_id, date, category_id, amount, count)
+    stats.inserted += len(new)
+
+
+def streak_from_dates(dates, today):
+    """
+    Streaks implied by a sorted list of distinct expense dates.
+
+    Returns (current streak, longest streak, last date); the current streak is
+    zero when the last date is older than yesterday.
+    """
+    longest = run = 0
+    previous = None
+    for day in dates:
+        run = run + 1 if previous and day == previous + timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous and previous >= today - timedelta(days=1) else 0
+    return current, longest, previous
+
+
+def import_finished(inserted, user):
+    """Gamification step run once per import: counters, streaks, achievements and challenges."""
+    def step(profile):
+        profile.expense_count += inserted
+
+        dates = list(
+            ExpenseRollup.objects.for_user(user)
+            .order_by('date').values_list('date', flat=True).distinct()
+        )
+        current, longest, last_date = streak_from_dates(dates, timezone.now().date())
+        profile.longest_streak = max(profile.longest_streak, longest)
+        if current and (profile.last_expense_date is None or last_date > profile.last_expense_date):
+            profile.current_streak = current
+            profile.last_expense_date = last_date
+            profile.streak_multiplier = profile.multiplier_for_streak(current)
+
+        new_achievements = check_achievements(profile)
+        update_challenge_progress(profile)
+        return new_achievements
+    return step
+
+
+def iter_rows(stream, fmt):
+    """Row iterator for a text stream in the given format ('csv' or 'json')."""
+    if fmt == 'csv':
+        return iter_csv_rows(stream)
+    if fmt == 'json':
+        return iter_json_rows(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def guess_format(filename):
+    """Import format implied by a file name."""
+    return 'json' if filename.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+
+def import_expenses(rows, profile, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Stream raw rows into Expense in batches of ``batch_size``.
+
+    Only one batch is held in memory at a time. Rows already imported (by
+    import_key) are skipped, so an import can safely be re-run. Imported rows
+    earn no per-expense XP; streaks, achievements and challenges are updated
+    once at the end. ``progress`` is called with the stats after each batch.
+    """
+    stats = ImportStats()
+    user = profile.user
+    batch = []
+    seen = {}  # Identity -> rows with it so far
+
+    for row_number, row in enumerate(rows, start=1):
+        stats.rows_read += 1
+        try:
+            fields = parse_row(row)
+        except (ValueError, TypeError) as exc:
+            stats.add_error(row_number, exc)
+            continue
+
+        identity = row_identity(fields)
+        occurrence = seen.get(identity, 0)
+        seen[identity] = occurrence + 1
+        batch.append(Expense(
+            user=user,
+            amount=fields['amount'],
+            description=fields['description'],
+            category=get_category(fields['category']),
+            date=fields['date'],
+            import_key=import_key(user, fields, occurrence),
+        ))
+        if len(batch) >= batch_size:
+            _insert_batch(batch, stats)
+            batch = []
+            stats.elapsed = time.monotonic() - stats.started
+            if progress:
+                progress(stats)
+
+    if batch:
+        _insert_batch(batch, stats)
+
+    if stats.inserted:
+        bump_user_version(profile.user_id)
+        run_gamification(profile, import_finished(stats.inserted, user))
+
+    stats.elapsed = time.monotonic() - stats.started
+    return stats
@@ -0,0 +1,133 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+from .caching import get_cache
+from .models import LeaderboardEntry, UserAchievement, UserChallenge, UserProfile, XPEvent
+
+
+LEADERBOARD_TOP_K = 10
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60
+LEADERBOARD_BATCH_SIZE = 2000
+ALLTIME_START = date(1970, 1, 1)
+
+PERIOD_TYPES = [choice for choice, _ in LeaderboardEntry.PERIOD_CHOICES]
+
+
+def period_start(period_type, today=None):
+    """First day of the current weekly/monthly period; a fixed date for all-time."""
+    today = today or timezone.now().date()
+    if period_type == 'weekly':
+        return today - timedelta(days=today.weekday())
+    if period_type == 'monthly':
+        return today.replace(day=1)
+    return ALLTIME_START
+
+
+def _cache_key(period_type, start):
+    return f"leaderboard:{period_type}:{start.isoformat()}:top{LEADERBOARD_TOP_K}"
+
+
+def _ranked_rows(period_type, start):
+    """(profile id, xp earned, rank) for every profile, ranked in the database."""
+    if period_type == 'alltime':
+        return UserProfile.objects.filter(xp__gt=0).annotate(
+            rank=Window(Rank(), order_by=F('xp').desc()),
+        ).values_list('pk', 'xp', 'rank')
+
+    since = timezone.make_aware(datetime.combine(start, time.min))
+    return XPEvent.objects.filter(created_at__gte=since).order_by().values('user_profile').annotate(
+        total=Sum('xp'),
+    ).annotate(
+        rank=Window(Rank(), order_by=F('total').desc()),
+    ).values_list('user_profile', 'total', 'rank')
+
+
+def _period_counts(queryset, start, period_type, date_field):
+    """Per-profile row counts since the period start (all rows for all-time)."""
+    if period_type != 'alltime':
+        since = timezone.make_aware(datetime.combine(start, time.min))
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    return dict(
+        queryset.order_by().values('user_profile').annotate(n=Count('id')).values_list('user_profile', 'n')
+    )
+
+
+def refresh_leaderboard(period_type, today=None, batch_size=LEADERBOARD_BATCH_SIZE):
+    """
+    Recompute and store the ranks of every profile for the current period.
+
+    Ranks come from a RANK() window over the period's XP, streamed from the
+    database and written in batches; the cached top entries are replaced.
+    Returns the number of ranked profiles.
+    """
+    start = period_start(period_type, today)
+    challenges = _period_counts(
+        UserChallenge.objects.filter(status='completed'), start, period_type, 'completed_at',
+    )
+    achievements = _period_counts(UserAchievement.objects.all(), start, period_type, 'earned_at')
+
+    written = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(period_type=period_type, period_start=start).delete()
+        batch = []
+        for profile_id, xp, rank in _ranked_rows(period_type, start).iterator(chunk_size=batch_size):
+            batch.append(LeaderboardEntry(
+                user_profile_id=profile_id,
+                period_type=period_type,
+                period_start=start,
+                xp_earned=xp,
+                challenges_completed=challenges.get(profile_id, 0),
+                achievements_earned=achievements.get(profile_id, 0),
+                rank=rank,
+            ))
+            if len(batch) >= batch_size:
+                LeaderboardEntry.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            LeaderboardEntry.objects.bulk_create(batch)
+            written += len(batch)
+
+    get_cache().delete(_cache_key(period_type, start))
+    top_entries(period_type, today)
+    return written
+
+
+def _entry_row(entry):
+    profile = entry.user_profile
+    return {
+        'profile_id': profile.pk,
+        'rank': entry.rank,
+        'name': profile.user.username if profile.user else f"Player {profile.pk}",
+        'xp': entry.xp_earned,
+        'level': profile.level,
+        'streak': profile.current_streak,
+    }
+
+
+def top_entries(period_type, today=None):
+    """Top ranked rows for the current period, served from cache once computed."""
+    start = period_start(period_type, today)
+    key = _cache_key(period_type, start)
+    cache = get_cache()
+    rows = cache.get(key)
+    if rows is None:
+        entries = LeaderboardEntry.objects.filter(
+            period_type=period_type, period_start=start,
+        ).select_related('user_profile__user').order_by('rank', 'user_profile_id')[:LEADERBOARD_TOP_K]
+        rows = [_entry_row(entry) for entry in entries]
+        cache.set(key, rows, LEADERBOARD_CACHE_TIMEOUT)
+    return rows
+
+
+def rank_of(profile, period_type, today=None):
+    """The profile's stored entry for the current period, via the unique index; None if unranked."""
+    return LeaderboardEntry.objects.filter(
+        user_profile=profile,
+        period_type=period_type,
+        period_start=period_start(period_type, today),
+    ).first()
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from .caching import bump_profile_version
+from .models import UserProfile, XPEvent, level_for_xp
+
+
+def unlocks_for_level(level):
+    """Themes and insights a profile holds at the given level."""
+    themes, insights = ['dark'], []
+    for reward_level, reward in sorted(UserProfile.LEVEL_REWARDS.items()):
+        if reward_level <= level:
+            themes.append(reward['theme'])
+            insights.append(reward['insight'])
+    return themes, insights
+
+
+def _reprice_events(batch_size):
+    """Re-apply XPEvent.award to every event, returning the new XP total per profile."""
+    totals = {}
+    changed = []
+    for event in XPEvent.objects.order_by('pk').iterator(chunk_size=batch_size):
+        xp = XPEvent.award(event.amount, event.multiplier)
+        if xp != event.xp:
+            event.xp = xp
+            changed.append(event)
+        totals[event.user_profile_id] = totals.get(event.user_profile_id, 0) + xp
+        if len(changed) >= batch_size:
+            XPEvent.objects.bulk_update(changed, ['xp'])
+            changed = []
+    if changed:
+        XPEvent.objects.bulk_update(changed, ['xp'])
+    return totals
+
+
+def replay_xp(batch_size=1000, reprice=False):
+    """
+    Rebuild every profile's XP, level and unlocks from the XP ledger.
+
+    With ``reprice`` the current reward formula is first re-applied to each
+    event, so a formula change is rolled out in one batch. Rewritten profiles
+    get their version bumped, so their cached pages are rebuilt. Returns the
+    number of profiles whose totals changed.
+    """
+    with transaction.atomic():
+        if reprice:
+            totals = _reprice_events(batch_size)
+        else:
+            totals = dict(
+                XPEvent.objects.order_by().values('user_profile')
+                .annotate(total=Sum('xp')).values_list('user_profile', 'total')
+            )
+
+        fields = ['xp', 'level', 'unlocked_themes', 'unlocked_insights', 'version']
+        updated = 0
+        batch = []
+        for profile in UserProfile.objects.only('pk', *fields).iterator(chunk_size=batch_size):
+            xp = totals.get(profile.pk, 0)
+            level = level_for_xp(xp)
+            if (xp, level) == (profile.xp, profile.level):
+                continue
+            profile.xp = xp
+            profile.level = level
+            profile.unlocked_themes, profile.unlocked_insights = unlocks_for_level(level)
+            profile.version += 1
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                updated += _write_profiles(batch, fields)
+                batch = []
+        if batch:
+            updated += _write_profiles(batch, fields)
+    return updated
+
+
+def _write_profiles(profiles, fields):
+    UserProfile.objects.bulk_update(profiles, fields)
+    for profile in profiles:
+        bump_profile_version(profile.pk)
+    return len(profiles)
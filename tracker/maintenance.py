@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from django.db import OperationalError, transaction
+from django.db.models import F, Max, Min, Q
+
+from .caching import bump_profile_version
+from .challenges import settle_challenges, start_of_day
+from .models import UserChallenge, UserProfile, XPEvent
+
+
+MAINTENANCE_CHUNK_SIZE = 5000
+MAX_CHUNK_ATTEMPTS = 5
+STAT_KEYS = ('profiles', 'streaks_reset', 'challenges_completed', 'challenges_failed')
+
+
+def chunk_ranges(chunk_size=MAINTENANCE_CHUNK_SIZE):
+    """Primary-key ranges [low, high) covering every profile."""
+    bounds = UserProfile.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    return [
+        (low, low + chunk_size)
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size)
+    ]
+
+
+def _decay_streaks(profiles, today):
+    """
+    Reset the streak and multiplier of profiles that missed yesterday.
+
+    The reset is a single UPDATE that re-checks the staleness condition and
+    bumps the optimistic version, so a profile that logs an expense while the
+    job runs is neither reset nor overwritten.
+    """
+    stale = profiles.filter(
+        Q(last_expense_date__lt=today - timedelta(days=1)) | Q(last_expense_date__isnull=True),
+    ).filter(Q(current_streak__gt=0) | Q(streak_multiplier__gt=1.0))
+    stale_ids = list(stale.values_list('pk', flat=True))
+    if not stale_ids:
+        return 0
+
+    reset = stale.filter(pk__in=stale_ids).update(
+        current_streak=0,
+        streak_multiplier=UserProfile.multiplier_for_streak(0),
+        version=F('version') + 1,
+    )
+    for profile_id in stale_ids:
+        bump_profile_version(profile_id)
+    return reset
+
+
+def _expire_challenges(profile_ids, today, stats):
+    """
+    Settle active challenges whose day or week ended before today.
+
+    The chunk's expired challenges are evaluated together and written with one
+    bulk_update, and their owners' completion XP with one more plus a
+    bulk_create of the XP events. Call inside a transaction: its write lock
+    is taken at BEGIN, so no request changes these profiles in between, and
+    the version bump makes any step already in flight replay on top.
+    """
+    start_of_today = start_of_day(today)
+    start_of_week = start_of_day(today - timedelta(days=today.weekday()))
+    expired = list(UserChallenge.objects.filter(user_profile_id__in=profile_ids, status='active').filter(
+        Q(challenge__challenge_type='daily', started_at__lt=start_of_today)
+        | Q(challenge__challenge_type='weekly', started_at__lt=start_of_week)
+    ))
+    if not expired:
+        return
+
+    owners = UserProfile.objects.in_bulk({uc.user_profile_id for uc in expired})
+    settled = settle_challenges(expired, owners, today)
+    UserChallenge.objects.bulk_update(settled, ['status', 'progress', 'completed_at'])
+
+    awarded = [profile for profile in owners.values() if profile.pending_xp_events]
+    for profile in awarded:
+        profile.version += 1
+    UserProfile.objects.bulk_update(awarded, [*UserProfile.GAMIFICATION_FIELDS, 'version'])
+    XPEvent.objects.bulk_create([event for profile in awarded for event in profile.pending_xp_events])
+
+    for profile_id in {uc.user_profile_id for uc in settled}:
+        bump_profile_version(profile_id)
+    for uc in settled:
+        if uc.status == 'completed':
+            stats['challenges_completed'] += 1
+        elif uc.status == 'failed':
+            stats['challenges_failed'] += 1
+
+
+def _process_chunk(low, high, today):
+    stats = dict.fromkeys(STAT_KEYS, 0)
+    profiles = UserProfile.objects.filter(pk__gte=low, pk__lt=high)
+
+    profile_ids = list(profiles.values_list('pk', flat=True))
+    stats['profiles'] = len(profile_ids)
+    if not profile_ids:
+        return stats
+
+    with transaction.atomic():
+        # Expire first: settling a weekly challenge may still use the streak multiplier
+        _expire_challenges(profile_ids, today, stats)
+        stats['streaks_reset'] = _decay_streaks(profiles, today)
+    return stats
+
+
+def process_chunk(low, high, today_iso):
+    """
+    Run nightly maintenance for profiles with low <= pk < high; returns the chunk's counters.
+
+    Every write only touches rows that still need it, so a chunk that hits a
+    lock held by another worker (SQLite allows one writer) is simply rerun.
+    """
+    today = date.fromisoformat(today_iso)
+    for attempt in range(1, MAX_CHUNK_ATTEMPTS + 1):
+        try:
+            return _process_chunk(low, high, today)
+        except OperationalError:
+            if attempt == MAX_CHUNK_ATTEMPTS:
+                raise
+            time.sleep(0.1 * 2 ** attempt)
+
+
+def init_worker():
+    """Process-pool initializer: make sure each worker opens its own database connection."""
+    import django
+    from django.db import connections
+
+    django.setup()
+    connections.close_all()
+
+
+class Checkpoint:
+    """Completed chunks of a maintenance run, persisted as JSON so an interrupted run can resume."""
+
+    def __init__(self, path, run_date, resume=False):
+        self.path = path
+        self.run_date = run_date
+        self.done = set()
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('run_date') == run_date:
+                self.done = {tuple(chunk) for chunk in saved['done']}
+                self.stats.update(saved['stats'])
+
+    def record(self, chunk, chunk_stats):
+        self.done.add(tuple(chunk))
+        for key, value in chunk_stats.items():
+            self.stats[key] += value
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'run_date': self.run_date,
+                'done': sorted(self.done),
+                'stats': self.stats,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def finish(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def throughput(profiles, started):
+    elapsed = time.monotonic() - started
+    return elapsed, (int(profiles / elapsed) if elapsed else 0)
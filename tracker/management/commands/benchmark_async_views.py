@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from tracker.benchmarks import ASYNC_VIEW_PAIRS, run_async_comparison
+
+
+class Command(BaseCommand):
+    help = "Compare p50/p99 latency of the sync dashboard and predictions views with their async twins."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per view.")
+        parser.add_argument('--warm', action='store_true', help="Keep the page cache between requests.")
+
+    def handle(self, *args, **options):
+        results = run_async_comparison(
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            warm=options['warm'],
+        )
+        self.stdout.write(f"{'view':20} {'req/s':>8} {'p50':>9} {'p99':>9}")
+        for pair in ASYNC_VIEW_PAIRS:
+            for name in pair:
+                result = results[name]
+                self.stdout.write(
+                    f"{name:20} {result['requests_per_s']:>8.1f} {result['p50']:>7.2f}ms {result['p99']:>7.2f}ms"
+                )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from tracker.benchmarks import DB_PROFILES, WORKLOAD_WRITE_RATIO, run_db_workload
+
+
+class Command(BaseCommand):
+    help = "Compare the tuned SQLite layer with SQLite's defaults under concurrent reads and writes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=sorted(DB_PROFILES),
+                            help="Configuration to run (repeatable; default: all).")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per configuration.")
+        parser.add_argument('--write-ratio', type=float, default=WORKLOAD_WRITE_RATIO,
+                            help="Fraction of requests that add an expense.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'profile':10} {'req/s':>8} {'reads':>7} {'writes':>7} {'p50':>9} {'p95':>9} "
+            f"{'read p95':>9} {'write p95':>9} {'locked':>7} {'errors':>7}"
+        )
+        for profile in options['profile'] or DB_PROFILES:
+            result = run_db_workload(
+                profile,
+                workers=options['workers'],
+                duration=options['duration'],
+                write_ratio=options['write_ratio'],
+                seed=options['seed'],
+            )
+            self.stdout.write(
+                f"{profile:10} {result['requests_per_s']:>8.1f} {result['reads']:>7} {result['writes']:>7} "
+                f"{result['p50']:>7.2f}ms {result['p95']:>7.2f}ms {result['read_p95']:>7.2f}ms "
+                f"{result['write_p95']:>7.2f}ms {result['locked']:>7} {result['errors']:>7}"
+            )
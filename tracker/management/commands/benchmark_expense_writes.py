@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from tracker.benchmarks import DB_PROFILES, INSERT_CONCURRENCY, run_insert_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure add_expense inserts per second with and without the group-commit writer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, action='append',
+                            help="Concurrent clients (repeatable; default: 1, 8 and 64).")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per run.")
+        parser.add_argument('--profile', choices=sorted(DB_PROFILES), default='tuned',
+                            help="Database configuration to run against.")
+
+    def handle(self, *args, **options):
+        results = run_insert_benchmark(
+            concurrency=options['clients'] or INSERT_CONCURRENCY,
+            duration=options['duration'],
+            profile=options['profile'],
+        )
+        self.stdout.write(
+            f"{'mode':8} {'clients':>8} {'inserts/s':>10} {'rows/commit':>12} {'p50':>9} {'p99':>10} "
+            f"{'locked':>7} {'errors':>7}"
+        )
+        for (mode, clients), result in results.items():
+            self.stdout.write(
+                f"{mode:8} {clients:>8} {result['inserts_per_s']:>10.1f} {result['rows_per_commit']:>12.1f} "
+                f"{result['p50']:>7.2f}ms "
+                f"{result['p99']:>8.2f}ms {result['locked']:>7} {result['errors']:>7}"
+            )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from tracker.benchmarks import MONEY_BENCHMARK_ROWS, MONEY_BENCHMARK_USERS, run_money_benchmark
+
+
+class Command(BaseCommand):
+    help = "Compare aggregate speed over decimal amounts and integer paise (default 10M rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=MONEY_BENCHMARK_ROWS)
+        parser.add_argument('--users', type=int, default=MONEY_BENCHMARK_USERS)
+        parser.add_argument('--repeats', type=int, default=3, help="Runs per case; the best is reported.")
+
+    def handle(self, *args, **options):
+        results = run_money_benchmark(
+            rows=options['rows'],
+            users=options['users'],
+            repeats=options['repeats'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(f"{'case':14} {'decimal':>11} {'paise':>11} {'speedup':>8}")
+        for case, result in results.items():
+            if case in ('size_mb', 'decimal_total_error'):
+                continue
+            self.stdout.write(
+                f"{case:14} {result['decimal']:>9.1f}ms {result['paise']:>9.1f}ms "
+                f"{result['decimal'] / result['paise']:>7.2f}x"
+            )
+        size = results['size_mb']
+        self.stdout.write(f"database size: decimal {size['decimal']} MB, paise {size['paise']} MB")
+        self.stdout.write(f"decimal total off by {results['decimal_total_error']} rupees")
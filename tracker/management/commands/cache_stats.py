@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tracker.caching import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the per-profile page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing.")
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']}"
+        )
+        if options['reset']:
+            reset_cache_stats()
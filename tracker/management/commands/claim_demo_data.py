@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tracker.caching import bump_profile_version, bump_user_version
+from tracker.models import Expense, ExpenseRollup, UserProfile
+from tracker.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Give the expenses and profile stored before sign-in existed (those with no user) "
+        "to an account, so they show up in its pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Username to give the data to.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        with transaction.atomic():
+            legacy = list(UserProfile.objects.filter(user=None).order_by('pk'))
+            if len(legacy) > 1:
+                raise CommandError(f"{len(legacy)} profiles have no user; expected at most one")
+            if legacy and UserProfile.objects.filter(user=user).exists():
+                raise CommandError(
+                    f"{user.username!r} already has a profile; claim the data with a new account "
+                    f"so the demo profile's XP, achievements and challenges come with it"
+                )
+
+            moved = Expense.objects.filter(user=None).update(user=user)
+            # Rows from both owners may share a day and category: recompute instead of merging
+            ExpenseRollup.objects.filter(user=None).delete()
+            rebuild_rollups(user_ids=[user.pk])
+            if legacy:
+                profile = legacy[0]
+                profile.user = user
+                profile.save(update_fields=['user'])
+                bump_profile_version(profile.pk)
+            bump_user_version(user.pk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Gave {moved} expenses{' and the demo profile' if legacy else ''} to {user.username}."
+        ))
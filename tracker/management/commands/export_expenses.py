@@ -0,0 +1,45 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exporter import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+from tracker.models import Expense
+
+
+class Command(BaseCommand):
+    help = "Stream expenses to a CSV or NDJSON file with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+        parser.add_argument('--start', help="First date to include (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last date to include (YYYY-MM-DD).")
+        parser.add_argument('--category')
+        parser.add_argument('--user', required=True, help="Username to export for.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        date_field = Expense._meta.get_field('date')
+        try:
+            start = date_field.to_python(options['start'])
+            end = date_field.to_python(options['end'])
+        except ValidationError:
+            raise CommandError("Dates must be YYYY-MM-DD")
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        lines = export_lines(
+            options['format'], user,
+            chunk_size=options['chunk_size'],
+            start=start, end=end, category=options['category'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.synthetic import SYNTHETIC_BATCH_SIZE, SyntheticData
+
+
+class Command(BaseCommand):
+    help = "Fill the database with seeded synthetic users, expenses and gamification history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--expenses-per-user', type=int, default=1000,
+                            help="Average expenses per user (default 1000, i.e. 10M for 10k users).")
+        parser.add_argument('--days', type=int, default=365, help="Days of history to spread expenses over.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=SYNTHETIC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(counts):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {counts['users']} users, {counts['expenses']} expenses "
+                f"({int(counts['expenses'] / elapsed) if elapsed else 0} expenses/s)"
+            )
+
+        generator = SyntheticData(
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+        counts = generator.generate(users=options['users'], expenses_per_user=options['expenses_per_user'])
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in counts.items())
+            + f" in {time.monotonic() - started:.1f}s"
+        ))
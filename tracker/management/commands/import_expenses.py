@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importer import IMPORT_BATCH_SIZE, guess_format, import_expenses, iter_rows
+from tracker.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Stream expenses from a CSV or JSON file into the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--user', required=True, help="Username to import for.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        profile, _ = UserProfile.objects.get_or_create(
+            user=user,
+            defaults={'unlocked_themes': ['dark'], 'unlocked_insights': []},
+        )
+
+        fmt = options['format'] or guess_format(options['path'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            stats = import_expenses(
+                iter_rows(stream, fmt),
+                profile,
+                batch_size=options['batch_size'],
+                progress=lambda s: self.stdout.write(
+                    f"  {s.rows_read} rows, {s.inserted} imported ({s.rows_per_second} rows/s)"
+                ),
+            )
+
+        for error in stats.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(stats.summary()))
@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from tracker.maintenance import (
+    MAINTENANCE_CHUNK_SIZE, Checkpoint, chunk_ranges, init_worker, process_chunk, throughput,
+)
+
+
+class Command(BaseCommand):
+    help = "Expire finished challenges and decay stale streaks for every profile, in parallel chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=MAINTENANCE_CHUNK_SIZE,
+                            help="Profiles per primary-key chunk.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (1 runs in this process).")
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / 'nightly_maintenance.checkpoint.json'),
+                            help="File recording finished chunks (default: next to manage.py).")
+        parser.add_argument('--resume', action='store_true',
+                            help="Skip chunks already finished by an interrupted run for the same day.")
+        parser.add_argument('--date', help="Run as of this date (YYYY-MM-DD; default: today).")
+
+    def handle(self, *args, **options):
+        today = options['date'] or timezone.localdate().isoformat()
+        checkpoint = Checkpoint(options['checkpoint'], today, resume=options['resume'])
+        pending = [chunk for chunk in chunk_ranges(options['chunk_size']) if chunk not in checkpoint.done]
+        if checkpoint.done:
+            self.stdout.write(f"Resuming: {len(checkpoint.done)} chunks already done, {len(pending)} left")
+
+        started = time.monotonic()
+        processed = 0
+        for chunk, stats in self._run(pending, today, options['workers']):
+            checkpoint.record(chunk, stats)
+            processed += stats['profiles']
+            elapsed, rate = throughput(processed, started)
+            self.stdout.write(
+                f"  pks {chunk[0]}-{chunk[1] - 1}: {stats['profiles']} profiles "
+                f"({processed} this run, {rate} profiles/s)"
+            )
+
+        elapsed, rate = throughput(processed, started)
+        totals = checkpoint.stats
+        checkpoint.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['profiles']} profiles: {totals['streaks_reset']} streaks reset, "
+            f"{totals['challenges_completed']} challenges completed, "
+            f"{totals['challenges_failed']} failed in {elapsed:.2f}s ({rate} profiles/s)"
+        ))
+
+    def _run(self, chunks, today, workers):
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield chunk, process_chunk(*chunk, today)
+            return
+
+        # Forked workers must not share the parent's open connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = {pool.submit(process_chunk, *chunk, today): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
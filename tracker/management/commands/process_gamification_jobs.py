@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.tasks import (
+    JOB_BATCH_SIZE, WORKER_POLL_SECONDS, purge_finished_jobs, requeue_stale_jobs, run_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Run queued gamification jobs; a worker process for deployments without in-process workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument('--poll', type=float, default=WORKER_POLL_SECONDS, help="Seconds between polls.")
+        parser.add_argument('--batch-size', type=int, default=JOB_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_jobs()
+            ran = 0
+            while True:
+                batch = run_pending_jobs(limit=options['batch_size'])
+                ran += batch
+                if batch < options['batch_size']:
+                    break
+            purged = purge_finished_jobs()
+            if ran or requeued or purged or not options['loop']:
+                self.stdout.write(f"Ran {ran} jobs, requeued {requeued} stale, purged {purged} finished")
+            if not options['loop']:
+                return
+            time.sleep(options['poll'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tracker.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily/category expense rollup table from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows."))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.leaderboard import LEADERBOARD_BATCH_SIZE, PERIOD_TYPES, refresh_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recompute leaderboard ranks for the current weekly, monthly and all-time periods."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', choices=PERIOD_TYPES, action='append',
+                            help="Period to refresh (repeatable; default: all).")
+        parser.add_argument('--batch-size', type=int, default=LEADERBOARD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for period_type in options['period'] or PERIOD_TYPES:
+            started = time.monotonic()
+            ranked = refresh_leaderboard(period_type, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"{period_type}: ranked {ranked} profiles in {time.monotonic() - started:.2f}s"
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tracker.ledger import replay_xp
+
+
+class Command(BaseCommand):
+    help = "Rebuild every profile's XP and level from the XP event ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--reprice', action='store_true',
+            help="Re-apply the current reward formula to every ledger event first.",
+        )
+
+    def handle(self, *args, **options):
+        updated = replay_xp(batch_size=options['batch_size'], reprice=options['reprice'])
+        self.stdout.write(self.style.SUCCESS(f"Replayed XP ledger; {updated} profiles changed."))
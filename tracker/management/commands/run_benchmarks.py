@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.benchmarks import (
+    BENCHMARK_ITERATIONS, REGRESSION_TOLERANCE, load_baseline, regressions, run_benchmarks, save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = "Measure latency percentiles and query counts of every page and core function against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=BENCHMARK_ITERATIONS)
+        parser.add_argument('--warm', action='store_true', help="Keep the page cache between iterations.")
+        parser.add_argument('--only', action='append', help="Only cases whose name starts with this (repeatable).")
+        parser.add_argument('--user', help="Username to run as (default: the user with the most expenses).")
+        parser.add_argument('--baseline', default='benchmark_baseline.json')
+        parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline.")
+        parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                            help="Allowed p95 slowdown as a fraction of the baseline.")
+
+    def handle(self, *args, **options):
+        baseline = load_baseline(options['baseline'])
+        self.stdout.write(f"{'case':32} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'base p95':>9}")
+
+        def progress(name, result):
+            before = baseline.get(name, {}).get('p95')
+            self.stdout.write(
+                f"{name:32} {result['p50']:>7.2f}ms {result['p95']:>7.2f}ms {result['p99']:>7.2f}ms "
+                f"{result['queries']:>8} " + (f"{before:>7.2f}ms" if before is not None else f"{'-':>9}")
+            )
+
+        results = run_benchmarks(
+            iterations=options['iterations'],
+            warm=options['warm'],
+            only=options['only'],
+            username=options['user'],
+            progress=progress,
+        )
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], {**baseline, **results})
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}"))
+            return
+
+        found = regressions(results, baseline, options['tolerance'])
+        for line in found:
+            self.stderr.write(f"REGRESSION {line}")
+        if found:
+            raise CommandError(f"{len(found)} benchmark regressions")
+        if baseline:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
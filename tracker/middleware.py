@@ -0,0 +1,103 @@
+import json
+import logging
+import time
+import tracemalloc
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .performance import RequestMetrics, activate, deactivate, histograms, perf_setting
+
+
+logger = logging.getLogger('tracker.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Per-request SQL, template and allocation timings.
+
+    Every request gets a ``Server-Timing`` header (visible in the browser's
+    network panel), one JSON log line on the ``tracker.performance`` logger,
+    and a sample in the rolling per-route histograms served at perf/.
+    Allocation tracing is costly and only runs with TRACKER_PERF_TRACE_ALLOCATIONS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_query_count = perf_setting('SLOW_QUERIES', 3)
+        self.trace_allocations = perf_setting('TRACE_ALLOCATIONS', False)
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # Runs natively under ASGI instead of forcing the stack through a thread
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics(self.slow_query_count)
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+        return metrics, activate(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        if self.trace_allocations:
+            metrics.peak_bytes = tracemalloc.get_traced_memory()[1]
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        histograms.record(route, total_ms, metrics.sql_ms, metrics.query_count, metrics.template_ms)
+
+        response['Server-Timing'] = self.server_timing(metrics, total_ms)
+        logger.info(json.dumps(self.log_record(request, response, route, metrics, total_ms)))
+        return response
+
+    @staticmethod
+    def server_timing(metrics, total_ms):
+        app_ms = max(total_ms - metrics.sql_ms - metrics.template_ms, 0.0)
+        entries = [
+            f'sql;dur={metrics.sql_ms:.2f};desc="{metrics.query_count} queries"',
+            f'sql-slowest;dur={metrics.slow_sql_ms:.2f};desc="top {len(metrics.slowest)} queries"',
+            f'template;dur={metrics.template_ms:.2f}',
+            f'app;dur={app_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ]
+        if metrics.peak_bytes is not None:
+            entries.append(f'alloc;desc="peak {metrics.peak_bytes / 1024:.0f} KiB"')
+        return ', '.join(entries)
+
+    @staticmethod
+    def log_record(request, response, route, metrics, total_ms):
+        return {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'sql_ms': round(metrics.sql_ms, 2),
+            'queries': metrics.query_count,
+            'template_ms': round(metrics.template_ms, 2),
+            'slowest_queries': [{'ms': round(ms, 2), 'sql': sql[:200]} for ms, sql in metrics.slowest],
+            'peak_alloc_bytes': metrics.peak_bytes,
+        }
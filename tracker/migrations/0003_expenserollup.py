@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+    grouped = (
+        Expense.objects.order_by()
+        .values('user_id', 'date', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    ExpenseRollup.objects.bulk_create(
+        [
+            ExpenseRollup(
+                user_id=row['user_id'], date=row['date'], category=row['category'],
+                total_amount=row['total'], expense_count=row['count'],
+            )
+            for row in grouped.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_achievement_challenge_expense_category_expense_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date', 'category'],
+                'unique_together': {('user', 'date', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
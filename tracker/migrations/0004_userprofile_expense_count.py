@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:40
+
+from django.db import migrations, models
+
+
+def backfill_expense_count(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    UserProfile = apps.get_model('tracker', 'UserProfile')
+    for profile in UserProfile.objects.all():
+        profile.expense_count = Expense.objects.filter(user_id=profile.user_id).count()
+        profile.save(update_fields=['expense_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_expenserollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='expense_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_expense_count, migrations.RunPython.noop),
+    ]
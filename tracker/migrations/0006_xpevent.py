@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    """Record existing XP as one adjustment event per profile so replays start from it."""
+    UserProfile = apps.get_model('tracker', 'UserProfile')
+    XPEvent = apps.get_model('tracker', 'XPEvent')
+    XPEvent.objects.bulk_create(
+        [
+            XPEvent(user_profile=profile, source='adjustment', amount=profile.xp, multiplier=1.0, xp=profile.xp)
+            for profile in UserProfile.objects.filter(xp__gt=0)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_userprofile_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('expense', 'Expense Logged'), ('achievement', 'Achievement'), ('challenge', 'Challenge'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.IntegerField()),
+                ('multiplier', models.FloatField(default=1.0)),
+                ('xp', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_events', to='tracker.userprofile')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['user_profile', 'created_at'], name='tracker_xpe_user_pr_25044f_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_expense_import_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['period_type', 'period_start', 'rank'], name='tracker_lea_period__4352b9_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_leaderboardentry_rank_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='tracker_exp_date_5abd76_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date'], name='tracker_exp_user_id_bcd9ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['category', 'date'], name='tracker_exp_categor_50bf58_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserollup',
+            index=models.Index(fields=['date', 'category', 'total_amount', 'expense_count'], name='tracker_exp_date_d26a83_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userchallenge',
+            index=models.Index(fields=['user_profile', 'status', 'started_at'], name='tracker_use_user_pr_4b29fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userchallenge',
+            index=models.Index(fields=['status', 'completed_at'], name='tracker_use_status_00710e_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='tracker_exp_date_5abd76_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='tracker_exp_user_id_bcd9ed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='tracker_exp_categor_50bf58_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expenserollup',
+            name='tracker_exp_date_d26a83_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='tracker_exp_user_id_3388a6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', 'date'], name='tracker_exp_user_id_b0ce32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserollup',
+            index=models.Index(fields=['user', 'date', 'category', 'total_amount', 'expense_count'], name='tracker_exp_user_id_81a293_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_per_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('logged_on', models.DateField()),
+                ('expenses', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('new_achievements', models.JSONField(default=list)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gamification_jobs', to='tracker.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='tracker_gam_status_c9eef4_idx'), models.Index(fields=['user_profile', 'status'], name='tracker_gam_user_pr_458775_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('user_profile', 'logged_on'), name='one_pending_gamification_job_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+
+# The catalogue every install starts with; edit it afterwards in the admin
+ACHIEVEMENTS = [
+    # Bronze Tier
+    {'name': 'First Steps', 'description': 'Log your first expense', 'icon': '👣',
+     'tier': 'bronze', 'xp_reward': 25, 'condition_type': 'expense_count', 'condition_value': 1},
+    {'name': 'Getting Started', 'description': 'Log 10 expenses', 'icon': '🌱',
+     'tier': 'bronze', 'xp_reward': 50, 'condition_type': 'expense_count', 'condition_value': 10},
+    {'name': 'Streak Starter', 'description': 'Maintain a 3-day streak', 'icon': '🔥',
+     'tier': 'bronze', 'xp_reward': 50, 'condition_type': 'streak', 'condition_value': 3},
+
+    # Silver Tier
+    {'name': 'Consistent Tracker', 'description': 'Log 50 expenses', 'icon': '📊',
+     'tier': 'silver', 'xp_reward': 100, 'condition_type': 'expense_count', 'condition_value': 50},
+    {'name': 'Week Warrior', 'description': 'Maintain a 7-day streak', 'icon': '⚔️',
+     'tier': 'silver', 'xp_reward': 100, 'condition_type': 'streak', 'condition_value': 7},
+    {'name': 'Challenge Accepted', 'description': 'Complete 5 challenges', 'icon': '🎯',
+     'tier': 'silver', 'xp_reward': 100, 'condition_type': 'challenges', 'condition_value': 5},
+
+    # Gold Tier
+    {'name': 'Century Club', 'description': 'Log 100 expenses', 'icon': '💯',
+     'tier': 'gold', 'xp_reward': 200, 'condition_type': 'expense_count', 'condition_value': 100},
+    {'name': 'Fortnight Fighter', 'description': 'Maintain a 14-day streak', 'icon': '🛡️',
+     'tier': 'gold', 'xp_reward': 200, 'condition_type': 'streak', 'condition_value': 14},
+    {'name': 'Challenge Champion', 'description': 'Complete 15 challenges', 'icon': '🏅',
+     'tier': 'gold', 'xp_reward': 200, 'condition_type': 'challenges', 'condition_value': 15},
+
+    # Platinum Tier
+    {'name': 'Expense Expert', 'description': 'Log 250 expenses', 'icon': '🎓',
+     'tier': 'platinum', 'xp_reward': 350, 'condition_type': 'expense_count', 'condition_value': 250},
+    {'name': 'Month Master', 'description': 'Maintain a 30-day streak', 'icon': '🌙',
+     'tier': 'platinum', 'xp_reward': 350, 'condition_type': 'streak', 'condition_value': 30},
+
+    # Diamond Tier
+    {'name': 'Financial Legend', 'description': 'Log 500 expenses', 'icon': '👑',
+     'tier': 'diamond', 'xp_reward': 500, 'condition_type': 'expense_count', 'condition_value': 500},
+    {'name': 'Streak Immortal', 'description': 'Maintain a 60-day streak', 'icon': '💎',
+     'tier': 'diamond', 'xp_reward': 500, 'condition_type': 'streak', 'condition_value': 60},
+]
+
+CHALLENGES = [
+    # Daily Challenges
+    {'title': 'No Dining Out Today', 'description': 'Avoid restaurant expenses for 24 hours',
+     'icon': '🍽️', 'challenge_type': 'daily', 'category': 'no_spend',
+     'target_value': 0, 'xp_reward': 30, 'excluded_categories': ['Food', 'Dining', 'Restaurant']},
+    {'title': 'Minimalist Monday', 'description': 'Spend less than ₹500 today',
+     'icon': '💰', 'challenge_type': 'daily', 'category': 'budget',
+     'target_value': 500, 'xp_reward': 35},
+    {'title': 'Track Everything', 'description': 'Log at least 3 expenses today',
+     'icon': '📝', 'challenge_type': 'daily', 'category': 'track',
+     'target_value': 3, 'xp_reward': 25},
+    {'title': 'No Impulse Day', 'description': 'No shopping/entertainment expenses',
+     'icon': '🛒', 'challenge_type': 'daily', 'category': 'no_spend',
+     'target_value': 0, 'xp_reward': 40, 'excluded_categories': ['Shopping', 'Entertainment']},
+
+    # Weekly Challenges
+    {'title': 'Frugal Week', 'description': 'Keep weekly spending under ₹5000',
+     'icon': '📉', 'challenge_type': 'weekly', 'category': 'budget',
+     'target_value': 5000, 'xp_reward': 100},
+    {'title': 'Tracking Champion', 'description': 'Log expenses every day this week',
+     'icon': '🏆', 'challenge_type': 'weekly', 'category': 'track',
+     'target_value': 7, 'xp_reward': 150, 'streak_bonus': True},
+    {'title': 'Home Cook Hero', 'description': 'No dining out for a week',
+     'icon': '👨‍🍳', 'challenge_type': 'weekly', 'category': 'no_spend',
+     'target_value': 0, 'xp_reward': 200, 'excluded_categories': ['Food', 'Dining', 'Restaurant']},
+    {'title': 'Savings Sprint', 'description': 'Save at least ₹1000 this week',
+     'icon': '🏃', 'challenge_type': 'weekly', 'category': 'save',
+     'target_value': 1000, 'xp_reward': 175},
+]
+
+
+
+def seed_catalog(apps, schema_editor):
+    Achievement = apps.get_model('tracker', 'Achievement')
+    Challenge = apps.get_model('tracker', 'Challenge')
+    for achievement in ACHIEVEMENTS:
+        Achievement.objects.get_or_create(name=achievement['name'], defaults=achievement)
+    for challenge in CHALLENGES:
+        Challenge.objects.get_or_create(
+            title=challenge['title'],
+            defaults={'excluded_categories': [], **challenge},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_gamificationjob'),
+    ]
+
+    operations = [
+        # Rows an admin may have edited since are left alone on the way back
+        migrations.RunPython(seed_catalog, migrations.RunPython.noop),
+    ]
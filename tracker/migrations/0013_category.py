@@ -0,0 +1,125 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# The categories the add-expense form has always offered
+LISTED_CATEGORIES = ['General', 'Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Health', 'Other']
+
+
+def backfill_categories(apps, schema_editor):
+    """Create a Category per distinct name in use and point every row at it, one UPDATE per table."""
+    Category = apps.get_model('tracker', 'Category')
+    Expense = apps.get_model('tracker', 'Expense')
+    ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+
+    Category.objects.bulk_create([Category(name=name, listed=True) for name in LISTED_CATEGORIES])
+    in_use = set(Expense.objects.values_list('category', flat=True).distinct())
+    in_use |= set(ExpenseRollup.objects.values_list('category', flat=True).distinct())
+    Category.objects.bulk_create([Category(name=name) for name in sorted(in_use - set(LISTED_CATEGORIES))])
+
+    category_id = Subquery(Category.objects.filter(name=OuterRef('category')).values('pk')[:1])
+    Expense.objects.update(category_ref=category_id)
+    ExpenseRollup.objects.update(category_ref=category_id)
+
+
+def restore_category_names(apps, schema_editor):
+    Category = apps.get_model('tracker', 'Category')
+    Expense = apps.get_model('tracker', 'Expense')
+    ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+
+    name = Subquery(Category.objects.filter(pk=OuterRef('category_ref')).values('name')[:1])
+    Expense.objects.update(category=name)
+    ExpenseRollup.objects.update(category=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_seed_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('listed', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.category'),
+        ),
+        migrations.AddField(
+            model_name='expenserollup',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.category'),
+        ),
+        # Dropped before the backfill so that, migrating back, the names are restored before they return
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='tracker_exp_user_id_b0ce32_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expenserollup',
+            name='tracker_exp_user_id_81a293_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='expenserollup',
+            unique_together=set(),
+        ),
+        migrations.RunPython(backfill_categories, restore_category_names),
+        # Lets the text column be re-added to a populated table when migrating back
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='category',
+            field=models.CharField(default='General', max_length=50),
+        ),
+        migrations.RemoveField(
+            model_name='expense',
+            name='category',
+        ),
+        migrations.RemoveField(
+            model_name='expenserollup',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='expense',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.RenameField(
+            model_name='expenserollup',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.category'),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.category'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='expenserollup',
+            unique_together={('user', 'date', 'category')},
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', 'date'], name='tracker_exp_user_id_35adb1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserollup',
+            index=models.Index(fields=['user', 'date', 'category', 'total_amount', 'expense_count'], name='tracker_exp_user_id_b04acf_idx'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Round
+
+import tracker.money
+
+
+def _to_paise(field):
+    return Cast(Round(F(field) * 100), models.BigIntegerField())
+
+
+def _to_rupees(field):
+    # A float divisor: SQLite divides two integers with integer division
+    return models.ExpressionWrapper(F(field) / Value(100.0), output_field=models.DecimalField())
+
+
+def amounts_to_paise(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+    Expense.objects.update(amount_paise=_to_paise('amount'))
+    ExpenseRollup.objects.update(total_paise=_to_paise('total_amount'))
+
+
+def amounts_to_rupees(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+    Expense.objects.update(amount=_to_rupees('amount_paise'))
+    ExpenseRollup.objects.update(total_amount=_to_rupees('total_paise'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='amount_paise',
+            field=tracker.money.MoneyField(null=True),
+        ),
+        migrations.AddField(
+            model_name='expenserollup',
+            name='total_paise',
+            field=tracker.money.MoneyField(null=True),
+        ),
+        # The covering index names total_amount; it is rebuilt on the new column below
+        migrations.RemoveIndex(
+            model_name='expenserollup',
+            name='tracker_exp_user_id_b04acf_idx',
+        ),
+        migrations.RunPython(amounts_to_paise, amounts_to_rupees),
+        # Lets the decimal column be re-added to a populated table when migrating back
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RemoveField(
+            model_name='expense',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='expenserollup',
+            name='total_amount',
+        ),
+        migrations.RenameField(
+            model_name='expense',
+            old_name='amount_paise',
+            new_name='amount',
+        ),
+        migrations.RenameField(
+            model_name='expenserollup',
+            old_name='total_paise',
+            new_name='total_amount',
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=tracker.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='total_amount',
+            field=tracker.money.MoneyField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='expenserollup',
+            index=models.Index(fields=['user', 'date', 'category', 'total_amount', 'expense_count'], name='tracker_exp_user_id_b04acf_idx'),
+        ),
+    ]
@@ -2,25 +2,97 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+import math
 import random
 
+from .money import MoneyField
+
+
+class OwnedQuerySet(models.QuerySet):
+    """Rows that belong to a user; every per-user read goes through for_user()."""
+
+    def for_user(self, user):
+        """Rows owned by ``user`` (a User or user id)."""
+        return self.filter(user=user)
+
+
+class Category(models.Model):
+    """An expense category; expenses and rollups refer to it by integer id."""
+    name = models.CharField(max_length=50, unique=True)
+    # Offered in the add-expense form; imports can add unlisted categories
+    listed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'categories'
+
+    def __str__(self):
+        return self.name
+
 
 class Expense(models.Model):
     """Model to track daily expenses."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField()
     description = models.CharField(max_length=255)
-    category = models.CharField(max_length=50, default='General')
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='+')
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by bulk imports so re-running an import skips rows already stored
+    import_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    objects = OwnedQuerySet.as_manager()
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # A user's recent-first listing and keyset pagination; also serves their date ranges
+            models.Index(fields=['user', '-date', '-created_at', '-id']),
+            models.Index(fields=['user', 'category', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.description} - ₹{self.amount} ({self.date})"
 
 
+class ExpenseRollup(models.Model):
+    """Per-day, per-category expense totals, maintained incrementally from Expense writes."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='+')
+    total_amount = MoneyField(default=0)
+    expense_count = models.IntegerField(default=0)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-date', 'category']
+        unique_together = ['user', 'date', 'category']
+        indexes = [
+            # Covers a user's date-range sums and per-category totals without touching the table
+            models.Index(fields=['user', 'date', 'category', 'total_amount', 'expense_count']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category}: ₹{self.total_amount} ({self.expense_count})"
+
+
+def xp_for_level(level):
+    """Cumulative XP needed to reach a level (100 + 200 + ... + (level-1) * 100)."""
+    return 50 * level * (level - 1)
+
+
+def level_for_xp(xp):
+    """Level reached with the given cumulative XP, in closed form."""
+    level = int(math.sqrt(max(xp, 0) / 50 + 0.25) + 0.5)
+    # Correct any floating point drift at the exact thresholds
+    while xp_for_level(level + 1) <= xp:
+        level += 1
+    while level > 1 and xp_for_level(level) > xp:
+        level -= 1
+    return max(level, 1)
+
+
 class UserProfile(models.Model):
     """Extended user profile with gamification data."""
     THEME_CHOICES = [
@@ -31,6 +103,13 @@ class UserProfile(models.Model):
         ('forest', 'Forest Green'),
     ]
     
+    LEVEL_REWARDS = {
+        2: {'theme': 'light', 'insight': 'weekly_summary'},
+        3: {'theme': 'neon', 'insight': 'category_breakdown'},
+        4: {'theme': 'midnight', 'insight': 'spending_forecast'},
+        5: {'theme': 'forest', 'insight': 'savings_tips'},
+    }
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     
     # XP and Leveling
@@ -51,9 +130,20 @@ class UserProfile(models.Model):
     # Stats
     total_saved = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     challenges_completed = models.IntegerField(default=0)
+    expense_count = models.IntegerField(default=0)  # Lifetime expenses logged
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Bumped on every gamification write; guards against lost updates
+    version = models.IntegerField(default=0)
+    
+    # Fields written by commit_changes()
+    GAMIFICATION_FIELDS = (
+        'xp', 'level', 'current_streak', 'longest_streak', 'last_expense_date',
+        'streak_multiplier', 'unlocked_themes', 'unlocked_insights',
+        'challenges_completed', 'expense_count',
+    )
+    
     def get_rank(self):
         """Get rank based on level."""
         ranks = {
@@ -77,65 +167,125 @@ class UserProfile(models.Model):
     def get_progress_percentage(self):
         """Progress to next level as percentage."""
         xp_needed = self.get_xp_for_next_level()
-        current_level_xp = (self.level - 1) * 100
-        xp_in_level = self.xp - (sum(range(1, self.level)) * 100)
+        xp_in_level = self.xp - xp_for_level(self.level)
         return min(int((xp_in_level / xp_needed) * 100), 100)
     
-    def add_xp(self, amount):
-        """Add XP with streak multiplier and check for level up."""
-        xp_gained = int(amount * self.streak_multiplier)
+    def add_xp(self, amount, source='adjustment'):
+        """
+        Add XP with streak multiplier and check for level up (in memory; see commit_changes).
+        
+        The award is queued as an XPEvent, written alongside the profile.
+        """
+        multiplier = self.streak_multiplier
+        xp_gained = XPEvent.award(amount, multiplier)
         self.xp += xp_gained
+        self.pending_xp_events.append(
+            XPEvent(user_profile=self, source=source, amount=amount, multiplier=multiplier, xp=xp_gained)
+        )
         
         # Check for level up
-        while self.xp >= sum(range(1, self.level + 1)) * 100:
+        new_level = level_for_xp(self.xp)
+        while self.level < new_level:
             self.level += 1
             self.unlock_rewards()
         
-        self.save()
         return xp_gained
     
-    def update_streak(self):
-        """Update streak based on expense activity."""
-        today = timezone.now().date()
+    @property
+    def pending_xp_events(self):
+        """XP events awarded in memory and not yet written."""
+        if not hasattr(self, '_pending_xp_events'):
+            self._pending_xp_events = []
+        return self._pending_xp_events
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._pending_xp_events = []
+    
+    def update_streak(self, today=None):
+        """Update streak based on expense activity (in memory; see commit_changes)."""
+        today = today or timezone.now().date()
         
         if self.last_expense_date is None:
             self.current_streak = 1
-        elif self.last_expense_date == today:
-            return  # Already logged today
+        elif self.last_expense_date >= today:
+            # Already logged today, or a queued job for an earlier day ran late:
+            # it must not reset the streak or move the date backwards
+            return
         elif self.last_expense_date == today - timedelta(days=1):
             self.current_streak += 1
-            # Increase multiplier every 7 days (max 2.5x)
-            self.streak_multiplier = min(1.0 + (self.current_streak // 7) * 0.25, 2.5)
+            self.streak_multiplier = self.multiplier_for_streak(self.current_streak)
         else:
             self.current_streak = 1
             self.streak_multiplier = 1.0
         
         self.last_expense_date = today
         self.longest_streak = max(self.longest_streak, self.current_streak)
-        self.save()
+    
+    @staticmethod
+    def multiplier_for_streak(streak):
+        """Increase multiplier every 7 days (max 2.5x)."""
+        return min(1.0 + (streak // 7) * 0.25, 2.5)
     
     def unlock_rewards(self):
         """Unlock themes and insights based on level."""
-        level_rewards = {
-            2: {'theme': 'light', 'insight': 'weekly_summary'},
-            3: {'theme': 'neon', 'insight': 'category_breakdown'},
-            4: {'theme': 'midnight', 'insight': 'spending_forecast'},
-            5: {'theme': 'forest', 'insight': 'savings_tips'},
-        }
-        
-        if self.level in level_rewards:
-            reward = level_rewards[self.level]
+        if self.level in self.LEVEL_REWARDS:
+            reward = self.LEVEL_REWARDS[self.level]
             if reward['theme'] not in self.unlocked_themes:
                 self.unlocked_themes.append(reward['theme'])
             if reward['insight'] not in self.unlocked_insights:
                 self.unlocked_insights.append(reward['insight'])
+    
+    def commit_changes(self):
+        """
+        Write the gamification fields in one UPDATE, conditional on the version read.
         
-        self.save()
+        Returns False when another request changed the profile first; the caller
+        should reload and replay its changes.
+        """
+        updated = UserProfile.objects.filter(pk=self.pk, version=self.version).update(
+            version=models.F('version') + 1,
+            **{field: getattr(self, field) for field in self.GAMIFICATION_FIELDS}
+        )
+        if updated:
+            self.version += 1
+            XPEvent.objects.bulk_create(self.pending_xp_events)
+            self._pending_xp_events = []
+        return bool(updated)
     
     def __str__(self):
         return f"Profile: Level {self.level} - {self.xp} XP"
 
 
+class XPEvent(models.Model):
+    """Append-only ledger of every XP award; profiles' XP and level can be replayed from it."""
+    SOURCE_CHOICES = [
+        ('expense', 'Expense Logged'),
+        ('achievement', 'Achievement'),
+        ('challenge', 'Challenge'),
+        ('adjustment', 'Adjustment'),
+    ]
+    
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='xp_events')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    amount = models.IntegerField()  # Base XP before the multiplier
+    multiplier = models.FloatField(default=1.0)
+    xp = models.IntegerField()  # XP actually awarded
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['user_profile', 'created_at'])]
+    
+    @staticmethod
+    def award(amount, multiplier):
+        """Reward formula: XP awarded for a base amount at a streak multiplier."""
+        return int(amount * multiplier)
+    
+    def __str__(self):
+        return f"+{self.xp} XP ({self.source})"
+
+
 class Achievement(models.Model):
     """Achievement/Badge definitions."""
     TIER_CHOICES = [
@@ -221,6 +371,10 @@ class UserChallenge(models.Model):
     
     class Meta:
         unique_together = ['user_profile', 'challenge', 'started_at']
+        indexes = [
+            models.Index(fields=['user_profile', 'status', 'started_at']),
+            models.Index(fields=['status', 'completed_at']),
+        ]
 
 
 class LeaderboardEntry(models.Model):
@@ -246,3 +400,48 @@ class LeaderboardEntry(models.Model):
     class Meta:
         ordering = ['-xp_earned']
         unique_together = ['user_profile', 'period_type', 'period_start']
+        indexes = [models.Index(fields=['period_type', 'period_start', 'rank'])]
+
+
+class GamificationJob(models.Model):
+    """
+    Gamification work for logged expenses, run off the request path (see tracker.tasks).
+
+    Expenses a profile logs on the same day while its job is still pending
+    are merged into that job, so a burst of expenses costs one profile write.
+    Finished jobs keep the achievements they awarded until they are shown.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='gamification_jobs')
+    logged_on = models.DateField()  # Day the expenses were logged, for the streak
+    expenses = models.PositiveIntegerField(default=1)  # Expenses merged into this job
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)  # Retry backoff
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    new_achievements = models.JSONField(default=list)  # Achievement ids awarded
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_profile', 'logged_on'],
+                condition=models.Q(status='pending'),
+                name='one_pending_gamification_job_per_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['user_profile', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_profile} {self.logged_on}: {self.expenses} expenses ({self.status})"
@@ -0,0 +1,57 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+PAISE_PER_RUPEE = 100
+_ONE_PAISA = Decimal('0.01')
+
+
+def to_paise(rupees):
+    """Integer paise for a rupee amount (Decimal, int, float or numeric string), rounded half up."""
+    return int((Decimal(str(rupees)) * PAISE_PER_RUPEE).to_integral_value(ROUND_HALF_UP))
+
+
+def from_paise(paise):
+    """Rupees with two decimal places for an integer number of paise."""
+    return Decimal(int(paise)).scaleb(-2)
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    A rupee amount stored as an integer number of paise.
+
+    The database only ever sees integers, so SUM, window functions and
+    comparisons run on native integers and are exact. Python code keeps
+    working in Decimal rupees: values are converted to paise when saved or
+    used in a lookup, and back to rupees when loaded, including aggregates
+    over the field. Use paise() to read the raw integers instead.
+    """
+
+    description = "Amount in rupees, stored as integer paise"
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else from_paise(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value)).quantize(_ONE_PAISA, ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValidationError(self.error_messages['invalid'], code='invalid', params={'value': value})
+
+    def get_prep_value(self, value):
+        # Skips IntegerField's int() coercion: the Python value is in rupees
+        value = models.Field.get_prep_value(self, value)
+        return None if value is None else to_paise(value)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'form_class': forms.DecimalField, 'decimal_places': 2, **kwargs})
+
+
+def paise(field):
+    """The raw integer paise of a MoneyField, for NumPy loads and integer arithmetic."""
+    return models.ExpressionWrapper(models.F(field), output_field=models.BigIntegerField())
@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from django.utils import formats
+
+from .catalog import attach_categories
+
+
+EXPENSE_PAGE_SIZE = 50
+
+# Keyset order: matches Expense.Meta.ordering with id as a unique tie-breaker
+EXPENSE_KEYSET_ORDERING = ('-date', '-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(expense):
+    """Encode the sort key of an expense as an opaque URL-safe cursor."""
+    payload = [expense.date.isoformat(), expense.created_at.isoformat(), expense.id]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into its (date, created_at, id) sort key."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_str, created_str, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(date_str), datetime.fromisoformat(created_str), int(pk)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def paginate_expenses(queryset, cursor=None, page_size=EXPENSE_PAGE_SIZE):
+    """
+    Return one page of expenses after the cursor and the cursor for the next page.
+
+    Pages are located with a seek predicate on the ordering columns instead of
+    OFFSET, so the cost of a page does not depend on how deep it is.
+    """
+    queryset = queryset.order_by(*EXPENSE_KEYSET_ORDERING)
+
+    if cursor:
+        last_date, last_created, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__lt=last_date)
+            | Q(date=last_date, created_at__lt=last_created)
+            | Q(date=last_date, created_at=last_created, id__lt=last_id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = list(queryset[:page_size + 1])
+    page = attach_categories(rows[:page_size])
+    next_cursor = encode_cursor(page[-1]) if len(rows) > page_size else None
+    return page, next_cursor
+
+
+def serialize_expense(expense):
+    """
+    JSON-friendly representation of an expense row.
+
+    ``date_display`` is the date as the list template renders it, so rows
+    appended by infinite scroll look like the ones rendered on the server.
+    """
+    return {
+        'id': expense.id,
+        'description': expense.description,
+        'category': expense.category.name,
+        'amount': str(expense.amount),
+        'date': expense.date.isoformat(),
+        'date_display': formats.localize(expense.date),
+    }
@@ -0,0 +1,172 @@
+import threading
+from bisect import bisect_left
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+_BUCKET_LABELS = [f'le_{bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'gt_{LATENCY_BUCKETS_MS[-1]}ms']
+
+
+def perf_setting(name, default):
+    return getattr(settings, f'TRACKER_PERF_{name}', default)
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled."""
+
+    def __init__(self, slow_query_count=3):
+        self.slow_query_count = slow_query_count
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.slowest = []  # (ms, sql), longest first
+        self.template_ms = 0.0
+        self.peak_bytes = None
+        # Async views run queries from several threads at once
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time one query (see record_query)."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.query_count += 1
+                self.sql_ms += elapsed
+                if len(self.slowest) < self.slow_query_count or elapsed > self.slowest[-1][0]:
+                    self.slowest.append((elapsed, sql))
+                    self.slowest.sort(key=lambda item: item[0], reverse=True)
+                    del self.slowest[self.slow_query_count:]
+
+    @property
+    def slow_sql_ms(self):
+        return sum(ms for ms, _ in self.slowest)
+
+
+_current = ContextVar('tracker_request_metrics', default=None)
+
+
+class TimedTemplate(Template):
+    """A template whose render time is added to the current request's metrics."""
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Included and extended templates render inside this one, through the engine, so are not counted twice
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with render timing for PerformanceMiddleware.
+
+    Set as the BACKEND in settings.TEMPLATES; it only wraps the templates it
+    hands out, so nothing is patched process-wide.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: count the query in the current request's metrics, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Install record_query on every database connection as it is opened.
+
+    The metrics live in a context variable, which sync_to_async and the load
+    pool carry into the threads they run queries on, so a request's queries
+    are counted whichever thread and connection run them, sync or async.
+    """
+    if record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class RouteHistograms:
+    """
+    Rolling latency statistics per route over the most recent requests.
+
+    Each route keeps a bounded window of samples, so the numbers follow
+    current behaviour rather than the whole process lifetime.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, total_ms, sql_ms, query_count, template_ms):
+        with self._lock:
+            samples = self._samples.get(route)
+            if samples is None:
+                samples = self._samples[route] = deque(maxlen=self.window)
+            samples.append((total_ms, sql_ms, query_count, template_ms))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self):
+        """{route: summary} with percentiles, means and the bucketed latency histogram."""
+        with self._lock:
+            routes = {route: list(samples) for route, samples in self._samples.items()}
+
+        summary = {}
+        for route, samples in sorted(routes.items()):
+            totals = sorted(sample[0] for sample in samples)
+            count = len(samples)
+            buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for total in totals:
+                buckets[bisect_left(LATENCY_BUCKETS_MS, total)] += 1
+            summary[route] = {
+                'count': count,
+                'p50_ms': round(totals[(count - 1) // 2], 2),
+                'p95_ms': round(totals[min(count - 1, int(count * 0.95))], 2),
+                'p99_ms': round(totals[min(count - 1, int(count * 0.99))], 2),
+                'mean_ms': round(sum(totals) / count, 2),
+                'mean_sql_ms': round(sum(sample[1] for sample in samples) / count, 2),
+                'mean_queries': round(sum(sample[2] for sample in samples) / count, 1),
+                'mean_template_ms': round(sum(sample[3] for sample in samples) / count, 2),
+                'buckets': dict(zip(_BUCKET_LABELS, buckets)),
+            }
+        return summary
+
+
+histograms = RouteHistograms(window=perf_setting('WINDOW', 1000))
@@ -0,0 +1,121 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Sum
+
+from .catalog import get_categories
+from .models import Expense, ExpenseRollup
+from .money import from_paise, to_paise
+
+
+def _normalize(user_id, date, category_id, amount):
+    """Coerce raw form values (strings) into the types stored on the rollup; the amount becomes paise."""
+    date = Expense._meta.get_field('date').to_python(date)
+    return user_id, date, category_id, to_paise(amount)
+
+
+def apply_expense_delta(user_id, date, category_id, amount, count):
+    """Add (or with negative values, remove) an expense's contribution to its rollup row."""
+    user_id, date, category_id, amount = _normalize(user_id, date, category_id, amount)
+    rollups = ExpenseRollup.objects.filter(user_id=user_id, date=date, category_id=category_id)
+
+    # Integer arithmetic on the stored paise
+    updated = rollups.update(
+        total_amount=F('total_amount') + amount,
+        expense_count=F('expense_count') + count,
+    )
+    if updated:
+        if count < 0:
+            rollups.filter(expense_count__lte=0).delete()
+        return
+
+    try:
+        with transaction.atomic():
+            ExpenseRollup.objects.create(
+                user_id=user_id, date=date, category_id=category_id,
+                total_amount=from_paise(amount), expense_count=count,
+            )
+    except IntegrityError:
+        # Another writer created the row first; fold our delta into it
+        rollups.update(
+            total_amount=F('total_amount') + amount,
+            expense_count=F('expense_count') + count,
+        )
+
+
+def rebuild_rollups(batch_size=1000, user_ids=None):
+    """
+    Recompute rollup rows from the Expense table. Returns the number of rows written.
+
+    Every row is rebuilt unless ``user_ids`` names the users to rebuild.
+    """
+    expenses = Expense.objects.all()
+    rollups = ExpenseRollup.objects.all()
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+    grouped = (
+        expenses.order_by()
+        .values('user_id', 'date', 'category_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(ExpenseRollup(
+                user_id=row['user_id'], date=row['date'], category_id=row['category_id'],
+                total_amount=row['total'], expense_count=row['count'],
+            ))
+            if len(batch) >= batch_size:
+                ExpenseRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            ExpenseRollup.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def spending_summary(rollups=None, since=None):
+    """
+    Totals over the rollup table in a single query.
+
+    Returns total amount, expense count, number of distinct days and the first
+    tracked date; when ``since`` is given, also the amount spent from that date on.
+    """
+    if rollups is None:
+        rollups = ExpenseRollup.objects.all()
+
+    # Aliases must not shadow the model's own field names
+    aggregates = {
+        'amount_sum': Sum('total_amount'),
+        'count_sum': Sum('expense_count'),
+        'days_tracked': Count('date', distinct=True),
+        'first_date': Min('date'),
+    }
+    if since is not None:
+        aggregates['since_sum'] = Sum('total_amount', filter=Q(date__gte=since))
+
+    result = rollups.aggregate(**aggregates)
+    summary = {
+        'total_amount': result['amount_sum'] or 0,
+        'total_expenses': result['count_sum'] or 0,
+        'days_tracked': result['days_tracked'],
+        'first_date': result['first_date'],
+    }
+    if since is not None:
+        summary['since_amount'] = result['since_sum'] or 0
+    return summary
+
+
+def category_totals(rollups=None, limit=None):
+    """Amount spent per category, largest first, as ``{'category': name, 'total': amount}`` rows."""
+    if rollups is None:
+        rollups = ExpenseRollup.objects.all()
+
+    # Grouped on the integer key; names come from the in-process catalogue
+    totals = rollups.order_by().values('category_id').annotate(total=Sum('total_amount')).order_by('-total')
+    totals = list(totals[:limit] if limit else totals)
+    categories = get_categories(row['category_id'] for row in totals)
+    return [{'category': categories[row['category_id']].name, 'total': row['total']} for row in totals]
@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version, bump_profile_version, bump_user_version
+from .models import Achievement, Category, Challenge, Expense, UserAchievement, UserChallenge
+from .rollups import apply_expense_delta
+
+
+@receiver(pre_save, sender=Expense)
+def remember_previous_expense(sender, instance, **kwargs):
+    """Stash the stored values of an expense being updated so its old rollup can be reversed."""
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = (
+            Expense.objects.filter(pk=instance.pk)
+            .values_list('user_id', 'date', 'category_id', 'amount')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Expense)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    """Move the expense's contribution into the rollup row for its (user, date, category)."""
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        user_id, date, category_id, amount = previous
+        apply_expense_delta(user_id, date, category_id, -amount, -1)
+    apply_expense_delta(instance.user_id, instance.date, instance.category_id, instance.amount, 1)
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Expense)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted expense from its rollup row."""
+    # The instance may still hold the raw form value it was created with
+    amount = Expense._meta.get_field('amount').to_python(instance.amount)
+    apply_expense_delta(instance.user_id, instance.date, instance.category_id, -amount, -1)
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_caches(sender, **kwargs):
+    """Catalogue edits change every profile's pages and replace the in-process catalogue (tracker.catalog)."""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=UserChallenge)
+@receiver(post_delete, sender=UserChallenge)
+@receiver(post_save, sender=UserAchievement)
+@receiver(post_delete, sender=UserAchievement)
+def invalidate_profile_caches(sender, instance, **kwargs):
+    bump_profile_version(instance.user_profile_id)
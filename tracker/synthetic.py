@@ -0,0 +1,229 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .catalog import get_achievement_index, get_category
+from .gamification import EXPENSE_XP
+from .ledger import unlocks_for_level
+from .models import (
+    Challenge, Expense, UserAchievement, UserChallenge, UserProfile, XPEvent, level_for_xp,
+)
+from .money import PAISE_PER_RUPEE
+from .rollups import rebuild_rollups
+
+
+SYNTHETIC_USER_PREFIX = 'synthetic-'
+SYNTHETIC_BATCH_SIZE = 5000
+
+# Share of expenses and median amount (in rupees) per category
+CATEGORY_PROFILE = {
+    'Food': (30, 150),
+    'Transport': (15, 80),
+    'General': (15, 200),
+    'Shopping': (12, 600),
+    'Bills': (10, 1500),
+    'Entertainment': (8, 400),
+    'Health': (5, 500),
+    'Other': (5, 250),
+}
+
+
+class SyntheticData:
+    """
+    Seeded generator of users with realistic expense, challenge, achievement and XP history.
+
+    Rows go in with bulk_create, so the per-row signals are skipped; the
+    rollup table is rebuilt once at the end instead. The same seed always
+    produces the same data.
+    """
+
+    def __init__(self, seed=0, days=365, batch_size=SYNTHETIC_BATCH_SIZE, progress=None):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.progress = progress
+        self.today = timezone.localdate()
+        self.categories = list(CATEGORY_PROFILE)
+        self.category_ids = {}
+        self.category_weights = [weight for weight, _ in CATEGORY_PROFILE.values()]
+        self.counts = dict.fromkeys(['users', 'expenses', 'challenges', 'achievements', 'xp_events', 'rollups'], 0)
+
+    def _at(self, day, hour=9):
+        return timezone.make_aware(datetime.combine(day, time(hour, self.rng.randrange(60))))
+
+    def _amount(self, category):
+        """A random amount in paise, at least one rupee."""
+        median = CATEGORY_PROFILE[category][1]
+        return max(round(self.rng.lognormvariate(0, 0.6) * median * PAISE_PER_RUPEE), PAISE_PER_RUPEE)
+
+    def _expenses(self, user_id, count):
+        """A user's expense rows over the history window; returns (rows, distinct dates)."""
+        dates = [self.today - timedelta(days=self.rng.randrange(self.days)) for _ in range(count)]
+        categories = self.rng.choices(self.categories, weights=self.category_weights, k=count)
+        rows = [
+            (user_id, self._amount(category), f"{category} #{i + 1}", self.category_ids[category], day)
+            for i, (day, category) in enumerate(zip(dates, categories))
+        ]
+        return rows, set(dates)
+
+    def _insert_expenses(self, rows):
+        """
+        Insert expense rows with executemany.
+
+        Expenses are nearly all of the generated data, and building a model
+        instance per row would make the ORM the bottleneck.
+        """
+        ops = connection.ops
+        created_at = ops.adapt_datetimefield_value(timezone.now())
+        columns = ['user_id', 'amount', 'description', 'category_id', 'date', 'created_at']
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            ops.quote_name(Expense._meta.db_table),
+            ', '.join(ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, [
+                    (user_id, amount, description, category_id,
+                     ops.adapt_datefield_value(day), created_at)
+                    for user_id, amount, description, category_id, day in rows[start:start + self.batch_size]
+                ])
+
+    @staticmethod
+    def _streaks(dates, today):
+        """(current, longest) run of consecutive days in a set of dates."""
+        longest = run = 0
+        previous = None
+        for day in sorted(dates):
+            run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+        current = run if previous and previous >= today - timedelta(days=1) else 0
+        return current, longest
+
+    def _challenges(self, profile, daily, weekly):
+        """Settled history for past days and weeks, plus today's and this week's active challenges."""
+        rows = []
+        week_start = self.today - timedelta(days=self.today.weekday())
+        for weeks_ago in range(min(self.days // 7, 8), 0, -1):
+            start = week_start - timedelta(weeks=weeks_ago)
+            rows.append((self.rng.choice(weekly), start, self.rng.random() < 0.55))
+        for days_ago in sorted(self.rng.sample(range(1, min(self.days, 30) + 1), k=min(self.days, 30) // 3)):
+            rows.append((self.rng.choice(daily), self.today - timedelta(days=days_ago), self.rng.random() < 0.6))
+
+        challenges = []
+        for challenge, day, completed in rows:
+            challenges.append(UserChallenge(
+                user_profile=profile,
+                challenge=challenge,
+                status='completed' if completed else 'failed',
+                progress=100 if completed else self.rng.randrange(100),
+                started_at=self._at(day),
+                completed_at=self._at(day, hour=21) if completed else None,
+            ))
+        for challenge, day in ((self.rng.choice(daily), self.today), (self.rng.choice(weekly), week_start)):
+            challenges.append(UserChallenge(
+                user_profile=profile, challenge=challenge, status='active', started_at=self._at(day),
+            ))
+        return challenges
+
+    def _flush(self, model, rows, backdate=()):
+        """bulk_create rows, keeping the datetimes given for auto_now_add fields."""
+        fields = [model._meta.get_field(name) for name in backdate]
+        for field in fields:
+            field.auto_now_add = False
+        try:
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+        finally:
+            for field in fields:
+                field.auto_now_add = True
+
+    def generate(self, users=10000, expenses_per_user=1000):
+        """Create ``users`` users with about ``expenses_per_user`` expenses each. Returns row counts."""
+        daily = list(Challenge.objects.filter(challenge_type='daily'))
+        weekly = list(Challenge.objects.filter(challenge_type='weekly'))
+        index = get_achievement_index()
+        self.category_ids = {name: get_category(name).pk for name in self.categories}
+        start = User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX).count()
+
+        # Users are written a block at a time so a block's expenses fill about one batch
+        block = max(1, self.batch_size // max(expenses_per_user, 1))
+        for first in range(start, start + users, block):
+            with transaction.atomic():
+                self._generate_block(range(first, min(first + block, start + users)), expenses_per_user,
+                                     daily, weekly, index)
+            if self.progress:
+                self.progress(self.counts)
+
+        self.counts['rollups'] = rebuild_rollups(batch_size=self.batch_size)
+        return self.counts
+
+    def _generate_block(self, numbers, expenses_per_user, daily, weekly, index):
+        users = User.objects.bulk_create([
+            User(username=f"{SYNTHETIC_USER_PREFIX}{n:07d}", password='!') for n in numbers
+        ])
+
+        expenses, profiles, challenges, achievements, events = [], [], [], [], []
+        for user in users:
+            count = max(1, int(self.rng.gauss(expenses_per_user, expenses_per_user / 4)))
+            rows, dates = self._expenses(user.pk, count)
+            expenses.extend(rows)
+            current, longest = self._streaks(dates, self.today)
+            profile = UserProfile(
+                user=user,
+                current_streak=current,
+                longest_streak=longest,
+                last_expense_date=max(dates),
+                streak_multiplier=UserProfile.multiplier_for_streak(current),
+                expense_count=count,
+            )
+            profiles.append(profile)
+
+            history = self._challenges(profile, daily, weekly) if daily and weekly else []
+            completed = [row for row in history if row.status == 'completed']
+            challenges.extend(history)
+            profile.challenges_completed = len(completed)
+
+            reached = index.reached({'expense_count': count, 'streak': longest, 'challenges': len(completed)})
+            achievements.extend(UserAchievement(user_profile=profile, achievement=a) for a in reached)
+
+            # The last month's XP as individual events, everything before as an opening balance
+            recent = [
+                XPEvent(user_profile=profile, source='expense', amount=EXPENSE_XP, multiplier=1.0,
+                        xp=EXPENSE_XP, created_at=self._at(self.today - timedelta(days=self.rng.randrange(30))))
+                for _ in range(min(count, self.rng.randrange(5, 40)))
+            ]
+            recent.extend(
+                XPEvent(user_profile=profile, source='challenge', amount=row.challenge.xp_reward,
+                        multiplier=1.0, xp=row.challenge.xp_reward, created_at=row.completed_at)
+                for row in completed
+            )
+            profile.xp = (
+                count * EXPENSE_XP
+                + sum(a.xp_reward for a in reached)
+                + sum(row.challenge.xp_reward for row in completed)
+            )
+            opening = profile.xp - sum(event.xp for event in recent)
+            if opening > 0:
+                events.append(XPEvent(user_profile=profile, source='adjustment', amount=opening,
+                                      multiplier=1.0, xp=opening,
+                                      created_at=self._at(self.today - timedelta(days=self.days))))
+            events.extend(recent)
+
+            profile.level = level_for_xp(profile.xp)
+            profile.unlocked_themes, profile.unlocked_insights = unlocks_for_level(profile.level)
+
+        self._flush(UserProfile, profiles)
+        self._insert_expenses(expenses)
+        self._flush(UserChallenge, challenges, backdate=('started_at',))
+        self._flush(UserAchievement, achievements)
+        self._flush(XPEvent, events, backdate=('created_at',))
+
+        self.counts['users'] += len(users)
+        self.counts['expenses'] += len(expenses)
+        self.counts['challenges'] += len(challenges)
+        self.counts['achievements'] += len(achievements)
+        self.counts['xp_events'] += len(events)
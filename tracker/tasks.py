@@ -0,0 +1,201 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .catalog import get_achievement_index
+from .gamification import expenses_logged, run_gamification
+from .models import GamificationJob, UserProfile
+
+
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_SECONDS = 2  # Doubled after every failed attempt
+JOB_BATCH_SIZE = 100
+# A job still "running" after this long belongs to a worker that died; its
+# transaction was rolled back, so it is safe to run again
+JOB_STALE_AFTER = timedelta(minutes=5)
+# Finished jobs whose achievements nobody came back to see
+JOB_RESULT_TTL = timedelta(days=1)
+WORKER_POLL_SECONDS = 5
+
+logger = logging.getLogger('tracker.tasks')
+
+
+def enqueue_expense_logged(profile, day=None):
+    """
+    Queue the gamification work for one new expense; call inside the expense's transaction.
+
+    A pending job for the same profile and day absorbs the expense, so only
+    one job per profile per day ever waits in the queue. The in-process
+    workers are woken once the transaction commits.
+    """
+    day = day or timezone.now().date()
+    pending = GamificationJob.objects.filter(user_profile=profile, logged_on=day, status='pending')
+    if not pending.update(expenses=F('expenses') + 1):
+        try:
+            with transaction.atomic():
+                GamificationJob.objects.create(user_profile=profile, logged_on=day)
+        except IntegrityError:
+            # Another request queued the day's job in the meantime
+            pending.update(expenses=F('expenses') + 1)
+    transaction.on_commit(wake)
+
+
+def _requeue(job, **fields):
+    """Put a job back in the queue, merging it into the day's pending job if one exists."""
+    try:
+        with transaction.atomic():
+            GamificationJob.objects.filter(pk=job.pk).update(status='pending', **fields)
+    except IntegrityError:
+        with transaction.atomic():
+            GamificationJob.objects.filter(
+                user_profile_id=job.user_profile_id, logged_on=job.logged_on, status='pending',
+            ).update(expenses=F('expenses') + job.expenses)
+            GamificationJob.objects.filter(pk=job.pk).delete()
+
+
+def _claim(job):
+    """Mark a pending job as running; False if another worker got it first."""
+    claimed = GamificationJob.objects.filter(pk=job.pk, status='pending').update(
+        status='running', attempts=F('attempts') + 1, started_at=timezone.now(),
+    )
+    job.attempts += 1
+    return claimed == 1
+
+
+def run_job(job):
+    """
+    Claim and run one job; returns the achievements it awarded (None if it was not claimed).
+
+    The job is marked done in the same transaction as the profile write, so
+    a job's expenses are never applied twice. A failure is retried with
+    exponential backoff until JOB_MAX_ATTEMPTS, then the job is marked failed.
+    """
+    if not _claim(job):
+        return None
+
+    def step(profile):
+        new_achievements = expenses_logged(job.expenses, job.logged_on)(profile)
+        GamificationJob.objects.filter(pk=job.pk).update(
+            status='done',
+            finished_at=timezone.now(),
+            new_achievements=[achievement.id for achievement in new_achievements],
+        )
+        return new_achievements
+
+    try:
+        profile = UserProfile.objects.get(pk=job.user_profile_id)
+        return run_gamification(profile, step)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            GamificationJob.objects.filter(pk=job.pk).update(status='failed', last_error=error)
+            logger.exception("Gamification job %s failed for good after %s attempts", job.pk, job.attempts)
+        else:
+            delay = timedelta(seconds=JOB_RETRY_SECONDS * 2 ** (job.attempts - 1))
+            _requeue(job, run_after=timezone.now() + delay, last_error=error)
+            logger.warning("Gamification job %s failed (attempt %s), retrying in %s", job.pk, job.attempts, delay)
+        return None
+
+
+def run_pending_jobs(profile=None, limit=JOB_BATCH_SIZE):
+    """Run due pending jobs, oldest first (only ``profile``'s if given); returns how many were run."""
+    jobs = GamificationJob.objects.filter(status='pending', run_after__lte=timezone.now())
+    if profile is not None:
+        jobs = jobs.filter(user_profile=profile)
+    ran = 0
+    for job in jobs.order_by('run_after', 'pk')[:limit]:
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def requeue_stale_jobs():
+    """Return jobs abandoned by dead workers to the queue."""
+    stale = GamificationJob.objects.filter(status='running', started_at__lt=timezone.now() - JOB_STALE_AFTER)
+    count = 0
+    for job in stale:
+        _requeue(job)
+        count += 1
+    return count
+
+
+def retry_failed_jobs(jobs):
+    """Give failed jobs a fresh set of attempts."""
+    count = 0
+    for job in jobs.filter(status='failed'):
+        _requeue(job, attempts=0, run_after=timezone.now())
+        count += 1
+    if count:
+        transaction.on_commit(wake)
+    return count
+
+
+def purge_finished_jobs():
+    """Delete finished jobs whose results have expired."""
+    deleted, _ = GamificationJob.objects.filter(
+        status='done', finished_at__lt=timezone.now() - JOB_RESULT_TTL,
+    ).delete()
+    return deleted
+
+
+def settle_gamification(profile):
+    """
+    Run the profile's queued jobs that the workers have not reached yet; True if any ran.
+
+    Called on every page load, so a page always reflects the expenses
+    logged before it, whether or not a worker got there first.
+    """
+    if not GamificationJob.objects.filter(user_profile=profile, status='pending').exists():
+        return False
+    return run_pending_jobs(profile) > 0
+
+
+def collect_new_achievements(profile):
+    """Achievements awarded by the profile's finished jobs since the last call."""
+    done = GamificationJob.objects.filter(user_profile=profile, status='done')
+    finished = list(done.values_list('pk', 'new_achievements'))
+    if not finished:
+        return []
+    done.filter(pk__in=[pk for pk, _ in finished]).delete()
+    by_id = get_achievement_index().by_id
+    return [by_id[achievement_id] for _, ids in finished for achievement_id in ids if achievement_id in by_id]
+
+
+# In-process workers: daemon threads that drain the queue whenever a job is
+# committed (see wake) and every WORKER_POLL_SECONDS for retries
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        _wakeup.wait(timeout=WORKER_POLL_SECONDS)
+        _wakeup.clear()
+        # Long-lived thread: honour CONN_MAX_AGE the way request handling does
+        close_old_connections()
+        try:
+            requeue_stale_jobs()
+            while run_pending_jobs():
+                pass
+        except Exception:
+            logger.exception("Gamification worker pass failed")
+
+
+def wake():
+    """Start the TRACKER_TASK_WORKERS in-process workers on first use and nudge them."""
+    count = getattr(settings, 'TRACKER_TASK_WORKERS', 1)
+    if count <= 0:
+        # No in-process workers; jobs run from process_gamification_jobs or the next page load
+        return
+    with _workers_lock:
+        while len(_workers) < count:
+            worker = threading.Thread(target=_work, name=f'tracker-task-{len(_workers)}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+    _wakeup.set()
@@ -1,3 +1,1327 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import re
+import subprocess
+import sys
+import time
+import unittest
+from concurrent.futures import Future
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, QuerySet, Sum
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import tasks, views, writer
+from .catalog import get_catalog
+from .caching import CATALOG_SCOPE, _version_key, data_version, get_version_cache
+from .checks import check_version_cache
+from .challenges import start_of_day, update_challenge_progress
+from .importer import import_expenses, iter_csv_rows
+from .forecasting import fit_forecast, forecast_daily
+from .gamification import MAX_COMMIT_ATTEMPTS, ProfileConflict, run_gamification
+from .ledger import replay_xp
+from .leaderboard import PERIOD_TYPES, _cache_key, period_start, rank_of, refresh_leaderboard, top_entries
+from .maintenance import process_chunk
+from .money import from_paise, paise, to_paise
+from .middleware import PerformanceMiddleware
+from .pagination import decode_cursor, encode_cursor, paginate_expenses
+from .models import (
+    Achievement, Category, Challenge, Expense, ExpenseRollup, GamificationJob, UserChallenge, UserProfile, XPEvent,
+    level_for_xp, xp_for_level,
+)
+
+
+# Tables that grow with usage; the catalogue tables are small enough to scan
+HOT_TABLES = {
+    'tracker_expense',
+    'tracker_expenserollup',
+    'tracker_userchallenge',
+    'tracker_userachievement',
+    'tracker_userprofile',
+    'tracker_xpevent',
+    'tracker_leaderboardentry',
+    'tracker_gamificationjob',
+}
+
+# "SCAN <table>" with no index means SQLite reads every row of the table
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def setUpModule():
+    # One JSON line per request would bury the test report; assertLogs still sees them
+    performance = logging.getLogger('tracker.performance')
+    level = performance.level
+    performance.setLevel(logging.WARNING)
+    unittest.addModuleCleanup(performance.setLevel, level)
+
+
+# Keep every query on the default connection, where CaptureQueriesContext sees it
+@override_settings(TRACKER_READ_ALIAS=None)
+class QueryPlanTests(TestCase):
+    """Every query a page runs must reach the hot tables through an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tracker', password='tracker')
+        profile = UserProfile.objects.create(user=cls.user, unlocked_themes=['dark'], unlocked_insights=[])
+        # Another user's rows must not change which plans are chosen
+        other = User.objects.create_user('other', password='other')
+        today = timezone.localdate()
+        categories = [Category.objects.get(name=name) for name in ('Food', 'Transport', 'Bills', 'Shopping')]
+        for day in range(60):
+            for i, category in enumerate(categories):
+                for owner in (cls.user, other):
+                    Expense.objects.create(
+                        user=owner,
+                        amount=Decimal(50 + day + i),
+                        description=f"{category.name} {day}",
+                        category=category,
+                        date=today - timedelta(days=day),
+                    )
+        for challenge_type in ('daily', 'weekly'):
+            challenge = Challenge.objects.create(
+                title=f"Track {challenge_type}",
+                description="Log expenses",
+                challenge_type=challenge_type,
+                category='track',
+                target_value=3,
+            )
+            UserChallenge.objects.create(user_profile=profile, challenge=challenge)
+        Achievement.objects.create(
+            name="First Step",
+            description="Log an expense",
+            condition_type='expense_count',
+            condition_value=1,
+        )
+        for period_type in PERIOD_TYPES:
+            refresh_leaderboard(period_type)
+
+    def setUp(self):
+        # Cached page contexts would hide the queries behind them
+        for cache in caches.all():
+            cache.clear()
+        self.client.force_login(self.user)
+
+    def assert_no_full_scans(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                match = FULL_SCAN.match(step)
+                if match and match.group(1) in HOT_TABLES:
+                    self.fail(f"{url}: full scan of {match.group(1)}\n  {sql}\n  " + "\n  ".join(plan))
+
+    def test_dashboard(self):
+        self.assert_no_full_scans('get', reverse('dashboard'))
+
+    def test_add_expense(self):
+        self.assert_no_full_scans('get', reverse('add_expense'))
+        self.assert_no_full_scans('post', reverse('add_expense'), {
+            'amount': '120', 'description': 'Lunch', 'category': 'Food',
+            'date': timezone.localdate().isoformat(),
+        })
+
+    def test_expense_list(self):
+        self.assert_no_full_scans('get', reverse('expense_list'))
+
+    def test_expense_list_page(self):
+        first = self.client.get(reverse('expense_list_page')).json()
+        self.assert_no_full_scans('get', reverse('expense_list_page'), {'cursor': first['next_cursor']})
+
+    def test_export(self):
+        self.assert_no_full_scans('get', reverse('export_expenses'), {
+            'start': (timezone.localdate() - timedelta(days=7)).isoformat(), 'category': 'Food',
+        })
+
+    def test_challenges(self):
+        self.assert_no_full_scans('get', reverse('challenges'))
+
+    def test_achievements(self):
+        self.assert_no_full_scans('get', reverse('achievements'))
+
+    def test_leaderboard(self):
+        for period_type in PERIOD_TYPES:
+            self.assert_no_full_scans('get', reverse('leaderboard'), {'period': period_type})
+
+    def test_predictions(self):
+        self.assert_no_full_scans('get', reverse('predictions'))
+
+    def test_stats_api(self):
+        self.assert_no_full_scans('get', reverse('dashboard_stats'))
+        self.assert_no_full_scans('get', reverse('predictions_stats'), {'income': 60000})
+
+
+# Queued gamification runs on the next page load instead of in worker threads
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class ConditionalStatsTests(TestCase):
+    """Polling the stats API with a validator costs no aggregates until the data changes."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('poller', password='poller')
+        self.client.force_login(self.user)
+
+    def poll(self, name, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), headers=headers)
+        tables = {table for query in queries.captured_queries for table in HOT_TABLES if table in query['sql']}
+        # The session profile and its queued-work check are key lookups, not aggregates
+        return response, tables - {'tracker_userprofile', 'tracker_gamificationjob'}
+
+    def test_unchanged_poll_is_not_modified(self):
+        for name in ('dashboard_stats', 'predictions_stats'):
+            first, _ = self.poll(name)
+            self.assertEqual(first.status_code, 200)
+
+            response, tables = self.poll(name, if_none_match=first['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(tables, set())
+
+            response, tables = self.poll(name, if_modified_since=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(tables, set())
+
+    def test_bump_from_another_process_changes_etag(self):
+        first, _ = self.poll('dashboard_stats')
+        profile = UserProfile.objects.get(user=self.user)
+        # As nightly_maintenance or replay_xp would, from a process of its own
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             f"from tracker.caching import bump_profile_version; bump_profile_version({profile.pk})"],
+            cwd=settings.BASE_DIR, check=True, capture_output=True,
+        )
+
+        response, _ = self.poll('dashboard_stats', if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_process_local_version_cache_is_flagged(self):
+        self.assertEqual(check_version_cache(None), [])
+        with self.settings(TRACKER_VERSION_CACHE_ALIAS='default'):
+            self.assertEqual([warning.id for warning in check_version_cache(None)], ['tracker.W001'])
+
+    def test_unusable_income_is_a_bad_request(self):
+        for name in ('predictions_stats', 'predictions', 'predictions_async'):
+            for income in ('abc', '-5', '1.5'):
+                response = self.client.get(reverse(name), {'income': income})
+                self.assertEqual(response.status_code, 400, (name, income))
+        response = self.client.get(reverse('predictions_stats'), {'income': '60000'})
+        self.assertEqual(response.json()['monthly_income'], 60000)
+
+    def test_write_changes_etag(self):
+        first, _ = self.poll('dashboard_stats')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_expense'), {
+                'amount': '120', 'description': 'Lunch', 'category': 'Food',
+                'date': timezone.localdate().isoformat(),
+            })
+
+        response, _ = self.poll('dashboard_stats', if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['total_expenses'], 1)
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class PaginationTests(TestCase):
+    """Keyset pages cover the list exactly once, however many rows share a date."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('pager', password='pager')
+        self.client.force_login(self.user)
+        food = Category.objects.get(name='Food')
+        today = timezone.localdate()
+        for i in range(7):
+            Expense.objects.create(
+                user=self.user, amount=Decimal(10 + i), description=f"Row {i}", category=food,
+                date=today - timedelta(days=i // 5),
+            )
+        # Five rows on one day with one timestamp leave only the id to order them
+        Expense.objects.filter(date=today).update(created_at=timezone.now())
+
+    def walk(self, page_size):
+        pages, cursor = [], None
+        while True:
+            page, cursor = paginate_expenses(Expense.objects.for_user(self.user), cursor=cursor, page_size=page_size)
+            pages.append([expense.pk for expense in page])
+            if cursor is None:
+                return pages
+
+    def test_cursor_round_trip(self):
+        expense = Expense.objects.for_user(self.user).first()
+        self.assertEqual(decode_cursor(encode_cursor(expense)), (expense.date, expense.created_at, expense.pk))
+
+    def test_pages_split_rows_sharing_a_date(self):
+        expected = list(
+            Expense.objects.for_user(self.user).order_by('-date', '-created_at', '-id').values_list('pk', flat=True)
+        )
+        for page_size in (1, 2, 3, 5, 7):
+            pages = self.walk(page_size)
+            self.assertEqual([pk for page in pages for pk in page], expected, page_size)
+            self.assertTrue(all(len(page) == page_size for page in pages[:-1]), page_size)
+
+    def test_bad_cursor_is_a_bad_request(self):
+        for cursor in ('not-a-cursor', 'e30', 'NQ', encode_cursor(Expense.objects.first())[:-4]):
+            response = self.client.get(reverse('expense_list_page'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_appended_rows_show_dates_like_rendered_rows(self):
+        response = self.client.get(reverse('expense_list'))
+        rendered = re.findall(r'<span class="date-badge">([^<]+)</span>', response.content.decode())
+
+        _, cursor = paginate_expenses(Expense.objects.for_user(self.user), page_size=5)
+        row = self.client.get(reverse('expense_list_page'), {'cursor': cursor}).json()['expenses'][0]
+        self.assertEqual(row['date'], (timezone.localdate() - timedelta(days=1)).isoformat())
+        self.assertEqual(row['date_display'], rendered[5])
+
+
+class LoginRequiredTests(TestCase):
+    """Every per-user page sends anonymous visitors to the login page."""
+
+    def test_anonymous_requests_redirect(self):
+        for name in ('dashboard', 'add_expense', 'import_expenses', 'export_expenses', 'expense_list',
+                     'expense_list_page', 'challenges', 'achievements', 'leaderboard', 'predictions',
+                     'dashboard_async', 'predictions_async', 'dashboard_stats', 'predictions_stats', 'settings'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 302, name)
+            self.assertIn('login', response['Location'], name)
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class ImportTests(TestCase):
+    """Imports store each row once and keep the rollup and profile counters in step with what was stored."""
+
+    CSV = (
+        "date,description,amount,category,reference\n"
+        "2026-01-05,Lunch,10.00,Food,a1\n"
+        "2026-01-05,Lunch,10.00,Food,a1\n"
+        "2026-01-06,Bus,4.50,Transport,a2\n"
+    )
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('importer', password='importer')
+        self.profile = UserProfile.objects.create(user=self.user, unlocked_themes=['dark'], unlocked_insights=[])
+
+    def run_import(self, text):
+        stats = import_expenses(iter_csv_rows(io.StringIO(text)), self.profile)
+        self.profile.refresh_from_db()
+        return stats
+
+    def assert_stored(self, expenses, rollup_total, rollup_count):
+        self.assertEqual(Expense.objects.for_user(self.user).count(), expenses)
+        self.assertEqual(self.profile.expense_count, expenses)
+        rollups = ExpenseRollup.objects.for_user(self.user)
+        self.assertEqual(sum(r.total_amount for r in rollups), rollup_total)
+        self.assertEqual(sum(r.expense_count for r in rollups), rollup_count)
+
+    def test_duplicated_row_in_file_is_stored_once(self):
+        stats = self.run_import(self.CSV)
+        self.assertEqual((stats.inserted, stats.duplicates), (2, 1))
+        self.assert_stored(2, Decimal('14.50'), 2)
+
+    def test_reimporting_a_file_adds_nothing(self):
+        self.run_import(self.CSV)
+        stats = self.run_import(self.CSV)
+        self.assertEqual((stats.inserted, stats.duplicates), (0, 3))
+        self.assert_stored(2, Decimal('14.50'), 2)
+
+    def test_rows_without_reference_match_after_the_file_shifts(self):
+        rows = "2026-01-05,Coffee,3.00,Food\n2026-01-05,Coffee,3.00,Food\n2026-01-06,Bus,4.50,Transport\n"
+        header = "date,description,amount,category\n"
+        self.assertEqual(self.run_import(header + rows).inserted, 3)
+        stats = self.run_import(header + "2026-01-07,Cinema,9.00,Entertainment\n" + rows)
+        self.assertEqual((stats.inserted, stats.duplicates), (1, 3))
+        self.assert_stored(4, Decimal('19.50'), 4)
+
+    def test_unusable_amounts_are_row_errors(self):
+        stats = self.run_import(
+            "date,description,amount,category\n"
+            "2026-01-05,A,NaN,Food\n"
+            "2026-01-05,B,Infinity,Food\n"
+            "2026-01-05,C,1e30,Food\n"
+            "2026-01-05,D,12.50,Food\n"
+        )
+        self.assertEqual((stats.inserted, stats.invalid), (1, 3))
+        self.assert_stored(1, Decimal('12.50'), 1)
+
+    def test_upload_with_a_bad_amount_reports_it(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('bank.csv', b"date,description,amount,category\n2026-01-05,A,NaN,Food\n")
+        response = self.client.post(reverse('import_expenses'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'].invalid, 1)
+
+    def test_command_requires_a_user(self):
+        with self.assertRaises(CommandError):
+            call_command('import_expenses', 'missing.csv')
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class GamificationJobTests(TestCase):
+    """Queued gamification work is merged per day, applied exactly once and retried on failure."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('jobs', password='jobs')
+        self.profile = UserProfile.objects.create(user=self.user, unlocked_themes=['dark'], unlocked_insights=[])
+        self.today = timezone.now().date()
+
+    def enqueue(self, count=1, day=None):
+        for _ in range(count):
+            tasks.enqueue_expense_logged(self.profile, day or self.today)
+        return GamificationJob.objects.get(user_profile=self.profile, logged_on=day or self.today, status='pending')
+
+    def fail_steps(self):
+        def failing(count, day=None):
+            def step(profile):
+                raise RuntimeError("boom")
+            return step
+        original = tasks.expenses_logged
+        tasks.expenses_logged = failing
+        self.addCleanup(setattr, tasks, 'expenses_logged', original)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_expenses_on_one_day_merge_into_one_job(self):
+        job = self.enqueue(3)
+        self.assertEqual(job.expenses, 3)
+        self.assertEqual(GamificationJob.objects.filter(user_profile=self.profile).count(), 1)
+
+    def test_only_one_job_per_day_can_be_pending(self):
+        job = self.enqueue()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GamificationJob.objects.create(user_profile=self.profile, logged_on=self.today)
+        # Finished or failed jobs for the day don't hold the slot
+        GamificationJob.objects.filter(pk=job.pk).update(status='done')
+        self.assertEqual(self.enqueue().expenses, 1)
+        self.assertEqual(GamificationJob.objects.filter(user_profile=self.profile).count(), 2)
+
+    def test_enqueue_racing_another_request_joins_its_job(self):
+        # The other request's job lands between our update and our insert
+        self.enqueue()
+        update = QuerySet.update
+        missed = []
+
+        def update_before_rival(queryset, **kwargs):
+            if not missed:
+                missed.append(queryset)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_before_rival):
+            tasks.enqueue_expense_logged(self.profile, self.today)
+        job = GamificationJob.objects.get(user_profile=self.profile)
+        self.assertEqual((job.status, job.expenses), ('pending', 2))
+
+    def test_job_is_claimed_once(self):
+        job = self.enqueue()
+        self.assertTrue(tasks._claim(job))
+        self.assertFalse(tasks._claim(GamificationJob.objects.get(pk=job.pk)))
+
+    def test_job_applies_its_expenses_once(self):
+        job = self.enqueue(2)
+        tasks.run_job(job)
+        self.assertIsNone(tasks.run_job(GamificationJob.objects.get(pk=job.pk)))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.expense_count, 2)
+        self.assertEqual(self.profile.last_expense_date, self.today)
+        self.assertEqual(GamificationJob.objects.get(pk=job.pk).status, 'done')
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        self.fail_steps()
+        job = self.enqueue()
+        tasks.run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        for _ in range(tasks.JOB_MAX_ATTEMPTS - 1):
+            tasks.run_job(job)
+            job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', tasks.JOB_MAX_ATTEMPTS))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.expense_count, 0)
+
+    def test_retried_job_merges_into_the_days_pending_job(self):
+        job = self.enqueue(2)
+        GamificationJob.objects.filter(pk=job.pk).update(status='failed', attempts=tasks.JOB_MAX_ATTEMPTS)
+        self.enqueue()
+        self.assertEqual(tasks.retry_failed_jobs(GamificationJob.objects.all()), 1)
+        pending = GamificationJob.objects.get(user_profile=self.profile)
+        self.assertEqual((pending.status, pending.expenses, pending.attempts), ('pending', 3, 0))
+
+    def test_stale_running_job_is_requeued(self):
+        job = self.enqueue()
+        tasks._claim(job)
+        GamificationJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - 2 * tasks.JOB_STALE_AFTER)
+        self.assertEqual(tasks.requeue_stale_jobs(), 1)
+        self.assertEqual(GamificationJob.objects.get(pk=job.pk).status, 'pending')
+        self.assertEqual(tasks.run_pending_jobs(self.profile), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.expense_count, 1)
+
+    def test_stale_job_requeued_over_a_new_pending_job_merges_into_it(self):
+        job = self.enqueue(2)
+        tasks._claim(job)
+        GamificationJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - 2 * tasks.JOB_STALE_AFTER)
+        self.enqueue()
+        self.assertEqual(tasks.requeue_stale_jobs(), 1)
+        pending = GamificationJob.objects.get(user_profile=self.profile)
+        self.assertEqual((pending.status, pending.expenses), ('pending', 3))
+        self.assertNotEqual(pending.pk, job.pk)
+
+    def test_older_job_run_late_keeps_the_streak(self):
+        UserProfile.objects.filter(pk=self.profile.pk).update(
+            current_streak=3, longest_streak=3, last_expense_date=self.today,
+        )
+        job = self.enqueue(day=self.today - timedelta(days=5))
+        tasks.run_job(job)
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.current_streak, self.profile.last_expense_date), (3, self.today))
+        self.assertEqual(self.profile.expense_count, 1)
+
+
+# The writer commits on its own thread and connection, which a TestCase's
+# wrapping transaction would hide; these tests commit for real
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0, TRACKER_WRITER_ENABLED=True)
+class ExpenseWriterTests(TransactionTestCase):
+    """Rows handed to the writer are committed together, and a failure only fails the rows it belongs to."""
+
+    # Keeps the catalogue seeded by the migrations across the table flushes
+    serialized_rollback = True
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('writer', password='writer')
+        self.profile = UserProfile.objects.create(user=self.user, unlocked_themes=['dark'], unlocked_insights=[])
+        self.category = Category.objects.get(name='Food')
+        self.addCleanup(writer.stop_writer)
+
+    def row(self, amount='10.00'):
+        fields = {'amount': amount, 'description': 'Lunch', 'date': timezone.now().date(), 'category': self.category}
+        return (self.profile, fields, Future())
+
+    def test_write_expense_goes_through_the_writer(self):
+        expense = writer.write_expense(self.profile, **self.row()[1])
+        self.assertEqual(writer.get_writer().commits, 1)
+        self.assertEqual(Expense.objects.get(pk=expense.pk).amount, Decimal('10.00'))
+        self.assertEqual(GamificationJob.objects.get(user_profile=self.profile).expenses, 1)
+
+    def test_bad_row_fails_only_its_own_request(self):
+        batch = [self.row('10.00'), self.row(None), self.row('4.50')]
+        expense_writer = writer.ExpenseWriter()
+        expense_writer._commit(batch)
+
+        self.assertEqual(expense_writer.commits, 1)
+        self.assertIsInstance(batch[0][2].result(), Expense)
+        self.assertIsNotNone(batch[1][2].exception())
+        self.assertIsInstance(batch[2][2].result(), Expense)
+        self.assertEqual(sorted(Expense.objects.for_user(self.user).values_list('amount', flat=True)),
+                         [Decimal('4.50'), Decimal('10.00')])
+        self.assertEqual(ExpenseRollup.objects.for_user(self.user).get().expense_count, 2)
+        self.assertEqual(GamificationJob.objects.get(user_profile=self.profile).expenses, 2)
+
+    def locked_on_first(self, failures):
+        """A transaction.atomic whose first ``failures`` outer transactions hit a locked database."""
+        atomic = transaction.atomic
+        calls = []
+
+        def flaky(*args, **kwargs):
+            if not connection.in_atomic_block and len(calls) < failures:
+                calls.append(1)
+                raise OperationalError("database is locked")
+            return atomic(*args, **kwargs)
+        return mock.patch.object(writer.transaction, 'atomic', flaky)
+
+    def test_locked_commit_is_retried(self):
+        batch = [self.row(), self.row('4.50')]
+        expense_writer = writer.ExpenseWriter()
+        with self.locked_on_first(writer.WRITER_COMMIT_ATTEMPTS - 1):
+            expense_writer._commit(batch)
+
+        self.assertEqual(expense_writer.commits, 1)
+        stored = Expense.objects.in_bulk([future.result().pk for _, _, future in batch])
+        self.assertEqual(sorted(expense.amount for expense in stored.values()), [Decimal('4.50'), Decimal('10.00')])
+
+    def test_commit_gives_up_after_its_attempts(self):
+        batch = [self.row(), self.row('4.50')]
+        expense_writer = writer.ExpenseWriter()
+        with self.locked_on_first(writer.WRITER_COMMIT_ATTEMPTS):
+            expense_writer._commit(batch)
+
+        self.assertEqual(expense_writer.commits, 0)
+        for _, _, future in batch:
+            self.assertIsInstance(future.exception(), OperationalError)
+        self.assertFalse(Expense.objects.for_user(self.user).exists())
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class MaintenanceTests(TestCase):
+    """Nightly maintenance settles expired challenges in bulk, awarding XP the way a page load would."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.track = Challenge.objects.create(
+            title='Log one', description='', challenge_type='daily', category='track', target_value=1, xp_reward=30,
+        )
+        get_catalog(refresh=True)
+        self.profiles = []
+        for name in ('logger', 'idler', 'busy'):
+            user = User.objects.create_user(name, password=name)
+            profile = UserProfile.objects.create(user=user, unlocked_themes=['dark'], unlocked_insights=[])
+            uc = UserChallenge.objects.create(user_profile=profile, challenge=self.track)
+            UserChallenge.objects.filter(pk=uc.pk).update(started_at=start_of_day(self.yesterday) + timedelta(hours=12))
+            self.profiles.append(profile)
+        food = Category.objects.get(name='Food')
+        for profile in (self.profiles[0], self.profiles[2]):
+            Expense.objects.create(user=profile.user, amount='5.00', description='Tea', category=food, date=self.yesterday)
+
+    def test_expired_challenges_are_settled(self):
+        stats = process_chunk(self.profiles[0].pk, self.profiles[-1].pk + 1, self.today.isoformat())
+        self.assertEqual((stats['challenges_completed'], stats['challenges_failed']), (2, 1))
+
+        statuses = dict(UserChallenge.objects.values_list('user_profile__user__username', 'status'))
+        self.assertEqual(statuses, {'logger': 'completed', 'idler': 'failed', 'busy': 'completed'})
+        for profile, xp in zip(self.profiles, (30, 0, 30)):
+            before = profile.version
+            profile.refresh_from_db()
+            self.assertEqual((profile.xp, profile.challenges_completed), (xp, xp // 30))
+            self.assertEqual(sum(XPEvent.objects.filter(user_profile=profile).values_list('xp', flat=True)), xp)
+            if xp:
+                self.assertGreater(profile.version, before)
+
+    def test_expiry_queries_do_not_grow_with_profiles(self):
+        with CaptureQueriesContext(connection) as queries:
+            process_chunk(self.profiles[0].pk, self.profiles[-1].pk + 1, self.today.isoformat())
+        challenge_writes = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "tracker_userchallenge"')]
+        profile_writes = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "tracker_userprofile"')]
+        self.assertEqual(len(challenge_writes), 1)
+        # One bulk write for the completion XP, one for the streak decay
+        self.assertLessEqual(len(profile_writes), 2)
+
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+@override_settings(
+    TRACKER_READ_ALIAS=None,
+    CACHES={
+        **settings.CACHES,
+        'default': {**LOCMEM, 'LOCATION': 'default'},
+        'tracker': {**LOCMEM, 'LOCATION': 'tracker'},
+    },
+    TRACKER_CACHE_ALIAS='tracker',
+)
+class LeaderboardCacheTests(TestCase):
+    """The leaderboard is cached in the TRACKER_CACHE_ALIAS cache, like every other tracker cache."""
+
+    def test_top_entries_use_the_tracker_cache(self):
+        key = _cache_key('weekly', period_start('weekly'))
+        top_entries('weekly')
+        self.assertIsNotNone(caches['tracker'].get(key))
+        self.assertIsNone(caches['default'].get(key))
+
+        refresh_leaderboard('weekly')
+        self.assertEqual(caches['tracker'].get(key), [])
+
+
+class LeaderboardRankTests(TestCase):
+    """Profiles are ranked by XP for the period, with equal XP sharing a rank."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.profiles = {}
+        for name, xp in (('ada', 300), ('bob', 200), ('cy', 200), ('dee', 100), ('eve', 0)):
+            user = User.objects.create_user(name, password=name)
+            profile = UserProfile.objects.create(user=user, xp=xp, unlocked_themes=['dark'], unlocked_insights=[])
+            if xp:
+                XPEvent.objects.create(user_profile=profile, source='adjustment', amount=xp, xp=xp)
+            self.profiles[name] = profile
+
+    def ranks(self, period_type):
+        return {name: getattr(rank_of(profile, period_type), 'rank', None) for name, profile in self.profiles.items()}
+
+    def test_ties_share_a_rank_and_skip_the_next(self):
+        for period_type in PERIOD_TYPES:
+            self.assertEqual(refresh_leaderboard(period_type), 4, period_type)
+            self.assertEqual(self.ranks(period_type), {'ada': 1, 'bob': 2, 'cy': 2, 'dee': 4, 'eve': None})
+            top = top_entries(period_type)
+            self.assertEqual([(row['name'], row['rank'], row['xp']) for row in top], [
+                ('ada', 1, 300), ('bob', 2, 200), ('cy', 2, 200), ('dee', 4, 100),
+            ])
+
+    def test_rank_of_follows_the_latest_refresh(self):
+        refresh_leaderboard('weekly')
+        XPEvent.objects.create(user_profile=self.profiles['dee'], source='adjustment', amount=250, xp=250)
+        self.assertEqual(rank_of(self.profiles['dee'], 'weekly').rank, 4)
+
+        refresh_leaderboard('weekly')
+        entry = rank_of(self.profiles['dee'], 'weekly')
+        self.assertEqual((entry.rank, entry.xp_earned), (1, 350))
+        self.assertEqual(self.ranks('weekly')['ada'], 2)
+
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+SERVER_TIMING_TEMPLATE = re.compile(r'template;dur=([\d.]+)')
+
+
+# The async views load their data on pool threads with connections of their
+# own, which only see committed rows
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class AsyncViewTests(TransactionTestCase):
+    """The ASGI views render the same context as the views they mirror."""
+
+    serialized_rollback = True
+
+    def setUp(self):
+        self.user = User.objects.create_user('async', password='async')
+        profile = UserProfile.objects.create(user=self.user, unlocked_themes=['dark'], unlocked_insights=[])
+        today = timezone.localdate()
+        for day, category in enumerate(('Food', 'Transport', 'Food', 'Bills', 'Shopping', 'Food', 'Bills')):
+            Expense.objects.create(
+                user=self.user, amount=Decimal(40 + 15 * day), description=f"{category} {day}",
+                category=Category.objects.get(name=category), date=today - timedelta(days=day * 3),
+            )
+        challenge = Challenge.objects.create(
+            title="Track daily", description="Log expenses", challenge_type='daily', category='track', target_value=3,
+        )
+        UserChallenge.objects.create(user_profile=profile, challenge=challenge)
+        self.client.force_login(self.user)
+
+    def context_of(self, name, data=None):
+        # Start cold, so the view computes its context instead of reading the other one's
+        for cache in caches.all():
+            cache.clear()
+        response = self.client.get(reverse(name), data)
+        self.assertEqual(response.status_code, 200, name)
+        return response.context
+
+    def assert_same_context(self, sync_name, async_name, keys, data=None):
+        expected = self.context_of(sync_name, data)
+        actual = self.context_of(async_name, data)
+        for key in keys:
+            self.assertEqual(actual[key], expected[key], key)
+
+    def test_dashboard(self):
+        profile = UserProfile.objects.get(user=self.user)
+        keys = views.dashboard_context(profile, timezone.now().date())
+        self.assertTrue(keys['recent_expenses'])
+        self.assert_same_context('dashboard', 'dashboard_async', ['profile', *keys])
+
+    def test_predictions(self):
+        profile = UserProfile.objects.get(user=self.user)
+        keys = views.predictions_context(profile, 45000, timezone.now().date())
+        self.assert_same_context('predictions', 'predictions_async', ['profile', *keys], {'income': 45000})
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class PerformanceMiddlewareTests(TestCase):
+    """Server-Timing covers queries and template rendering, in sync and async stacks alike."""
+
+    @staticmethod
+    def timings(response):
+        header = response['Server-Timing']
+        return int(SERVER_TIMING_QUERIES.search(header)[1]), float(SERVER_TIMING_TEMPLATE.search(header)[1])
+
+    def test_sync_request_times_queries_and_templates(self):
+        def view(request):
+            User.objects.count()
+            return HttpResponse(render_to_string('signup.html', request=request))
+
+        middleware = PerformanceMiddleware(view)
+        self.assertFalse(iscoroutinefunction(middleware))
+        queries, template_ms = self.timings(middleware(RequestFactory().get('/')))
+        self.assertEqual(queries, 1)
+        self.assertGreater(template_ms, 0)
+
+    def test_request_is_logged_as_one_json_line(self):
+        middleware = PerformanceMiddleware(lambda request: HttpResponse())
+        with self.assertLogs('tracker.performance', 'INFO') as logs:
+            middleware(RequestFactory().get('/somewhere/'))
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['event'], line['path'], line['status']), ('request', '/somewhere/', 200))
+
+    async def test_async_request_is_handled_natively(self):
+        async def view(request):
+            await sync_to_async(User.objects.count)()
+            return HttpResponse()
+
+        middleware = PerformanceMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        queries, template_ms = self.timings(await middleware(RequestFactory().get('/')))
+        self.assertEqual((queries, template_ms), (1, 0))
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class ChallengeEvaluatorTests(TestCase):
+    """Progress and outcome of each challenge category, during its period and once it is over."""
+
+    MONDAY = date(2026, 1, 5)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('challenger', password='challenger')
+        self.profile = UserProfile.objects.create(user=self.user, unlocked_themes=['dark'], unlocked_insights=[])
+        self.food = Category.objects.get(name='Food')
+        self.transport = Category.objects.get(name='Transport')
+
+    def start(self, category, target, challenge_type='weekly', **fields):
+        challenge = Challenge.objects.create(
+            title=category, description='', challenge_type=challenge_type, category=category,
+            target_value=target, xp_reward=40, **fields,
+        )
+        get_catalog(refresh=True)
+        uc = UserChallenge.objects.create(user_profile=self.profile, challenge=challenge)
+        UserChallenge.objects.filter(pk=uc.pk).update(started_at=start_of_day(self.MONDAY) + timedelta(hours=9))
+        return uc
+
+    def spend(self, amount, day=MONDAY, category=None):
+        Expense.objects.create(
+            user=self.user, amount=amount, description='Spend', category=category or self.food, date=day,
+        )
+
+    def evaluate(self, uc, today):
+        update_challenge_progress(self.profile, today=today)
+        uc.refresh_from_db()
+        return uc.status, uc.progress
+
+    def test_track_completes_once_the_target_is_reached(self):
+        uc = self.start('track', 2, challenge_type='daily')
+        self.spend('5.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY), ('active', 50))
+        self.spend('5.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY), ('completed', 100))
+        self.assertEqual((self.profile.xp, self.profile.challenges_completed), (40, 1))
+
+    def test_track_fails_when_the_day_ends_short(self):
+        uc = self.start('track', 2, challenge_type='daily')
+        self.spend('5.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=1)), ('failed', 50))
+        self.assertEqual(self.profile.xp, 0)
+
+    def test_budget_progress_follows_the_week_and_completes_under_budget(self):
+        uc = self.start('budget', 100)
+        self.spend('60.00', self.MONDAY + timedelta(days=1))
+        # Three of the week's seven days have passed
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=2)), ('active', 42))
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=7)), ('completed', 100))
+        self.assertEqual(self.profile.xp, 40)
+
+    def test_budget_fails_as_soon_as_it_is_exceeded(self):
+        uc = self.start('budget', 100)
+        self.spend('60.00')
+        self.spend('60.00', self.MONDAY + timedelta(days=1))
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=1)), ('failed', 0))
+
+    def test_no_spend_only_counts_excluded_categories(self):
+        uc = self.start('no_spend', 0, excluded_categories=['Food'])
+        self.spend('30.00', category=self.transport)
+        self.assertEqual(self.evaluate(uc, self.MONDAY)[0], 'active')
+        self.spend('1.00', self.MONDAY + timedelta(days=1))
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=1)), ('failed', 0))
+
+    def test_no_spend_on_unused_categories_completes(self):
+        uc = self.start('no_spend', 0, excluded_categories=['Never used'])
+        self.spend('30.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=7)), ('completed', 100))
+
+    def save_week(self, target, spent):
+        uc = self.start('save', target)
+        # 280 over the four baseline weeks: 70 expected per week
+        for week in range(1, 5):
+            self.spend('70.00', self.MONDAY - timedelta(weeks=week))
+        self.spend(spent, self.MONDAY + timedelta(days=1))
+        return uc
+
+    def test_save_progress_and_completion(self):
+        uc = self.save_week(50, '10.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=3)), ('active', 100))
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=7)), ('completed', 100))
+
+    def test_save_fails_short_of_the_target(self):
+        uc = self.save_week(50, '40.00')
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=3)), ('active', 60))
+        self.assertEqual(self.evaluate(uc, self.MONDAY + timedelta(days=7)), ('failed', 60))
+        self.assertEqual(self.profile.challenges_completed, 0)
+
+
+class RollupTests(TestCase):
+    """The rollup table always equals the Expense table aggregated by user, date and category."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('rolled', password='rolled')
+        self.food = Category.objects.get(name='Food')
+        self.transport = Category.objects.get(name='Transport')
+        self.today = timezone.localdate()
+
+    def assert_consistent(self):
+        expected = {
+            (row['date'], row['category_id']): (row['total'], row['count'])
+            for row in Expense.objects.for_user(self.user).order_by()
+            .values('date', 'category_id').annotate(total=Sum('amount'), count=Count('id'))
+        }
+        stored = {
+            (rollup.date, rollup.category_id): (rollup.total_amount, rollup.expense_count)
+            for rollup in ExpenseRollup.objects.for_user(self.user)
+        }
+        self.assertEqual(stored, expected)
+
+    def add(self, amount, category=None, day=None):
+        return Expense.objects.create(
+            user=self.user, amount=amount, description='Rolled',
+            category=category or self.food, date=day or self.today,
+        )
+
+    def test_create_update_and_delete_keep_rollups_in_step(self):
+        lunch = self.add('12.50')
+        self.add('7.25')
+        bus = self.add('3.00', self.transport)
+        self.assert_consistent()
+        food = ExpenseRollup.objects.for_user(self.user).get(category=self.food)
+        self.assertEqual((food.total_amount, food.expense_count), (Decimal('19.75'), 2))
+
+        # Form-style string amounts, then a move to another category and day
+        lunch.amount = '15.05'
+        lunch.save()
+        self.assert_consistent()
+        lunch.category = self.transport
+        lunch.date = self.today - timedelta(days=1)
+        lunch.amount = Decimal('15.05')
+        lunch.save()
+        self.assert_consistent()
+
+        bus.delete()
+        self.assert_consistent()
+        lunch.delete()
+        self.assert_consistent()
+        self.assertEqual(ExpenseRollup.objects.for_user(self.user).count(), 1)
+
+    def test_deleting_the_last_expense_removes_the_row(self):
+        self.add('5.00').delete()
+        self.assertFalse(ExpenseRollup.objects.for_user(self.user).exists())
+
+
+class ForecastingTests(TestCase):
+    """The forecast follows the level and trend of the user's daily spend, with or without NumPy."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('forecast', password='forecast')
+        self.food = Category.objects.get(name='Food')
+        self.transport = Category.objects.get(name='Transport')
+        self.today = timezone.localdate()
+
+    def spend(self, amounts, category=None):
+        """One expense a day, the last amount falling on today."""
+        for days_ago, amount in enumerate(reversed(amounts)):
+            Expense.objects.create(
+                user=self.user, amount=Decimal(amount), description='Forecast',
+                category=category or self.food, date=self.today - timedelta(days=days_ago),
+            )
+
+    def fit(self):
+        return fit_forecast(self.today, ExpenseRollup.objects.for_user(self.user))
+
+    def test_empty_history_forecasts_nothing(self):
+        self.assertIsNone(self.fit())
+        with mock.patch('tracker.forecasting.np', None):
+            self.assertIsNone(self.fit())
+        self.assertEqual(forecast_daily(None, self.today, horizon=7), [0.0] * 7)
+
+    def test_steady_spend_forecasts_the_same(self):
+        self.spend([100] * 28)
+        model = self.fit()
+        self.assertAlmostEqual(model['level'], 100.0)
+        self.assertAlmostEqual(model['trend'], 0.0)
+        self.assertEqual(model['days_observed'], 28)
+        for forecast in forecast_daily(model, self.today, horizon=14):
+            self.assertAlmostEqual(forecast, 100.0)
+
+    def test_rising_spend_has_a_rising_forecast(self):
+        self.spend([10 + 5 * day for day in range(28)])
+        self.spend([20] * 28, self.transport)
+        model = self.fit()
+        self.assertAlmostEqual(model['category_trends']['Food'], 5.0)
+        self.assertAlmostEqual(model['category_trends']['Transport'], 0.0)
+        self.assertGreater(model['trend'], 0)
+        self.assertGreater(sum(forecast_daily(model, self.today, horizon=7)[-3:]), 3 * (10 + 5 * 27))
+
+    def test_fallback_without_numpy_is_a_flat_average(self):
+        # 40 days of history, of which only the last 30 count
+        self.spend([500] * 10 + [10, 30] * 15)
+        with mock.patch('tracker.forecasting.np', None):
+            model = self.fit()
+        self.assertEqual(model, {
+            'level': 20.0, 'trend': 0.0, 'weekday_factors': [1.0] * 7, 'category_trends': {}, 'days_observed': 30,
+        })
+        self.assertEqual(forecast_daily(model, self.today, horizon=3), [20.0] * 3)
+
+
+class CatalogSnapshotTests(TestCase):
+    """Each process reloads its catalogue snapshot when the shared stamp moves, or once it is too old."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.challenge = Challenge.objects.create(
+            title='Snapshot', description='', challenge_type='daily', category='track', target_value=1,
+        )
+        get_catalog(refresh=True)
+
+    def edit_elsewhere(self):
+        # An edit made by another process: this one only sees the database and the shared stamp
+        Challenge.objects.filter(pk=self.challenge.pk).update(title='Edited')
+
+    def test_snapshot_is_reused_while_the_stamp_is_unchanged(self):
+        self.edit_elsewhere()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_catalog().challenges[self.challenge.pk].title, 'Snapshot')
+
+    def test_stamp_bumped_by_another_process_reloads(self):
+        self.edit_elsewhere()
+        get_version_cache().set(_version_key(CATALOG_SCOPE), time.time_ns(), None)
+        self.assertEqual(get_catalog().challenges[self.challenge.pk].title, 'Edited')
+
+    def test_old_snapshot_is_reloaded_without_a_stamp_change(self):
+        self.edit_elsewhere()
+        with self.settings(TRACKER_CATALOG_MAX_AGE=0):
+            self.assertEqual(get_catalog().challenges[self.challenge.pk].title, 'Edited')
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class XPLedgerTests(TestCase):
+    """Levels follow the XP curve, and replaying the ledger restores XP, level and unlocks."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.profile = UserProfile.objects.create(
+            user=User.objects.create_user('ledger', password='ledger'), unlocked_themes=['dark'], unlocked_insights=[],
+        )
+
+    def test_level_for_xp_matches_the_thresholds(self):
+        self.assertEqual([level_for_xp(xp) for xp in (-5, 0, 99, 100, 299, 300, 599, 600)], [1, 1, 1, 2, 2, 3, 3, 4])
+        for level in range(1, 500):
+            threshold = xp_for_level(level)
+            self.assertEqual(level_for_xp(threshold), level)
+            self.assertEqual(level_for_xp(threshold - 1), max(level - 1, 1))
+
+    def award(self, *amounts, multiplier=1.0):
+        for amount in amounts:
+            XPEvent.objects.create(
+                user_profile=self.profile, source='expense', amount=amount, multiplier=multiplier,
+                xp=XPEvent.award(amount, multiplier),
+            )
+
+    def test_replay_rebuilds_xp_level_and_unlocks(self):
+        self.award(100, 150, 100)
+        untouched = UserProfile.objects.create(
+            user=User.objects.create_user('untouched'), unlocked_themes=['dark'], unlocked_insights=[],
+        )
+        version = data_version(self.profile)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(replay_xp(batch_size=1), 1)
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.xp, self.profile.level), (350, 3))
+        self.assertEqual(self.profile.version, 1)
+        self.assertEqual(UserProfile.objects.get(pk=untouched.pk).version, 0)
+        # Cached pages and stats ETags built before the replay are not served again
+        self.assertNotEqual(data_version(self.profile), version)
+
+    def test_replay_with_nothing_to_change_is_a_no_op(self):
+        self.award(50)
+        replay_xp()
+        self.assertEqual(replay_xp(), 0)
+
+    def test_reprice_reapplies_the_reward_formula(self):
+        self.award(10, 20, multiplier=1.5)
+        with mock.patch.object(XPEvent, 'award', staticmethod(lambda amount, multiplier: amount * 10)):
+            call_command('replay_xp', '--reprice', stdout=io.StringIO())
+
+        self.assertEqual(sorted(XPEvent.objects.values_list('xp', flat=True)), [100, 200])
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.xp, self.profile.level), (300, 3))
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class AddExpenseTests(TestCase):
+    """The add-expense form files expenses under existing categories only."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('adder', password='adder')
+        self.client.force_login(self.user)
+
+    def post(self, category):
+        self.client.post(reverse('add_expense'), {
+            'amount': '20', 'description': 'Snack', 'category': category,
+            'date': timezone.localdate().isoformat(),
+        })
+        return Expense.objects.for_user(self.user).latest('pk').category.name
+
+    def test_known_category_is_used(self):
+        self.assertEqual(self.post('Food'), 'Food')
+
+    def test_unknown_category_falls_back_without_creating_one(self):
+        categories = Category.objects.count()
+        self.assertEqual(self.post('My secret diary entry'), 'General')
+        self.assertEqual(self.post(''), 'General')
+        self.assertEqual(Category.objects.count(), categories)
+
+
+class MoneyFieldTests(TestCase):
+    """Amounts are stored as integer paise and read back as Decimal rupees."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('money', password='money')
+        self.food = Category.objects.get(name='Food')
+
+    def add(self, amount):
+        expense = Expense.objects.create(
+            user=self.user, amount=amount, description='Money', category=self.food, date=timezone.localdate(),
+        )
+        return Expense.objects.get(pk=expense.pk)
+
+    def raw_amount(self, expense):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM tracker_expense WHERE id = %s', [expense.pk])
+            return cursor.fetchone()[0]
+
+    def test_conversions(self):
+        values = ('12.345', '12.344', Decimal('0.005'), 7, 1.1)
+        self.assertEqual([to_paise(value) for value in values], [1235, 1234, 1, 700, 110])
+        self.assertEqual(from_paise(1235), Decimal('12.35'))
+        self.assertEqual(str(from_paise(-5)), '-0.05')
+
+    def test_amounts_are_rounded_half_up_and_stored_in_paise(self):
+        expense = self.add('12.345')
+        self.assertEqual(self.raw_amount(expense), 1235)
+        self.assertEqual(expense.amount, Decimal('12.35'))
+        self.assertIsInstance(expense.amount, Decimal)
+
+    def test_aggregates_come_back_as_rupees(self):
+        for amount in ('0.10', '0.20', '99999.99'):
+            self.add(amount)
+        total = Expense.objects.for_user(self.user).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(total, Decimal('100000.29'))
+        self.assertIsInstance(total, Decimal)
+        self.assertEqual(Expense.objects.for_user(self.user).aggregate(total=Sum(paise('amount')))['total'], 10000029)
+        rollup = ExpenseRollup.objects.for_user(self.user).get()
+        self.assertEqual(rollup.total_amount, Decimal('100000.29'))
+
+    def test_lookups_take_rupees(self):
+        for amount in ('5.00', '10.00', '10.01'):
+            self.add(amount)
+        expenses = Expense.objects.for_user(self.user)
+        self.assertEqual(expenses.filter(amount__gt='10').count(), 1)
+        self.assertEqual(expenses.filter(amount__gte=Decimal('10.00')).count(), 2)
+        self.assertEqual(expenses.filter(amount=10).count(), 1)
+        self.assertEqual(expenses.filter(amount__lt=5.005).count(), 1)
+
+    def test_invalid_amount_is_a_validation_error(self):
+        with self.assertRaises(ValidationError):
+            Expense._meta.get_field('amount').clean('lots', None)
+
+
+class AmountPaiseMigrationTests(TransactionTestCase):
+    """Migration 0014 moves amounts to paise and back without losing a paisa."""
+
+    serialized_rollback = True
+    BEFORE = [('tracker', '0013_category')]
+    AFTER = [('tracker', '0014_amount_paise')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(self.AFTER)
+
+    def amounts(self, apps):
+        Expense = apps.get_model('tracker', 'Expense')
+        ExpenseRollup = apps.get_model('tracker', 'ExpenseRollup')
+        return (
+            sorted(Expense.objects.values_list('amount', flat=True)),
+            sorted(ExpenseRollup.objects.values_list('total_amount', flat=True)),
+        )
+
+    def test_round_trip(self):
+        apps = self.migrate(self.BEFORE)
+        user = apps.get_model('auth', 'User').objects.create(username='legacy')
+        food = apps.get_model('tracker', 'Category').objects.get(name='Food')
+        day = timezone.localdate()
+        Expense = apps.get_model('tracker', 'Expense')
+        for amount in ('0.01', '12.35', '99999.99'):
+            Expense.objects.create(user=user, amount=Decimal(amount), description='Legacy', category=food, date=day)
+        apps.get_model('tracker', 'ExpenseRollup').objects.create(
+            user=user, date=day, category=food, total_amount=Decimal('100012.35'), expense_count=3,
+        )
+        expected = ([Decimal('0.01'), Decimal('12.35'), Decimal('99999.99')], [Decimal('100012.35')])
+
+        apps = self.migrate(self.AFTER)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM tracker_expense ORDER BY amount')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [1, 1235, 9999999])
+        self.assertEqual(self.amounts(apps), expected)
+
+        apps = self.migrate(self.BEFORE)
+        self.assertEqual(self.amounts(apps), expected)
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class ProfileConflictTests(TestCase):
+    """Two writers holding the same profile row: the stale one replays its step, so no XP is lost or doubled."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.profile = UserProfile.objects.create(
+            user=User.objects.create_user('racer', password='racer'), unlocked_themes=['dark'], unlocked_insights=[],
+        )
+
+    def award(self, amount, calls):
+        def step(profile):
+            calls.append(profile.version)
+            profile.add_xp(amount, source='adjustment')
+        return step
+
+    def test_stale_version_is_not_written(self):
+        first, second = UserProfile.objects.get(pk=self.profile.pk), UserProfile.objects.get(pk=self.profile.pk)
+        first.add_xp(10)
+        self.assertTrue(first.commit_changes())
+        second.add_xp(20)
+        self.assertFalse(second.commit_changes())
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).xp, 10)
+
+    def test_conflicting_step_is_replayed_on_the_fresh_row(self):
+        first, second = UserProfile.objects.get(pk=self.profile.pk), UserProfile.objects.get(pk=self.profile.pk)
+        first_calls, second_calls = [], []
+        run_gamification(first, self.award(10, first_calls))
+        run_gamification(second, self.award(20, second_calls))
+
+        # The second step ran on its stale copy, conflicted, and ran again after a reload
+        self.assertEqual((first_calls, second_calls), ([0], [0, 1]))
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.xp, self.profile.version), (30, 2))
+        events = XPEvent.objects.filter(user_profile=self.profile)
+        self.assertEqual(sorted(events.values_list('xp', flat=True)), [10, 20])
+
+    def test_gives_up_after_repeated_conflicts(self):
+        calls = []
+        with mock.patch.object(UserProfile, 'commit_changes', return_value=False):
+            with self.assertRaises(ProfileConflict):
+                run_gamification(self.profile, self.award(10, calls))
+        self.assertEqual(len(calls), MAX_COMMIT_ATTEMPTS)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.xp, 0)
+        self.assertFalse(XPEvent.objects.filter(user_profile=self.profile).exists())
+
+
+@override_settings(TRACKER_READ_ALIAS=None, TRACKER_TASK_WORKERS=0)
+class OwnershipTests(TestCase):
+    """A user only ever sees their own expenses; unowned demo data can be handed to an account."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.alice = User.objects.create_user('alice', password='alice')
+        self.bob = User.objects.create_user('bob', password='bob')
+        self.food = Category.objects.get(name='Food')
+        self.add(self.alice, "Alice's secret lunch")
+
+    def add(self, user, description, amount='42.00'):
+        return Expense.objects.create(
+            user=user, amount=amount, description=description, category=self.food, date=timezone.localdate(),
+        )
+
+    def test_other_users_expenses_are_invisible(self):
+        self.client.force_login(self.bob)
+        self.assertNotContains(self.client.get(reverse('expense_list')), "Alice's secret lunch")
+        self.assertEqual(self.client.get(reverse('expense_list_page')).json()['expenses'], [])
+        export = b''.join(self.client.get(reverse('export_expenses')).streaming_content).decode()
+        self.assertEqual(export.strip().splitlines(), ['id,date,category,description,amount'])
+        self.assertEqual(self.client.get(reverse('dashboard_stats')).json()['total_expenses'], 0)
+        self.assertFalse(ExpenseRollup.objects.for_user(self.bob).exists())
+
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse('expense_list')), "Alice&#x27;s secret lunch")
+
+    def test_export_command_requires_a_user(self):
+        with self.assertRaises(CommandError):
+            call_command('export_expenses')
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out):
+            call_command('export_expenses', '--user', 'bob')
+        self.assertNotIn('secret', out.getvalue())
+
+    def make_demo_data(self):
+        demo = UserProfile.objects.create(user=None, xp=500, level=4, unlocked_themes=['dark'], unlocked_insights=[])
+        self.add(None, 'Demo groceries', '10.00')
+        self.add(None, 'Demo bus', '2.50')
+        return demo
+
+    def test_claim_demo_data(self):
+        demo = self.make_demo_data()
+        carol = User.objects.create_user('carol', password='carol')
+        call_command('claim_demo_data', '--user', 'carol', stdout=io.StringIO())
+
+        self.assertFalse(Expense.objects.filter(user=None).exists())
+        self.assertFalse(ExpenseRollup.objects.filter(user=None).exists())
+        self.assertEqual(Expense.objects.for_user(carol).count(), 2)
+        rollup = ExpenseRollup.objects.for_user(carol).get()
+        self.assertEqual((rollup.total_amount, rollup.expense_count), (Decimal('12.50'), 2))
+        self.assertEqual(UserProfile.objects.get(user=carol).pk, demo.pk)
+
+        self.client.force_login(carol)
+        self.assertContains(self.client.get(reverse('expense_list')), 'Demo groceries')
+
+    def test_claim_refuses_an_account_with_a_profile(self):
+        self.make_demo_data()
+        UserProfile.objects.create(user=self.bob, unlocked_themes=['dark'], unlocked_insights=[])
+        with self.assertRaises(CommandError):
+            call_command('claim_demo_data', '--user', 'bob', stdout=io.StringIO())
+        self.assertEqual(Expense.objects.filter(user=None).count(), 2)
@@ -4,10 +4,20 @@ from . import views
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('add/', views.add_expense, name='add_expense'),
+    path('import/', views.import_view, name='import_expenses'),
+    path('export/', views.export_view, name='export_expenses'),
     path('list/', views.expense_list, name='expense_list'),
+    path('list/page/', views.expense_list_page, name='expense_list_page'),
     path('challenges/', views.challenges_view, name='challenges'),
     path('achievements/', views.achievements_view, name='achievements'),
     path('leaderboard/', views.leaderboard_view, name='leaderboard'),
     path('predictions/', views.predictions_view, name='predictions'),
+    # Async variants of the same pages for ASGI deployments
+    path('async/', views.dashboard_async, name='dashboard_async'),
+    path('async/predictions/', views.predictions_async, name='predictions_async'),
+    path('api/dashboard/', views.dashboard_stats, name='dashboard_stats'),
+    path('api/predictions/', views.predictions_stats, name='predictions_stats'),
     path('settings/', views.settings_view, name='settings'),
+    path('perf/', views.performance_view, name='performance'),
+    path('signup/', views.signup_view, name='signup'),
 ]
@@ -1,169 +1,113 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum, Count
+import hashlib
+import io
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import login
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.forms import UserCreationForm
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import condition
 from datetime import timedelta
 from .models import (
-    Expense, UserProfile, Achievement, UserAchievement,
-    Challenge, UserChallenge, LeaderboardEntry
+    Expense, ExpenseRollup, UserProfile, UserAchievement, UserChallenge
 )
+from .achievements import achievement_progress, check_achievements, profile_stats
+from .caching import acached_context, cache_timeout, cached_context, data_last_modified, data_version
+from .catalog import attach_categories, existing_category, get_achievement_index, get_catalog
+from .challenges import start_of_day
+from .db import arun_loads, read_only_view, run_loads
+from .gamification import run_gamification
+from .exporter import EXPORT_FORMATS, export_lines
+from .forecasting import fit_forecast, forecast_daily
+from .importer import guess_format, import_expenses, iter_rows
+from .leaderboard import PERIOD_TYPES, rank_of, top_entries
+from .pagination import InvalidCursor, paginate_expenses, serialize_expense
+from .performance import histograms
+from .rollups import category_totals, spending_summary
+from .tasks import collect_new_achievements, settle_gamification
+from .writer import write_expense
+
+
+PROFILE_SESSION_KEY = 'tracker_profile_id'
+
+
+def get_or_create_profile(request):
+    """
+    Get or create the signed-in user's profile.
+
+    The profile id is kept in the session, so after the first request it is
+    a primary-key lookup, done at most once per request.
+    """
+    profile = getattr(request, '_tracker_profile', None)
+    if profile is not None:
+        return profile
+
+    profile_id = request.session.get(PROFILE_SESSION_KEY)
+    if profile_id is not None:
+        profile = UserProfile.objects.filter(pk=profile_id, user_id=request.user.pk).first()
+    if profile is None:
+        # The achievement and challenge catalogue is seeded by migration 0012
+        profile, _ = UserProfile.objects.get_or_create(
+            user=request.user,
+            defaults={
+                'unlocked_themes': ['dark'],
+                'unlocked_insights': []
+            }
+        )
+        request.session[PROFILE_SESSION_KEY] = profile.pk
 
-
-def get_or_create_profile():
-    """Get or create a default user profile (for demo without auth)."""
-    profile, created = UserProfile.objects.get_or_create(
-        user=None,
-        defaults={
-            'unlocked_themes': ['dark'],
-            'unlocked_insights': []
-        }
-    )
-    if created:
-        create_default_achievements()
-        create_default_challenges()
+    # Queued gamification work the workers have not reached yet runs now, so
+    # the page shows its results (form posts leave it queued, and mergeable)
+    if request.method == 'GET' and settle_gamification(profile):
+        profile.refresh_from_db()
+    
+    request._tracker_profile = profile
     return profile
 
 
-def create_default_achievements():
-    """Create default achievements if they don't exist."""
-    achievements = [
-        # Bronze Tier
-        {'name': 'First Steps', 'description': 'Log your first expense', 'icon': '👣', 
-         'tier': 'bronze', 'xp_reward': 25, 'condition_type': 'expense_count', 'condition_value': 1},
-        {'name': 'Getting Started', 'description': 'Log 10 expenses', 'icon': '🌱', 
-         'tier': 'bronze', 'xp_reward': 50, 'condition_type': 'expense_count', 'condition_value': 10},
-        {'name': 'Streak Starter', 'description': 'Maintain a 3-day streak', 'icon': '🔥', 
-         'tier': 'bronze', 'xp_reward': 50, 'condition_type': 'streak', 'condition_value': 3},
-        
-        # Silver Tier
-        {'name': 'Consistent Tracker', 'description': 'Log 50 expenses', 'icon': '📊', 
-         'tier': 'silver', 'xp_reward': 100, 'condition_type': 'expense_count', 'condition_value': 50},
-        {'name': 'Week Warrior', 'description': 'Maintain a 7-day streak', 'icon': '⚔️', 
-         'tier': 'silver', 'xp_reward': 100, 'condition_type': 'streak', 'condition_value': 7},
-        {'name': 'Challenge Accepted', 'description': 'Complete 5 challenges', 'icon': '🎯', 
-         'tier': 'silver', 'xp_reward': 100, 'condition_type': 'challenges', 'condition_value': 5},
-        
-        # Gold Tier
-        {'name': 'Century Club', 'description': 'Log 100 expenses', 'icon': '💯', 
-         'tier': 'gold', 'xp_reward': 200, 'condition_type': 'expense_count', 'condition_value': 100},
-        {'name': 'Fortnight Fighter', 'description': 'Maintain a 14-day streak', 'icon': '🛡️', 
-         'tier': 'gold', 'xp_reward': 200, 'condition_type': 'streak', 'condition_value': 14},
-        {'name': 'Challenge Champion', 'description': 'Complete 15 challenges', 'icon': '🏅', 
-         'tier': 'gold', 'xp_reward': 200, 'condition_type': 'challenges', 'condition_value': 15},
-        
-        # Platinum Tier
-        {'name': 'Expense Expert', 'description': 'Log 250 expenses', 'icon': '🎓', 
-         'tier': 'platinum', 'xp_reward': 350, 'condition_type': 'expense_count', 'condition_value': 250},
-        {'name': 'Month Master', 'description': 'Maintain a 30-day streak', 'icon': '🌙', 
-         'tier': 'platinum', 'xp_reward': 350, 'condition_type': 'streak', 'condition_value': 30},
-        
-        # Diamond Tier
-        {'name': 'Financial Legend', 'description': 'Log 500 expenses', 'icon': '👑', 
-         'tier': 'diamond', 'xp_reward': 500, 'condition_type': 'expense_count', 'condition_value': 500},
-        {'name': 'Streak Immortal', 'description': 'Maintain a 60-day streak', 'icon': '💎', 
-         'tier': 'diamond', 'xp_reward': 500, 'condition_type': 'streak', 'condition_value': 60},
-    ]
-    
-    for ach in achievements:
-        Achievement.objects.get_or_create(name=ach['name'], defaults=ach)
-
-
-def create_default_challenges():
-    """Create default challenges if they don't exist."""
-    challenges = [
-        # Daily Challenges
-        {'title': 'No Dining Out Today', 'description': 'Avoid restaurant expenses for 24 hours',
-         'icon': '🍽️', 'challenge_type': 'daily', 'category': 'no_spend', 
-         'target_value': 0, 'xp_reward': 30, 'excluded_categories': ['Food', 'Dining', 'Restaurant']},
-        {'title': 'Minimalist Monday', 'description': 'Spend less than ₹500 today',
-         'icon': '💰', 'challenge_type': 'daily', 'category': 'budget', 
-         'target_value': 500, 'xp_reward': 35},
-        {'title': 'Track Everything', 'description': 'Log at least 3 expenses today',
-         'icon': '📝', 'challenge_type': 'daily', 'category': 'track', 
-         'target_value': 3, 'xp_reward': 25},
-        {'title': 'No Impulse Day', 'description': 'No shopping/entertainment expenses',
-         'icon': '🛒', 'challenge_type': 'daily', 'category': 'no_spend', 
-         'target_value': 0, 'xp_reward': 40, 'excluded_categories': ['Shopping', 'Entertainment']},
-         
-        # Weekly Challenges
-        {'title': 'Frugal Week', 'description': 'Keep weekly spending under ₹5000',
-         'icon': '📉', 'challenge_type': 'weekly', 'category': 'budget', 
-         'target_value': 5000, 'xp_reward': 100},
-        {'title': 'Tracking Champion', 'description': 'Log expenses every day this week',
-         'icon': '🏆', 'challenge_type': 'weekly', 'category': 'track', 
-         'target_value': 7, 'xp_reward': 150, 'streak_bonus': True},
-        {'title': 'Home Cook Hero', 'description': 'No dining out for a week',
-         'icon': '👨‍🍳', 'challenge_type': 'weekly', 'category': 'no_spend', 
-         'target_value': 0, 'xp_reward': 200, 'excluded_categories': ['Food', 'Dining', 'Restaurant']},
-        {'title': 'Savings Sprint', 'description': 'Save at least ₹1000 this week',
-         'icon': '🏃', 'challenge_type': 'weekly', 'category': 'save', 
-         'target_value': 1000, 'xp_reward': 175},
-    ]
+def signup_view(request):
+    """Create an account and sign straight in."""
+    if request.method == "POST":
+        form = UserCreationForm(request.POST)
+        if form.is_valid():
+            login(request, form.save())
+            return redirect("dashboard")
+    else:
+        form = UserCreationForm()
     
-    for ch in challenges:
-        excluded = ch.pop('excluded_categories', [])
-        Challenge.objects.get_or_create(
-            title=ch['title'], 
-            defaults={**ch, 'excluded_categories': excluded}
-        )
-
-
-def check_achievements(profile):
-    """Check and award any newly earned achievements."""
-    expense_count = Expense.objects.count()
-    earned_achievements = []
-    
-    for achievement in Achievement.objects.all():
-        # Skip if already earned
-        if UserAchievement.objects.filter(user_profile=profile, achievement=achievement).exists():
-            continue
-        
-        earned = False
-        if achievement.condition_type == 'expense_count':
-            earned = expense_count >= achievement.condition_value
-        elif achievement.condition_type == 'streak':
-            earned = profile.current_streak >= achievement.condition_value
-        elif achievement.condition_type == 'challenges':
-            earned = profile.challenges_completed >= achievement.condition_value
-        
-        if earned:
-            UserAchievement.objects.create(user_profile=profile, achievement=achievement)
-            profile.add_xp(achievement.xp_reward)
-            earned_achievements.append(achievement)
-    
-    return earned_achievements
+    return render(request, "signup.html", {'form': form})
 
 
+@login_required
 def add_expense(request):
     """View to add a new expense."""
-    profile = get_or_create_profile()
+    profile = get_or_create_profile(request)
     
     if request.method == "POST":
         amount = request.POST.get("amount")
         description = request.POST.get("description")
         date = request.POST.get("date")
-        category = request.POST.get("category", "General")
+        # Categories are shared by everyone: a user can pick one, not invent one
+        category = existing_category(request.POST.get("category"))
 
-        Expense.objects.create(
+        # Batched with other requests' expenses into one commit (tracker.writer)
+        write_expense(
+            profile,
             amount=amount,
             description=description,
             date=date,
             category=category
         )
-        
-        # Update streak and add XP
-        profile.update_streak()
-        xp_gained = profile.add_xp(10)  # Base 10 XP per expense
-        
-        # Check for new achievements
-        check_achievements(profile)
-        
-        # Update active challenge progress
-        update_challenge_progress(profile)
 
         return redirect("expense_list")
 
-    expenses = Expense.objects.all()
-    total_amount = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
+    summary = spending_summary(ExpenseRollup.objects.for_user(profile.user_id))
     
     # Get active challenges
     active_challenges = UserChallenge.objects.filter(
@@ -173,27 +117,84 @@ def add_expense(request):
     
     context = {
         'profile': profile,
-        'total_expenses': expenses.count(),
-        'total_amount': int(total_amount),
+        'total_expenses': summary['total_expenses'],
+        'total_amount': int(summary['total_amount']),
         'active_challenges': active_challenges,
-        'categories': ['General', 'Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Health', 'Other'],
+        'categories': [category.name for category in get_catalog().listed_categories],
     }
     
     return render(request, "add_expense.html", context)
 
 
+@login_required
+def import_view(request):
+    """Upload a CSV or JSON bank export and import it in batches."""
+    profile = get_or_create_profile(request)
+    stats = None
+    error = None
+    
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if upload is None:
+            error = "Choose a file to import."
+        else:
+            fmt = request.POST.get("format") or guess_format(upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                stats = import_expenses(iter_rows(stream, fmt), profile)
+            except (ValueError, ArithmeticError, UnicodeDecodeError) as exc:
+                error = f"Could not read the file: {exc}"
+    
+    context = {
+        'profile': profile,
+        'stats': stats,
+        'error': error,
+    }
+    
+    return render(request, "import_expenses.html", context)
+
+
+@login_required
+def export_view(request):
+    """Stream expenses as CSV or NDJSON, optionally filtered by date range and category."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    
+    date_field = Expense._meta.get_field('date')
+    try:
+        start = date_field.to_python(request.GET.get('start') or None)
+        end = date_field.to_python(request.GET.get('end') or None)
+    except ValidationError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD")
+    
+    _, content_type, extension = EXPORT_FORMATS[fmt]
+    response = StreamingHttpResponse(
+        export_lines(
+            fmt, request.user.pk, start=start, end=end, category=request.GET.get('category') or None,
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="expenses.{extension}"'
+    return response
+
+
+@login_required
 def expense_list(request):
     """View to display all expenses."""
-    profile = get_or_create_profile()
-    expenses = Expense.objects.all()
-    total_amount = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
+    profile = get_or_create_profile(request)
+    summary = spending_summary(ExpenseRollup.objects.for_user(profile.user_id))
+    total_amount = summary['total_amount']
     
     # Calculate stats
-    unique_dates = expenses.values('date').distinct().count()
+    unique_dates = summary['days_tracked']
     avg_daily = int(total_amount / unique_dates) if unique_dates > 0 else 0
     
-    # Check for new achievements
-    new_achievements = check_achievements(profile)
+    # Only the first page is rendered; the rest is fetched by expense_list_page
+    page, next_cursor = paginate_expenses(Expense.objects.for_user(profile.user_id))
+    
+    # Achievements from queued gamification work, then any newly reached
+    new_achievements = collect_new_achievements(profile) + run_gamification(profile, check_achievements)
     
     # Recent achievements
     recent_achievements = UserAchievement.objects.filter(
@@ -202,7 +203,9 @@ def expense_list(request):
     
     context = {
         'profile': profile,
-        'expenses': expenses,
+        'expenses': page,
+        'next_cursor': next_cursor,
+        'total_expenses': summary['total_expenses'],
         'total_amount': int(total_amount),
         'avg_daily': avg_daily,
         'new_achievements': new_achievements,
@@ -212,46 +215,104 @@ def expense_list(request):
     return render(request, "expense_list.html", context)
 
 
+@login_required
+def expense_list_page(request):
+    """JSON endpoint returning the page of expenses after a cursor (infinite scroll)."""
+    try:
+        page, next_cursor = paginate_expenses(
+            Expense.objects.for_user(request.user.pk),
+            cursor=request.GET.get('cursor'),
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    return JsonResponse({
+        'expenses': [serialize_expense(e) for e in page],
+        'next_cursor': next_cursor,
+    })
+
+
+def dashboard_loads(profile, today):
+    """The dashboard's independent queries, as {name: callable}."""
+    return {
+        # Stats
+        'summary': lambda: spending_summary(
+            ExpenseRollup.objects.for_user(profile.user_id), since=today - timedelta(days=7),
+        ),
+        # Achievements
+        'earned_count': lambda: UserAchievement.objects.filter(user_profile=profile).count(),
+        'total_achievements': lambda: len(get_achievement_index().by_id),
+        # Active challenges
+        'active_challenges': lambda: list(UserChallenge.objects.filter(
+            user_profile=profile, 
+            status='active'
+        ).select_related('challenge')),
+        # Recent activity
+        'recent_expenses': lambda: attach_categories(list(Expense.objects.for_user(profile.user_id)[:5])),
+    }
+
+
+def build_dashboard_context(loaded):
+    summary = loaded['summary']
+    return {
+        'total_expenses': summary['total_expenses'],
+        'total_amount': int(summary['total_amount']),
+        'week_amount': int(summary['since_amount']),
+        'earned_achievements': loaded['earned_count'],
+        'total_achievements': loaded['total_achievements'],
+        'active_challenges': loaded['active_challenges'],
+        'recent_expenses': loaded['recent_expenses'],
+    }
+
+
+def dashboard_context(profile, today):
+    """Data behind the dashboard; cached per profile data version."""
+    return build_dashboard_context(run_loads(dashboard_loads(profile, today)))
+
+
+async def adashboard_context(profile, today):
+    """dashboard_context with its queries run concurrently."""
+    return build_dashboard_context(await arun_loads(dashboard_loads(profile, today)))
+
+
+@login_required
+@read_only_view
 def dashboard(request):
     """Main gamification dashboard."""
-    profile = get_or_create_profile()
-    expenses = Expense.objects.all()
-    
-    # Stats
-    total_amount = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    this_week = expenses.filter(date__gte=timezone.now().date() - timedelta(days=7))
-    week_amount = this_week.aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Achievements
-    earned_count = UserAchievement.objects.filter(user_profile=profile).count()
-    total_achievements = Achievement.objects.count()
+    profile = get_or_create_profile(request)
+    today = timezone.now().date()
     
-    # Active challenges
-    active_challenges = UserChallenge.objects.filter(
-        user_profile=profile, 
-        status='active'
-    ).select_related('challenge')
+    context = {
+        'profile': profile,
+        'cache_version': data_version(profile),
+        'cache_timeout': cache_timeout(),
+        **cached_context(profile, 'dashboard', lambda: dashboard_context(profile, today), today),
+    }
     
-    # Recent activity
-    recent_expenses = expenses[:5]
+    return render(request, "dashboard.html", context)
+
+
+@login_required
+@read_only_view
+async def dashboard_async(request):
+    """The dashboard for ASGI, loading its data concurrently."""
+    profile = await sync_to_async(get_or_create_profile)(request)
+    today = timezone.now().date()
     
     context = {
         'profile': profile,
-        'total_expenses': expenses.count(),
-        'total_amount': int(total_amount),
-        'week_amount': int(week_amount),
-        'earned_achievements': earned_count,
-        'total_achievements': total_achievements,
-        'active_challenges': active_challenges,
-        'recent_expenses': recent_expenses,
+        'cache_version': await sync_to_async(data_version)(profile),
+        'cache_timeout': cache_timeout(),
+        **await acached_context(profile, 'dashboard', lambda: adashboard_context(profile, today), today),
     }
     
-    return render(request, "dashboard.html", context)
+    return await sync_to_async(render)(request, "dashboard.html", context)
 
 
+@login_required
 def challenges_view(request):
     """View all challenges and progress."""
-    profile = get_or_create_profile()
+    profile = get_or_create_profile(request)
     
     # Get or assign daily challenges
     daily_challenges = get_daily_challenges(profile)
@@ -275,19 +336,22 @@ def challenges_view(request):
 
 def get_daily_challenges(profile):
     """Get today's active daily challenges."""
-    today = timezone.now().date()
+    today = timezone.localdate()
+    # A range on started_at (rather than started_at__date) can use the index
+    today_start = start_of_day(today)
+    started_today = {'started_at__gte': today_start, 'started_at__lt': today_start + timedelta(days=1)}
     
     # Check if user has active daily challenges for today
     active = UserChallenge.objects.filter(
         user_profile=profile,
         challenge__challenge_type='daily',
-        started_at__date=today,
-        status='active'
+        status='active',
+        **started_today
     ).select_related('challenge')
     
     if not active.exists():
         # Assign new daily challenges
-        daily = Challenge.objects.filter(challenge_type='daily', is_active=True)[:2]
+        daily = get_catalog().active_challenges('daily')[:2]
         for challenge in daily:
             UserChallenge.objects.create(
                 user_profile=profile,
@@ -297,7 +361,7 @@ def get_daily_challenges(profile):
         active = UserChallenge.objects.filter(
             user_profile=profile,
             challenge__challenge_type='daily',
-            started_at__date=today
+            **started_today
         ).select_related('challenge')
     
     return active
@@ -305,18 +369,18 @@ def get_daily_challenges(profile):
 
 def get_weekly_challenges(profile):
     """Get this week's active weekly challenges."""
-    today = timezone.now().date()
-    week_start = today - timedelta(days=today.weekday())
+    today = timezone.localdate()
+    week_start = start_of_day(today - timedelta(days=today.weekday()))
     
     active = UserChallenge.objects.filter(
         user_profile=profile,
         challenge__challenge_type='weekly',
-        started_at__date__gte=week_start,
+        started_at__gte=week_start,
         status='active'
     ).select_related('challenge')
     
     if not active.exists():
-        weekly = Challenge.objects.filter(challenge_type='weekly', is_active=True)[:2]
+        weekly = get_catalog().active_challenges('weekly')[:2]
         for challenge in weekly:
             UserChallenge.objects.create(
                 user_profile=profile,
@@ -326,138 +390,94 @@ def get_weekly_challenges(profile):
         active = UserChallenge.objects.filter(
             user_profile=profile,
             challenge__challenge_type='weekly',
-            started_at__date__gte=week_start
+            started_at__gte=week_start
         ).select_related('challenge')
     
     return active
 
 
-def update_challenge_progress(profile):
-    """Update progress on active challenges after expense is logged."""
-    today = timezone.now().date()
-    active_challenges = UserChallenge.objects.filter(
-        user_profile=profile,
-        status='active'
-    ).select_related('challenge')
+def achievements_context(profile):
+    """Achievement catalogue with the profile's earned flags and progress; cached per data version."""
+    # Catalogue (from the shared index) and earned set are each loaded once
+    all_achievements = sorted(
+        get_achievement_index().by_id.values(),
+        key=lambda a: (a.condition_value, a.id),
+    )
+    earned_ids = set(UserAchievement.objects.filter(
+        user_profile=profile
+    ).values_list('achievement_id', flat=True))
+    stats = profile_stats(profile)
+    
+    # Group by tier in a single pass
+    tiers = ['bronze', 'silver', 'gold', 'platinum', 'diamond']
+    achievements_by_tier = {tier: [] for tier in tiers}
+    for a in all_achievements:
+        achievements_by_tier.setdefault(a.tier, []).append({
+            'achievement': a,
+            'earned': a.id in earned_ids,
+            'progress': achievement_progress(stats, a),
+        })
     
-    for uc in active_challenges:
-        challenge = uc.challenge
-        
-        if challenge.category == 'track':
-            # Count expenses logged
-            if challenge.challenge_type == 'daily':
-                count = Expense.objects.filter(date=today).count()
-            else:
-                week_start = today - timedelta(days=today.weekday())
-                count = Expense.objects.filter(date__gte=week_start).values('date').distinct().count()
-            
-            uc.progress = count
-            if count >= challenge.target_value:
-                complete_challenge(uc, profile)
-        
-        uc.save()
-
-
-def complete_challenge(user_challenge, profile):
-    """Mark a challenge as completed and award XP."""
-    user_challenge.status = 'completed'
-    user_challenge.completed_at = timezone.now()
-    user_challenge.save()
-    
-    # Award XP with streak bonus if applicable
-    xp = user_challenge.challenge.xp_reward
-    if user_challenge.challenge.streak_bonus:
-        xp = int(xp * profile.streak_multiplier)
-    
-    profile.add_xp(xp)
-    profile.challenges_completed += 1
-    profile.save()
+    return {
+        'achievements_by_tier': achievements_by_tier,
+        'earned_count': len(earned_ids),
+        'total_count': len(all_achievements),
+    }
 
 
+@login_required
+@read_only_view
 def achievements_view(request):
     """View all achievements and badges."""
-    profile = get_or_create_profile()
-    
-    # Get all achievements grouped by tier
-    all_achievements = Achievement.objects.all().order_by('tier', 'condition_value')
-    earned_ids = UserAchievement.objects.filter(
-        user_profile=profile
-    ).values_list('achievement_id', flat=True)
-    
-    # Group by tier
-    tiers = ['bronze', 'silver', 'gold', 'platinum', 'diamond']
-    achievements_by_tier = {}
-    for tier in tiers:
-        achievements_by_tier[tier] = [
-            {
-                'achievement': a,
-                'earned': a.id in earned_ids,
-                'progress': get_achievement_progress(profile, a)
-            }
-            for a in all_achievements.filter(tier=tier)
-        ]
+    profile = get_or_create_profile(request)
     
     context = {
         'profile': profile,
-        'achievements_by_tier': achievements_by_tier,
-        'earned_count': len(earned_ids),
-        'total_count': all_achievements.count(),
+        'cache_version': data_version(profile),
+        'cache_timeout': cache_timeout(),
+        **cached_context(profile, 'achievements', lambda: achievements_context(profile)),
     }
     
     return render(request, "achievements.html", context)
 
 
-def get_achievement_progress(profile, achievement):
-    """Calculate progress towards an achievement."""
-    if achievement.condition_type == 'expense_count':
-        current = Expense.objects.count()
-    elif achievement.condition_type == 'streak':
-        current = profile.current_streak
-    elif achievement.condition_type == 'challenges':
-        current = profile.challenges_completed
-    else:
-        current = 0
-    
-    return min(int((current / achievement.condition_value) * 100), 100)
-
-
+@login_required
+@read_only_view
 def leaderboard_view(request):
     """View leaderboard rankings."""
-    profile = get_or_create_profile()
+    profile = get_or_create_profile(request)
+    
+    period = request.GET.get('period', 'weekly')
+    if period not in PERIOD_TYPES:
+        period = 'weekly'
     
-    # For demo, create simulated leaderboard entries
-    # In production, this would show real user data
+    # Ranks are precomputed by the refresh_leaderboard command
     leaderboard_data = [
-        {'rank': 1, 'name': 'FinanceGuru', 'xp': 2450, 'level': 8, 'streak': 45},
-        {'rank': 2, 'name': 'BudgetBoss', 'xp': 1890, 'level': 6, 'streak': 30},
-        {'rank': 3, 'name': 'SavingsKing', 'xp': 1650, 'level': 5, 'streak': 21},
-        {'rank': 4, 'name': 'You', 'xp': profile.xp, 'level': profile.level, 'streak': profile.current_streak, 'is_current': True},
-        {'rank': 5, 'name': 'MoneyMaster', 'xp': max(profile.xp - 100, 0), 'level': max(profile.level - 1, 1), 'streak': 7},
+        {**row, 'is_current': row['profile_id'] == profile.pk}
+        for row in top_entries(period)
     ]
-    
-    # Sort by XP
-    leaderboard_data.sort(key=lambda x: x['xp'], reverse=True)
-    for i, entry in enumerate(leaderboard_data):
-        entry['rank'] = i + 1
+    my_entry = rank_of(profile, period)
     
     context = {
         'profile': profile,
         'leaderboard': leaderboard_data,
-        'period': 'weekly',
+        'my_entry': my_entry,
+        'period': period,
     }
     
     return render(request, "leaderboard.html", context)
 
 
+@login_required
 def settings_view(request):
     """User settings including theme selection."""
-    profile = get_or_create_profile()
+    profile = get_or_create_profile(request)
     
     if request.method == "POST":
         theme = request.POST.get("theme")
         if theme in profile.unlocked_themes or theme == 'dark':
             profile.theme = theme
-            profile.save()
+            profile.save(update_fields=['theme'])
         return redirect("settings")
     
     all_themes = [
@@ -479,29 +499,41 @@ def settings_view(request):
     return render(request, "settings.html", context)
 
 
-def predictions_view(request):
-    """Future You - Spending predictions and savings projections."""
-    profile = get_or_create_profile()
-    expenses = Expense.objects.all()
-    today = timezone.now().date()
-    
-    # Get user's monthly income/budget (default or from request)
-    monthly_income = int(request.GET.get('income', 50000))
-    
-    # Calculate spending patterns
-    total_expenses = expenses.count()
-    total_amount = float(expenses.aggregate(Sum('amount'))['amount__sum'] or 0)
-    
-    # Get expenses from last 30 days for better accuracy
-    last_30_days = expenses.filter(date__gte=today - timedelta(days=30))
-    last_30_amount = float(last_30_days.aggregate(Sum('amount'))['amount__sum'] or 0)
+def predictions_loads(profile, today):
+    """The predictions page's independent queries, as {name: callable}."""
+    rollups = ExpenseRollup.objects.for_user(profile.user_id)
+    return {
+        # Spending patterns (last 30 days for better accuracy)
+        'summary': lambda: spending_summary(rollups, since=today - timedelta(days=30)),
+        # The fitted forecast model is cached until new expenses arrive
+        'model': lambda: cached_context(profile, 'forecast_model', lambda: fit_forecast(today, rollups), today),
+        # Category breakdown for insights
+        'category_spending': lambda: list(category_totals(rollups, limit=5)),
+    }
+
+
+def predictions_context(profile, monthly_income, today):
+    """Forecasts and savings projections; cached per data version, income and day."""
+    return build_predictions_context(run_loads(predictions_loads(profile, today)), monthly_income, today)
+
+
+async def apredictions_context(profile, monthly_income, today):
+    """predictions_context with its queries run concurrently."""
+    return build_predictions_context(await arun_loads(predictions_loads(profile, today)), monthly_income, today)
+
+
+def build_predictions_context(loaded, monthly_income, today):
+    summary = loaded['summary']
+    total_amount = float(summary['total_amount'])
+    last_30_amount = float(summary['since_amount'])
     
-    # Calculate daily and monthly averages
-    days_tracked = max((today - expenses.order_by('date').first().date).days, 1) if expenses.exists() else 1
-    days_in_last_30 = min(days_tracked, 30)
+    first_date = summary['first_date']
+    days_tracked = max((today - first_date).days, 1) if first_date else 1
     
-    daily_avg = last_30_amount / days_in_last_30 if days_in_last_30 > 0 else 0
-    monthly_avg = daily_avg * 30
+    # Forecast the next 30 days
+    model = loaded['model']
+    monthly_avg = sum(forecast_daily(model, today, horizon=30))
+    daily_avg = monthly_avg / 30
     
     # Calculate projected values
     days_left_this_month = 30 - today.day
@@ -556,11 +588,7 @@ def predictions_view(request):
             'percentage': min(int((cumulative_savings / (yearly_savings if yearly_savings > 0 else 1)) * 100), 100) if yearly_savings > 0 else 0
         })
     
-    # Category breakdown for insights
-    category_spending = expenses.values('category').annotate(
-        total=Sum('amount')
-    ).order_by('-total')[:5]
-    
+    category_spending = loaded['category_spending']
     top_category = category_spending[0] if category_spending else {'category': 'None', 'total': 0}
     
     # Financial health score (0-100)
@@ -608,6 +636,17 @@ def predictions_view(request):
             'type': 'info'
         })
     
+    # Fastest-growing category, from the per-category trends
+    category_trends = model['category_trends'] if model else {}
+    if category_trends:
+        rising, slope = max(category_trends.items(), key=lambda item: item[1])
+        if slope * 30 >= 100:
+            insights.append({
+                'icon': '📈',
+                'text': f"{rising} spending is rising by about ₹{int(slope * 30):,}/month",
+                'type': 'warning'
+            })
+    
     # Future milestones
     milestones = []
     if yearly_savings > 0:
@@ -624,8 +663,7 @@ def predictions_view(request):
                 if len(milestones) >= 3:
                     break
     
-    context = {
-        'profile': profile,
+    return {
         'monthly_income': monthly_income,
         'daily_avg': int(daily_avg),
         'monthly_avg': int(monthly_avg),
@@ -641,6 +679,185 @@ def predictions_view(request):
         'milestones': milestones,
         'category_spending': category_spending,
     }
+
+
+DEFAULT_MONTHLY_INCOME = 50000
+
+
+def monthly_income_param(request):
+    """The ``income`` query parameter as a whole number of rupees (the default when absent); None if unusable."""
+    raw = request.GET.get('income')
+    if not raw:
+        return DEFAULT_MONTHLY_INCOME
+    try:
+        income = int(raw)
+    except ValueError:
+        return None
+    return income if income >= 0 else None
+
+
+def valid_income(view):
+    """Answer 400 to an unusable ``income`` parameter, before the view or its ETag function reads it."""
+    bad_request = "income must be a whole, non-negative number"
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if monthly_income_param(request) is None:
+                return HttpResponseBadRequest(bad_request)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if monthly_income_param(request) is None:
+            return HttpResponseBadRequest(bad_request)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+@read_only_view
+@valid_income
+def predictions_view(request):
+    """Future You - Spending predictions and savings projections."""
+    profile = get_or_create_profile(request)
+    today = timezone.now().date()
+    
+    # Get user's monthly income/budget (default or from request)
+    monthly_income = monthly_income_param(request)
+    
+    context = {
+        'profile': profile,
+        'cache_version': data_version(profile),
+        'cache_timeout': cache_timeout(),
+        **cached_context(
+            profile, 'predictions',
+            lambda: predictions_context(profile, monthly_income, today),
+            monthly_income, today,
+        ),
+    }
     
     return render(request, "predictions.html", context)
 
+
+@login_required
+@read_only_view
+@valid_income
+async def predictions_async(request):
+    """The predictions page for ASGI, loading its data concurrently."""
+    profile = await sync_to_async(get_or_create_profile)(request)
+    today = timezone.now().date()
+    monthly_income = monthly_income_param(request)
+    
+    context = {
+        'profile': profile,
+        'cache_version': await sync_to_async(data_version)(profile),
+        'cache_timeout': cache_timeout(),
+        **await acached_context(
+            profile, 'predictions',
+            lambda: apredictions_context(profile, monthly_income, today),
+            monthly_income, today,
+        ),
+    }
+    
+    return await sync_to_async(render)(request, "predictions.html", context)
+
+
+
+
+def stats_etag(name, *vary_on):
+    """
+    ETag function for a stats endpoint: a hash of the profile's data version,
+    the day and any request-dependent inputs (``vary_on(request)`` callables).
+
+    It only reads the session profile and the cache, so an unchanged poll is
+    answered with a 304 before any aggregate runs.
+    """
+    def etag(request):
+        profile = get_or_create_profile(request)
+        parts = [name, str(profile.pk), data_version(profile), str(timezone.now().date())]
+        parts += [str(vary(request)) for vary in vary_on]
+        return hashlib.sha1(':'.join(parts).encode()).hexdigest()
+    return etag
+
+
+def stats_last_modified(request):
+    """Last data change, at one-second resolution; the figures are relative to today, so never before midnight."""
+    profile = get_or_create_profile(request)
+    return max(data_last_modified(profile), start_of_day(timezone.localdate()))
+
+
+def serialize_profile(profile):
+    return {
+        'level': profile.level,
+        'rank': profile.get_rank(),
+        'xp': profile.xp,
+        'xp_for_next_level': profile.get_xp_for_next_level(),
+        'progress_percentage': profile.get_progress_percentage(),
+        'current_streak': profile.current_streak,
+        'longest_streak': profile.longest_streak,
+        'streak_multiplier': profile.streak_multiplier,
+    }
+
+
+def serialize_user_challenge(user_challenge):
+    """JSON-friendly representation of a profile's challenge, with its catalogue entry."""
+    challenge = user_challenge.challenge
+    return {
+        'id': user_challenge.id,
+        'title': challenge.title,
+        'icon': challenge.icon,
+        'challenge_type': challenge.challenge_type,
+        'target_value': challenge.target_value,
+        'xp_reward': challenge.xp_reward,
+        'status': user_challenge.status,
+        'progress': user_challenge.progress,
+        'started_at': user_challenge.started_at.isoformat(),
+    }
+
+
+@login_required
+@read_only_view
+@condition(etag_func=stats_etag('dashboard'), last_modified_func=stats_last_modified)
+def dashboard_stats(request):
+    """The dashboard's numbers as JSON, for clients that poll."""
+    profile = get_or_create_profile(request)
+    today = timezone.now().date()
+    
+    context = cached_context(profile, 'dashboard', lambda: dashboard_context(profile, today), today)
+    
+    return JsonResponse({
+        'profile': serialize_profile(profile),
+        'total_expenses': context['total_expenses'],
+        'total_amount': context['total_amount'],
+        'week_amount': context['week_amount'],
+        'earned_achievements': context['earned_achievements'],
+        'total_achievements': context['total_achievements'],
+        'active_challenges': [serialize_user_challenge(uc) for uc in context['active_challenges']],
+        'recent_expenses': [serialize_expense(e) for e in context['recent_expenses']],
+    })
+
+
+@login_required
+@read_only_view
+@valid_income
+@condition(etag_func=stats_etag('predictions', monthly_income_param), last_modified_func=stats_last_modified)
+def predictions_stats(request):
+    """The predictions page's numbers as JSON, for clients that poll."""
+    profile = get_or_create_profile(request)
+    today = timezone.now().date()
+    monthly_income = monthly_income_param(request)
+    
+    context = cached_context(
+        profile, 'predictions',
+        lambda: predictions_context(profile, monthly_income, today),
+        monthly_income, today,
+    )
+    
+    return JsonResponse(context)
+
+
+@staff_member_required
+def performance_view(request):
+    """Rolling per-route latency, SQL and template statistics for this process."""
+    return JsonResponse({'window': histograms.window, 'routes': histograms.snapshot()})
@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+
+from .models import Expense
+from .tasks import enqueue_expense_logged
+
+
+WRITER_BATCH_SIZE = 64
+# How long a batch waits for company once its first row arrives. Under load
+# rows queue up while the previous batch commits, so batches form without it.
+WRITER_MAX_WAIT_MS = 0
+WRITER_COMMIT_ATTEMPTS = 3
+WRITER_TIMEOUT = 30  # Seconds a request waits for its row before giving up
+
+
+def writer_setting(name, default):
+    return getattr(settings, f'TRACKER_WRITER_{name}', default)
+
+
+def _insert(profile, fields):
+    expense = Expense.objects.create(user_id=profile.user_id, **fields)
+    # Streak, XP, achievements and challenges run in the background
+    # (tracker.tasks); the results show on the next page
+    enqueue_expense_logged(profile)
+    return expense
+
+
+class ExpenseWriter:
+    """
+    A single thread that owns expense inserts and commits them in small batches.
+
+    Concurrent requests hand over their rows instead of each opening a write
+    transaction and queueing on SQLite's database lock. Whatever arrives
+    while a batch is being committed forms the next batch (group commit), so
+    one lock acquisition and one commit cover many rows under load, while a
+    lone request is committed straight away.
+    """
+
+    def __init__(self, batch_size=WRITER_BATCH_SIZE, max_wait_ms=WRITER_MAX_WAIT_MS):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.rows = 0
+
+    def submit(self, profile, **fields):
+        """Queue an expense for ``profile``; the Future resolves to the Expense once it is committed."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='tracker-expense-writer', daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((profile, fields, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Take what is already waiting without delay; only a short batch waits
+                batch.append(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def stop(self):
+        """Finish the queued rows, then end the thread and close its connections."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stopping = None in batch
+            batch = [item for item in batch if item is not None]
+            # Long-lived thread: honour CONN_MAX_AGE the way request handling does
+            close_old_connections()
+            if batch:
+                self._commit(batch)
+            if stopping:
+                connections.close_all()
+                return
+
+    def _commit(self, batch):
+        """Insert a batch in one transaction; a row that fails only fails its own request."""
+        for attempt in range(1, WRITER_COMMIT_ATTEMPTS + 1):
+            outcomes = []
+            try:
+                with transaction.atomic():
+                    for profile, fields, _ in batch:
+                        try:
+                            with transaction.atomic():
+                                outcomes.append((_insert(profile, fields), None))
+                        except Exception as exc:
+                            outcomes.append((None, exc))
+                self.commits += 1
+                self.rows += len(batch)
+                break
+            except Exception as exc:
+                # A lock timeout on BEGIN/COMMIT wrote nothing, so it can be retried
+                if not isinstance(exc, OperationalError) or attempt == WRITER_COMMIT_ATTEMPTS:
+                    for _, _, future in batch:
+                        future.set_exception(exc)
+                    return
+                time.sleep(0.05 * attempt)
+
+        for (_, _, future), (expense, exc) in zip(batch, outcomes):
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(expense)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ExpenseWriter(
+                batch_size=writer_setting('BATCH_SIZE', WRITER_BATCH_SIZE),
+                max_wait_ms=writer_setting('MAX_WAIT_MS', WRITER_MAX_WAIT_MS),
+            )
+    return _writer
+
+
+def stop_writer():
+    """Stop the shared writer (it restarts on the next write), e.g. before switching databases."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def write_expense(profile, **fields):
+    """
+    Store an expense for ``profile`` and queue its gamification; returns once it is committed.
+
+    Goes through the shared writer when TRACKER_WRITER_ENABLED, except when
+    the caller is already inside a transaction: the row must then be part of
+    that transaction, so it is inserted directly.
+    """
+    if not writer_setting('ENABLED', True) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        with transaction.atomic():
+            return _insert(profile, fields)
+    return get_writer().submit(profile, **fields).result(timeout=writer_setting('TIMEOUT', WRITER_TIMEOUT))